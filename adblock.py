@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+
+import gi
+
+gi.require_version('WebKit2', '4.0')
+from gi.repository import GLib, WebKit2
+
+# Ad networks and trackers blocked when no filter list is configured; the
+# same services the tracker script and the ad CSS used to go after
+DEFAULT_BLOCKED_HOSTS = [
+    "doubleclick.net",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "google-analytics.com",
+    "connect.facebook.net",
+    "analytics.twitter.com",
+    "ads-twitter.com",
+    "ct.pinterest.com",
+    "sc-static.net",
+    "quantserve.com",
+    "cdn.heapanalytics.com",
+    "cdn.mxpnl.com",
+    "js.hs-analytics.net",
+    "static.hotjar.com",
+    "clarity.ms",
+]
+
+def host_filter(host, path=""):
+    """url-filter regex matching host and its subdomains, optionally followed by path"""
+    return r"^[^:]+:(//)?([^/]+\.)?" + re.escape(host).replace(r"\-", "-") + (re.escape(path) + "[/?]" if path else "[/:]")
+
+
+class BlockRule:
+    """One WebKit content-blocker rule.
+
+    url_filter is a regular expression in WebKit's subset (no alternation,
+    no backreferences) matched against the full request URL. action is
+    "block", "block-cookies", "css-display-none" (with selector) or
+    "ignore-previous-rules" for exceptions.
+    """
+
+    def __init__(self, url_filter, action="block", selector=None, resource_types=None,
+                 load_type=None, if_domain=None, unless_domain=None, case_sensitive=False):
+        self.url_filter = url_filter
+        self.action = action
+        self.selector = selector
+        self.resource_types = resource_types
+        self.load_type = load_type
+        self.if_domain = if_domain
+        self.unless_domain = unless_domain
+        self.case_sensitive = case_sensitive
+
+    def to_json(self):
+        trigger = {"url-filter": self.url_filter}
+        if self.case_sensitive:
+            trigger["url-filter-is-case-sensitive"] = True
+        if self.resource_types:
+            trigger["resource-type"] = list(self.resource_types)
+        if self.load_type:
+            trigger["load-type"] = [self.load_type]
+        # WebKit only accepts one of if-domain/unless-domain; "*" also covers subdomains
+        if self.if_domain:
+            trigger["if-domain"] = ["*" + domain for domain in self.if_domain]
+        elif self.unless_domain:
+            trigger["unless-domain"] = ["*" + domain for domain in self.unless_domain]
+        action = {"type": self.action}
+        if self.selector:
+            action["selector"] = self.selector
+        return {"trigger": trigger, "action": action}
+
+
+def default_rules():
+    return [BlockRule(host_filter(host), load_type="third-party") for host in DEFAULT_BLOCKED_HOSTS] + [
+        # The Facebook pixel lives on the main domain, so only its endpoint is blocked
+        BlockRule(host_filter("facebook.com", "/tr"), load_type="third-party"),
+    ]
+
+
+def compile_rules(rules):
+    """The JSON WebKit's content extension compiler takes; exceptions have to come after the blocks they undo"""
+    ordered = [rule for rule in rules if rule.action != "ignore-previous-rules"]
+    ordered += [rule for rule in rules if rule.action == "ignore-previous-rules"]
+    return json.dumps([rule.to_json() for rule in ordered], separators=(",", ":"))
+
+
+class ContentBlocker:
+    """Blocks requests in the network layer with a compiled WebKit content filter.
+
+    The rules are turned into WebKit's JSON content-blocker format and
+    compiled by WebKit2.UserContentFilterStore, which keeps the bytecode in
+    store_dir. The stored filter is named after a hash of its rules, so a
+    later start with the same rules only loads it; changed rules compile
+    under a new name and the stale entries are removed. Compiling and
+    loading are asynchronous: content managers attached before the filter is
+    ready receive it as soon as it is.
+    """
+
+    def __init__(self, store_dir, name="adblock"):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store = WebKit2.UserContentFilterStore.new(store_dir)
+        self.name = name
+        self.filter = None
+        self.identifier = None
+        self.managers = []
+
+    def load(self, rules):
+        """Compile rules, or load them from the store if they were compiled before"""
+        source = compile_rules(rules)
+        self.load_source(hashlib.sha1(source.encode()).hexdigest()[:16], lambda: source)
+
+    def load_source(self, key, build_source):
+        """Load the filter stored under key; only if there is none, build_source() is called for the JSON to compile"""
+        self.identifier = f"{self.name}-{key}"
+        self.store.load(self.identifier, None, self.on_loaded, (self.identifier, build_source))
+
+    def on_loaded(self, store, result, data):
+        identifier, build_source = data
+        try:
+            content_filter = store.load_finish(result)
+        except GLib.Error:
+            print("Compiling content blocker rules")
+            source = build_source()
+            store.save(identifier, GLib.Bytes.new(source.encode()), None, self.on_saved, identifier)
+            return
+        self.install(identifier, content_filter)
+
+    def on_saved(self, store, result, identifier):
+        try:
+            content_filter = store.save_finish(result)
+        except GLib.Error as e:
+            print(f"Error compiling content blocker rules: {e}")
+            return
+        self.install(identifier, content_filter)
+        store.fetch_identifiers(None, self.on_identifiers, identifier)
+
+    def on_identifiers(self, store, result, current):
+        try:
+            identifiers = store.fetch_identifiers_finish(result)
+        except GLib.Error:
+            return
+        for identifier in identifiers:
+            if identifier.startswith(self.name + "-") and identifier != current:
+                store.remove(identifier, None, None, None)
+
+    def install(self, identifier, content_filter):
+        if identifier != self.identifier:
+            # Superseded by a later load() while this one was compiling
+            return
+        old_filter, self.filter = self.filter, content_filter
+        for manager in self.managers:
+            if old_filter is not None:
+                manager.remove_filter(old_filter)
+            manager.add_filter(content_filter)
+
+    def attach(self, content_manager):
+        if content_manager in self.managers:
+            return
+        self.managers.append(content_manager)
+        if self.filter is not None:
+            content_manager.add_filter(self.filter)
+
+    def detach(self, content_manager):
+        if content_manager not in self.managers:
+            return
+        self.managers.remove(content_manager)
+        if self.filter is not None:
+            content_manager.remove_filter(self.filter)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import os
+from pathlib import Path
+
+import gi
+
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GdkPixbuf
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class AssetRegistry:
+    """The images, sounds and other files shipped next to the browser.
+
+    Paths resolve against the application directory rather than the working
+    directory, so the browser can be started from anywhere. Each image is
+    decoded the first time it is asked for and the pixbuf or animation is
+    shared from then on; a missing or broken file raises GLib.Error, as
+    new_from_file() does.
+    """
+
+    def __init__(self, directory=APP_DIR):
+        self.directory = directory
+        self.pixbufs = {}
+        self.animations = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def uri(self, name):
+        """file:// URI for CSS url() and the like; spaces and quotes in the path are escaped"""
+        return Path(self.path(name)).as_uri()
+
+    def pixbuf(self, name):
+        pixbuf = self.pixbufs.get(name)
+        if pixbuf is None:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(self.path(name))
+            self.pixbufs[name] = pixbuf
+        return pixbuf
+
+    def animation(self, name):
+        animation = self.animations.get(name)
+        if animation is None:
+            animation = GdkPixbuf.PixbufAnimation.new_from_file(self.path(name))
+            self.animations[name] = animation
+        return animation
+
+    def image(self, name):
+        """A new Gtk.Image showing the shared pixbuf; widgets cannot be shared, pixbufs can"""
+        return Gtk.Image.new_from_pixbuf(self.pixbuf(name))
+
+    def animated_image(self, name):
+        return Gtk.Image.new_from_animation(self.animation(name))
+
+
+assets = AssetRegistry()
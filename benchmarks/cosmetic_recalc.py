@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Measure what ad-hiding style sheets cost in style recalculation.
+
+Loads a generated page (nested divs whose classes and ids mix ordinary
+names with ad-like ones) into an offscreen WebView once per setup:
+
+  none      no element hiding
+  global    the attribute-substring sheet every page used to get
+  scoped    CosmeticFilter: the generic rules plus those for the page's site
+
+and times forced full-document style recalcs inside the page. It also
+counts how many elements each setup hides, since the global sheet hid
+ordinary content too. Pass a filter list to include its rules in "scoped".
+Needs a display.
+
+Usage: python3 benchmarks/cosmetic_recalc.py [elements] [recalcs] [filter list]
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gi
+
+gi.require_version('Gtk', '3.0')
+gi.require_version('WebKit2', '4.0')
+from gi.repository import Gtk, GLib, WebKit2
+from filterlists import BUILTIN_COSMETIC_RULES, CosmeticFilter, parse_filter_list
+
+PAGE_URI = "https://news.example.com/article"
+
+# The sheet setup_content_filters used to add to every frame of every site
+GLOBAL_CSS = """
+div[class*="ad-"], div[class*="ad_"], div[id*="ad-"], div[id*="ad_"],
+div[class*="ads-"], div[class*="ads_"], div[id*="ads-"], div[id*="ads_"],
+div[class*="advert"], div[id*="advert"],
+iframe[id*="ad_"], iframe[id*="ad-"], iframe[src*="ad_"], iframe[src*="ad-"],
+div[class*="banner"], div[id*="banner"],
+.advertisement, .advertising, .adsbygoogle, .adsbox,
+div[class*="cookie-banner"], div[class*="cookie-consent"], div[class*="cookie-notice"],
+div[class*="gdpr"], div[class*="consent"], div[class*="popup"], div[id*="popup"],
+div[class*="modal"][class*="overlay"], div[class*="lightbox"],
+img[width="1"][height="1"], iframe[width="1"][height="1"],
+div[class*="share-buttons"], div[id*="share-buttons"], div[class*="social-buttons"], div[id*="social-buttons"],
+div[class*="newsletter"], div[id*="newsletter"], div[class*="subscribe"], div[id*="subscribe"],
+iframe[src*="doubleclick.net"], iframe[src*="googleadservices"], iframe[src*="googlesyndication"],
+iframe[src*="adservice.google"], iframe[src*="amazon-adsystem"],
+img[src*="ad.doubleclick.net"], img[src*="googleadservices"], img[src*="googlesyndication"],
+img[src*="adservice.google"], img[src*="amazon-adsystem"]
+{ display: none !important; }
+"""
+
+CLASS_WORDS = ["header", "content", "article", "card", "grid", "row", "col", "nav", "footer", "text",
+               "modal-overlay", "subscribe-box", "banner-image", "head-line", "load-more", "advertisement",
+               "ad-slot", "promo", "read-more", "thumbnail", "consent-info", "lightbox-gallery"]
+
+MEASURE_JS = """
+(function() {
+    const start = performance.now();
+    for (let i = 0; i < %d; i++) {
+        document.body.classList.toggle("recalc");
+        document.body.offsetTop;
+    }
+    const elapsed = performance.now() - start;
+    let hidden = 0;
+    for (const element of document.querySelectorAll("div, img, iframe")) {
+        if (getComputedStyle(element).display === "none") hidden++;
+    }
+    return elapsed * 1000000 + hidden;
+})()
+"""
+
+
+def make_page(count, rng):
+    parts = ["<!DOCTYPE html><html><head><style>body.recalc div { color: #010101; }</style></head><body>"]
+    depth = 0
+    for i in range(count):
+        classes = " ".join(rng.sample(CLASS_WORDS, 2))
+        parts.append(f'<div class="{classes}" id="{rng.choice(CLASS_WORDS)}-{i}">item {i}')
+        depth += 1
+        if depth == 6 or rng.random() < 0.5:
+            parts.append("</div>" * depth)
+            depth = 0
+    parts.append("</div>" * depth + "</body></html>")
+    return "".join(parts)
+
+
+def run(html, recalcs, setup):
+    manager = WebKit2.UserContentManager()
+    setup(manager)
+    webview = WebKit2.WebView.new_with_user_content_manager(manager)
+    window = Gtk.OffscreenWindow()
+    window.set_default_size(1200, 800)
+    window.add(webview)
+    window.show_all()
+    loop = GLib.MainLoop()
+    result = {}
+
+    def on_result(view, task, data):
+        value = int(view.run_javascript_finish(task).get_js_value().to_double())
+        result["ms"], result["hidden"] = value // 1000000 / 1000, value % 1000000
+        loop.quit()
+
+    def on_load_changed(view, event):
+        if event == WebKit2.LoadEvent.FINISHED:
+            view.run_javascript(MEASURE_JS % recalcs, None, on_result, None)
+
+    webview.connect("load-changed", on_load_changed)
+    webview.load_html(html, PAGE_URI)
+    loop.run()
+    window.destroy()
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    recalcs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rules_text = BUILTIN_COSMETIC_RULES
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "r") as f:
+            rules_text += f.read()
+    Gtk.init(None)
+    html = make_page(count, random.Random(1))
+    _, cosmetic, _ = parse_filter_list(rules_text)
+
+    def scoped(manager):
+        cosmetic_filter = CosmeticFilter(cosmetic)
+        cosmetic_filter.attach(manager)
+        cosmetic_filter.navigate(PAGE_URI)
+
+    setups = {
+        "none": lambda manager: None,
+        "global": lambda manager: manager.add_style_sheet(WebKit2.UserStyleSheet(
+            GLOBAL_CSS, WebKit2.UserContentInjectedFrames.ALL_FRAMES, WebKit2.UserStyleLevel.USER, None, None)),
+        "scoped": scoped,
+    }
+    print(f"{count} elements, {recalcs} full style recalcs")
+    print(f"{'setup':8} {'total ms':>9} {'per recalc':>11} {'hidden':>7}")
+    for name, setup in setups.items():
+        result = run(html, recalcs, setup)
+        print(f"{name:8} {result['ms']:9.1f} {result['ms'] / recalcs:11.2f} {result['hidden']:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Time the favicon pipeline on generated PNG, ICO and SVG icons.
+
+Compares the old path (PIL decode, flatten onto white, save PNG, encode a
+second PNG and feed it to a PixbufLoader) with decode_favicon() plus
+pixbuf_from_rgba(). Disk writes are timed separately because the browser
+does them after the icon is already shown.
+
+Usage: python3 benchmarks/favicon_decode.py [icons per format]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image, ImageDraw
+from favicons import decode_favicon, pixbuf_from_rgba, save_favicon
+from gi.repository import GdkPixbuf
+
+
+def random_image(size):
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        box = sorted(random.sample(range(size), 2)) + sorted(random.sample(range(size), 2))
+        color = tuple(random.randrange(256) for _ in range(3)) + (random.randrange(128, 256),)
+        draw.ellipse((box[0], box[2], box[1], box[3]), fill=color)
+    return image
+
+
+def make_png(size):
+    out = BytesIO()
+    random_image(size).save(out, format="PNG")
+    return out.getvalue()
+
+
+def make_ico():
+    out = BytesIO()
+    random_image(64).save(out, format="ICO", sizes=[(16, 16), (32, 32), (48, 48)])
+    return out.getvalue()
+
+
+def make_svg():
+    shapes = "".join(
+        f'<circle cx="{random.randrange(64)}" cy="{random.randrange(64)}" r="{random.randrange(4, 24)}" '
+        f'fill="#{random.randrange(0xffffff):06x}" fill-opacity="0.8"/>'
+        for _ in range(6)
+    )
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">{shapes}</svg>'.encode()
+
+
+def old_pipeline(content, path):
+    """The original create_menu_item_with_favicon miss path"""
+    pil_image = Image.open(BytesIO(content))
+    pil_image = pil_image.resize((16, 16), Image.Resampling.LANCZOS)
+    if pil_image.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', pil_image.size, (255, 255, 255))
+        if pil_image.mode == 'RGBA':
+            background.paste(pil_image, mask=pil_image.split()[-1])
+        else:
+            background.paste(pil_image)
+        pil_image = background
+    pil_image.save(path, format='PNG')
+    image_bytes = BytesIO()
+    pil_image.save(image_bytes, format='PNG')
+    loader = GdkPixbuf.PixbufLoader.new_with_type('png')
+    loader.write(image_bytes.getvalue())
+    loader.close()
+    return loader.get_pixbuf()
+
+
+def time_each(inputs, func):
+    failures = 0
+    start = time.perf_counter()
+    for content in inputs:
+        try:
+            func(content)
+        except Exception:
+            failures += 1
+    elapsed = (time.perf_counter() - start) / len(inputs) * 1000
+    return elapsed, failures
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random.seed(1)
+    formats = {
+        "png 32px": [make_png(32) for _ in range(count)],
+        "png 128px": [make_png(128) for _ in range(count)],
+        "ico 16-48px": [make_ico() for _ in range(count)],
+        "svg": [make_svg() for _ in range(count)],
+    }
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "icon.png")
+        print(f"{'format':12} {'old ms':>8} {'new ms':>8} {'+ write':>8}  failures old/new")
+        for name, inputs in formats.items():
+            old_ms, old_failures = time_each(inputs, lambda content: old_pipeline(content, path))
+            new_ms, new_failures = time_each(inputs, lambda content: pixbuf_from_rgba(decode_favicon(content)))
+            rgba = [decode_favicon(content) for content in inputs]
+            write_ms, _ = time_each(rgba, lambda pixels: save_favicon(pixels, path))
+            print(f"{name:12} {old_ms:8.3f} {new_ms:8.3f} {write_ms:8.3f}  {old_failures}/{new_failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Time filter list parsing, WebKit content-blocker compilation and loading.
+
+Generates an EasyList-like list (host rules, path rules with options,
+exceptions, generic and per-domain element hiding) and measures:
+
+  parse     parse_filter_list() on the raw text
+  cold      FilterLists.load() with an empty cache (parse + write the cache)
+  warm      FilterLists.load() with the cache in place (what a normal start pays)
+  compile   UserContentFilterStore compiling the network rules
+  load      loading the compiled filter back from the store
+
+Usage: python3 benchmarks/filter_lists.py [rules]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gi.repository import GLib
+from adblock import ContentBlocker, default_rules
+from filterlists import FilterLists, parse_filter_list
+
+WORDS = ["ad", "ads", "banner", "track", "pixel", "promo", "sponsor", "click", "stat", "metric", "beacon", "pop"]
+TLDS = ["com", "net", "org", "io", "de", "pl"]
+
+
+def name(rng):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+
+
+def domain(rng):
+    return f"{name(rng)}.{rng.choice(TLDS)}"
+
+
+def make_list(count, rng):
+    lines = ["[Adblock Plus 2.0]", "! Title: generated benchmark list"]
+    makers = [
+        (30, lambda: f"||{domain(rng)}^"),
+        (10, lambda: f"||{domain(rng)}^$third-party"),
+        (12, lambda: f"/{rng.choice(WORDS)}/{name(rng)}_{rng.choice(WORDS)}."),
+        (8, lambda: f"||{domain(rng)}/{rng.choice(WORDS)}/*$script,image,domain={domain(rng)}|~{domain(rng)}"),
+        (5, lambda: f"@@||{domain(rng)}/{rng.choice(WORDS)}.js|"),
+        (20, lambda: f"##.{rng.choice(WORDS)}-{name(rng)}"),
+        (12, lambda: f"{domain(rng)},{domain(rng)}###{rng.choice(WORDS)}_{name(rng)}"),
+        (2, lambda: f"{domain(rng)}#@#.{rng.choice(WORDS)}-{name(rng)}"),
+        (1, lambda: f"{domain(rng)}##+js(set-constant, {name(rng)}, false)"),
+    ]
+    weights = [weight for weight, _ in makers]
+    for _ in range(count):
+        lines.append(rng.choices(makers, weights)[0][1]())
+    return "\n".join(lines) + "\n"
+
+
+def wait_for_filter(blocker, timeout=600):
+    """Run the main loop until the blocker's asynchronous load or compile finished"""
+    loop = GLib.MainLoop()
+    deadline = time.perf_counter() + timeout
+
+    def check():
+        if blocker.filter is not None or time.perf_counter() > deadline:
+            loop.quit()
+            return False
+        return True
+
+    GLib.timeout_add(1, check)
+    loop.run()
+    return blocker.filter is not None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    text = make_list(count, random.Random(1))
+    work_dir = tempfile.mkdtemp()
+    try:
+        lists_dir = os.path.join(work_dir, "lists")
+        cache_dir = os.path.join(work_dir, "cache")
+        store_dir = os.path.join(work_dir, "store")
+        os.makedirs(lists_dir)
+        with open(os.path.join(lists_dir, "generated.txt"), "w") as f:
+            f.write(text)
+
+        start = time.perf_counter()
+        network, cosmetic, skipped = parse_filter_list(text)
+        parse_s = time.perf_counter() - start
+        print(f"{count} lines: {len(network)} network rules, {len(cosmetic.generic)} generic and "
+              f"{sum(len(s) for s in cosmetic.by_domain.values())} domain hiding rules, {skipped} skipped")
+
+        lists = FilterLists(lists_dir, cache_dir)
+        start = time.perf_counter()
+        compiled = lists.load(default_rules())
+        cold_s = time.perf_counter() - start
+        start = time.perf_counter()
+        compiled = lists.load(default_rules())
+        warm_s = time.perf_counter() - start
+
+        blocker = ContentBlocker(store_dir)
+        start = time.perf_counter()
+        blocker.load_source(compiled.key, compiled.network_source)
+        compiled_ok = wait_for_filter(blocker)
+        compile_s = time.perf_counter() - start
+
+        blocker = ContentBlocker(store_dir)
+        start = time.perf_counter()
+        blocker.load_source(compiled.key, compiled.network_source)
+        loaded_ok = wait_for_filter(blocker)
+        load_s = time.perf_counter() - start
+
+        print(f"{'parse':8} {parse_s * 1000:10.1f} ms")
+        print(f"{'cold':8} {cold_s * 1000:10.1f} ms")
+        print(f"{'warm':8} {warm_s * 1000:10.1f} ms")
+        print(f"{'compile':8} {compile_s * 1000:10.1f} ms{'' if compiled_ok else '  (failed)'}")
+        print(f"{'load':8} {load_s * 1000:10.1f} ms{'' if loaded_ok else '  (failed)'}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
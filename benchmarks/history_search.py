@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Fill a throwaway history database with synthetic visits and time FTS searches.
+
+Also adds a page visited often a couple of months ago, which most recent
+matches are newer than, and checks that searches still rank it first.
+
+Usage: python3 benchmarks/history_search.py [visits]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from history import HistoryStore, frecency_add, frecency_key, visit_score
+
+WORDS = ("linux kernel python gtk webkit browser history search video music news weather "
+         "recipe travel review guide github reddit wiki forum shop sale game anime paper "
+         "release patch driver memory cache thread socket render layout font image").split()
+HOSTS = [f"{w}{n}.{tld}" for w in WORDS for n in ("", "hub", "zone") for tld in ("com", "org", "net")]
+
+
+def fill(store, visits):
+    now = time.time()
+    rows = []
+    for i in range(visits):
+        host = random.choice(HOSTS)
+        title = " ".join(random.sample(WORDS, 5)).title()
+        path = "/".join(random.sample(WORDS, 2))
+        when = now - random.random() * 365 * 24 * 3600
+        typed = random.random() < 0.05
+        rows.append((f"https://{host}/{path}/{i}", title, random.randint(1, 20), when, typed, visit_score(when, typed)))
+    used = set()
+    for i, row in enumerate(rows):
+        seq = frecency_key(row[5])
+        while seq in used:
+            seq += 1
+        used.add(seq)
+        rows[i] = row + (seq,)
+    with store.conn:
+        store.conn.executemany(
+            "INSERT INTO urls (url, title, visit_count, last_visit, typed, frecency, seq) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        store.conn.executemany(
+            "INSERT INTO urls_fts (rowid, title, url, body) VALUES (?, ?, ?, '')",
+            [(row[6], row[1], row[0]) for row in rows]
+        )
+
+
+def add_favourite(store, url, title, visits):
+    """A page visited visits times between 70 and 40 days ago"""
+    now = time.time()
+    frecency = None
+    for i in range(visits):
+        frecency = frecency_add(frecency, now - (70 - 30 * i / visits) * 24 * 3600, False)
+    with store.conn:
+        seq = store.free_seq(store.conn, frecency)
+        store.conn.execute(
+            "INSERT INTO urls (url, title, visit_count, last_visit, typed, frecency, seq) VALUES (?, ?, ?, ?, 0, ?, ?)",
+            (url, title, visits, now - 40 * 24 * 3600, frecency, seq)
+        )
+        store.conn.execute("INSERT INTO urls_fts (rowid, title, url, body) VALUES (?, ?, ?, '')", (seq, title, url))
+
+
+def main():
+    visits = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = HistoryStore(data_dir)
+
+        start = time.perf_counter()
+        fill(store, visits)
+        print(f"filled {visits} visits in {time.perf_counter() - start:.1f}s")
+        favourite = "https://reddit.com/r/python/favourite"
+        add_favourite(store, favourite, "Python Community", 300)
+
+        queries = ["lin", "python gtk", "reddit", "webkit render", "zone", "github.org", "anime paper"]
+        for query in queries:
+            store.search(query)  # warm the page cache
+            runs = 20
+            start = time.perf_counter()
+            for _ in range(runs):
+                results = store.search(query, limit=20)
+            elapsed = (time.perf_counter() - start) / runs * 1000
+            print(f"{query!r:18} {len(results):3} results  {elapsed:7.2f} ms")
+
+        ranked = [entry.url for entry in store.search("reddit python", limit=20)]
+        found = "first" if ranked[:1] == [favourite] else "missing" if favourite not in ranked else "not first"
+        print(f"frequently visited older page: {found}")
+
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
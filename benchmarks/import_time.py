@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Check what importing browser.py costs, using python -X importtime.
+
+Fails (exit status 1) if the imports take longer than the budget or if any
+module that should only load on first use (explorer, cv2, PIL, requests,
+numpy) is pulled in at startup. Prints the slowest imports either way.
+
+Usage: python3 benchmarks/import_time.py [budget ms] [runs]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ["explorer", "cv2", "PIL", "requests", "numpy"]
+
+
+def measure():
+    """{module: (self us, cumulative us)} for one fresh interpreter importing browser"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import browser"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import browser failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 600
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    # The first run warms the page cache and writes .pyc files; keep the fastest of the rest
+    measure()
+    samples = [measure() for _ in range(runs)]
+    times = min(samples, key=lambda t: sum(s for s, _ in t.values()))
+    total_ms = sum(s for s, _ in times.values()) / 1000
+
+    print(f"{'module':40} {'self ms':>8} {'cumul ms':>9}")
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][1])[:20]:
+        print(f"{name:40} {self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}")
+    print(f"\nimport browser: {total_ms:.1f} ms (budget {budget_ms:.0f} ms, best of {runs})")
+
+    failed = False
+    loaded = [name for name in LAZY_MODULES if name in times]
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+    if total_ms > budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
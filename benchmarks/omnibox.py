@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Time OmniboxIndex keystrokes and how long a visit can stall the main thread.
+
+Builds the index from synthetic history, times suggest() for prefixes of
+every length, then records enough new visits to trigger a rebalance, once
+inline and once on a worker thread. For the threaded run, a queue stands
+in for GLib.idle_add and is drained between visits the way the main loop
+would. The worst record() shows what a user would feel as a freeze; in
+the threaded run it is mostly the interpreter's own garbage collection
+passing over a million entries.
+
+Usage: python3 benchmarks/omnibox.py [urls]
+"""
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from history import visit_score
+from omnibox import OmniboxIndex
+
+WORDS = ("linux kernel python gtk webkit browser history search video music news weather "
+         "recipe travel review guide github reddit wiki forum shop sale game anime paper "
+         "release patch driver memory cache thread socket render layout font image").split()
+HOSTS = [f"{w}{n}.{tld}" for w in WORDS for n in ("", "hub", "zone") for tld in ("com", "org", "net")]
+QUERIES = ["g", "gi", "git", "github", "github.com/", "w", "wik", "news", "reddit memory", "zz"]
+
+
+def rows(count):
+    now = time.time()
+    for i in range(count):
+        host = random.choice(HOSTS)
+        title = " ".join(random.sample(WORDS, 5)).title()
+        path = "/".join(random.sample(WORDS, 2))
+        when = now - random.random() * 365 * 24 * 3600
+        yield f"https://{host}/{path}/{i}", title, visit_score(when, random.random() < 0.05)
+
+
+def time_suggest(index):
+    print(f"{'query':14} {'ms':>7} {'results':>8}")
+    for query in QUERIES:
+        started = time.perf_counter()
+        for _ in range(20):
+            results = index.suggest(query)
+        elapsed = (time.perf_counter() - started) / 20 * 1000
+        print(f"{query!r:14} {elapsed:7.3f} {len(results):8}")
+
+
+def time_visits(index, run_on_main, pending):
+    index.run_on_main = run_on_main
+    worst = total = 0
+    visits = 2 * index.HOT_SIZE + 100
+    for i in range(visits):
+        started = time.perf_counter()
+        index.record_visit(f"https://fresh{i}.example.com/", f"Fresh page {i}")
+        elapsed = time.perf_counter() - started
+        while pending:
+            callback, args = pending.popleft()
+            started = time.perf_counter()
+            callback(*args)
+            elapsed += time.perf_counter() - started
+        worst = max(worst, elapsed)
+        total += elapsed
+    # Let the worker finish so the next run starts from a settled index
+    while index.rebalancing is not None:
+        time.sleep(0.01)
+        while pending:
+            callback, args = pending.popleft()
+            callback(*args)
+    return visits, total / visits * 1000, worst * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(1)
+    index = OmniboxIndex()
+    started = time.perf_counter()
+    index.build(rows(count))
+    print(f"built {count} URLs in {time.perf_counter() - started:.1f} s")
+    time_suggest(index)
+
+    pending = deque()
+    print(f"{'rebalance':10} {'visits':>7} {'mean ms':>8} {'worst ms':>9}")
+    visits, mean, worst = time_visits(index, None, pending)
+    print(f"{'inline':10} {visits:7} {mean:8.3f} {worst:9.1f}")
+    visits, mean, worst = time_visits(index, lambda callback, *args: pending.append((callback, args)), pending)
+    print(f"{'threaded':10} {visits:7} {mean:8.3f} {worst:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
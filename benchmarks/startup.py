@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure startup time and memory with tabs and the YouTube embed created lazily and eagerly.
+
+Starts the browser the way main() does, with the startup profiler on, and
+waits for the first paint and the main page load. That is the lazy row:
+what startup costs now. It then creates the WebViews the browser used to
+build up front (every unopened tab and the YouTube embed), waits for their
+pages too and reports the eager row; the difference is the work startup
+used to do. Memory is VmRSS of the browser process, as recorded in the
+trace, plus the RSS of its web processes.
+The trace is written to the path given, for a closer look in Perfetto.
+Needs a display and network access.
+
+Usage: python3 benchmarks/startup.py [trace path]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiler import profiler, vm_rss_mb
+from browser import Gdk, GLib, Gtk, WebBrowser, WebKit2
+from memory import MB, process_rss, web_processes
+
+
+def wait_for_loads(webviews, timeout=30):
+    loop = GLib.MainLoop()
+    pending = {webview for webview in webviews if webview.is_loading()}
+
+    def on_load_changed(webview, event):
+        if event == WebKit2.LoadEvent.FINISHED:
+            pending.discard(webview)
+            if not pending:
+                loop.quit()
+
+    handlers = [(webview, webview.connect("load-changed", on_load_changed)) for webview in pending]
+    if pending:
+        GLib.timeout_add_seconds(timeout, loop.quit)
+        loop.run()
+    for webview, handler in handlers:
+        webview.disconnect(handler)
+
+
+def web_process_rss_mb():
+    return sum(process_rss(pid) for pid in web_processes()) / MB
+
+
+def main():
+    trace_path = sys.argv[1] if len(sys.argv) > 1 else "startup-bench.json"
+    started = time.perf_counter()
+    os.environ['GDK_BACKEND'] = 'x11'
+    os.environ['WEBKIT_FORCE_ACCELERATED_COMPOSITING'] = '1'
+    profiler.begin("GTK init")
+    Gtk.init(None)
+    profiler.end("GTK init")
+    profiler.begin("WebBrowser")
+    window = WebBrowser(main_window=True)
+    profiler.end("WebBrowser")
+    window.override_background_color(Gtk.StateType.NORMAL, Gdk.RGBA(0, 0, 0, 0.65))
+
+    loop = GLib.MainLoop()
+
+    def on_first_draw(widget, cr):
+        widget.disconnect(first_draw)
+        profiler.end("first paint")
+        profiler.mark("first paint")
+        loop.quit()
+        return False
+
+    first_draw = window.connect("draw", on_first_draw)
+    profiler.begin("first paint")
+    window.show_all()
+    window.embed_view.hide()
+    window.statusbar.hide()
+    window.tab_manager.hide_inactive()
+    window.tab_menu.hide()
+    loop.run()
+    first_paint = time.perf_counter() - started
+
+    profiler.begin("main page load")
+    wait_for_loads([window.webview])
+    profiler.end("main page load")
+    rows = [("lazy", first_paint, time.perf_counter() - started, vm_rss_mb(), web_process_rss_mb())]
+
+    profiler.begin("eager views")
+    webviews = [tab.ensure_webview() for tab in window.tab_manager.tabs if tab.webview is None]
+    webviews.append(window.get_yt_embed())
+    wait_for_loads(webviews)
+    profiler.end("eager views")
+    rows.append(("eager", None, time.perf_counter() - started, vm_rss_mb(), web_process_rss_mb()))
+
+    profiler.save(trace_path)
+    print(f"{len(webviews)} views created on first use")
+    print(f"{'views':6} {'first paint s':>14} {'loaded s':>9} {'browser MB':>11} {'web procs MB':>13}")
+    for name, paint, loaded, rss, web_rss in rows:
+        paint = f"{paint:14.2f}" if paint is not None else f"{'':14}"
+        print(f"{name:6} {paint} {loaded:9.2f} {rss:11.1f} {web_rss:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,59 @@
 #!/usr/bin/env python3
+from profiler import profiler
+profiler.begin("imports")
+import argparse
 import gi
 import os
 import subprocess
 import json
 import time
-import requests
-from io import BytesIO
-from PIL import Image
 from pathlib import Path
-from explorer import FileExplorer
-import urllib
-from urllib.parse import urlparse
-import hashlib
+from history import NavigationStack, navigation_entry
+from history_service import history_service
+from favicons import favicon_service
+from tabs import TabManager
+from memory import MemoryGovernor
+from session import SessionJournal
+from http_client import http
+from assets import assets
+from styles import styles
+from content_rules import content_rules
+import urllib.parse
 
 gi.require_version('Gtk', '3.0')
 gi.require_version('WebKit2', '4.0')
-from gi.repository import Gtk, WebKit2, GLib, Gio, Gdk, GdkPixbuf, Pango
+from gi.repository import Gtk, WebKit2, GLib, Gio, Gdk, Pango
+profiler.end("imports")
+
+
+# Page a tab loads the first time it is opened
+TAB_START_URI = "https://www.google.com"
+
+# Internet toolbar menu: (label, url, fallback favicon domain), None for a separator
+INTERNET_LINKS = [
+    ("Youtube (VIDEO)", "https://youtube.com", "youtube.com"),
+    ("Discord (Social)", "https://discord.com/channels/@me", "discord.com"),
+    ("Reddit (Social)", "https://old.reddit.com", "reddit.com"),
+    ("Twitter (Social)", "https://x.com", "x.com"),
+    None,
+    ("GryPl (GAMES)", "https://gry.pl", "gry.pl"),
+    ("Aliexpress (SHOP)", "https://pl.aliexpress.com/", "aliexpress.com"),
+    ("Overleaf (TEX)", "https://www.overleaf.com/project", "overleaf.com"),
+    ("Github (DEV)", "https://github.com/", "github.com"),
+    None,
+    ("Wikipedia (INFO)", "https://en.wikipedia.org/wiki/Special:Random", "wikipedia.org"),
+    ("LKML (INFO)", "https://lkml.org", "error.com"),
+    None,
+    ("Pinterest (IMG)", "https://pl.pinterest.com/", "pinterest.com"),
+    ("Dan Booru (IMG)", "https://danbooru.donmai.us/posts", "danbooru.donmai.us"),
+    ("Civitai (IMG)", "https://civitai.com/home", "civitai.com"),
+    None,
+    ("ChatGPT (AI)", "https://chatgpt.com/", "chatgpt.com"),
+    ("Claude (AI)", "https://claude.ai/", "claude.ai"),
+    ("Deepseek (AI)", "https://chat.deepseek.com/", "deepseek.com"),
+    None,
+    ("Translate (TOOL)", "https://www.google.com/search?q=google+translate", "translate.google.com"),
+]
 
 
 class Bookmark:
@@ -90,26 +128,31 @@ class BookmarkManager:
         return any(b.url == url for b in self.bookmarks)
 
 class WebBrowser(Gtk.Window):
-    def __init__(self):
+    # Windows still open; the shared services are closed with the last one
+    open_windows = 0
+
+    def __init__(self, main_window=False):
         Gtk.Window.__init__(self, title="GTK Web Browser")
+        WebBrowser.open_windows += 1
 
         self.set_default_size(1200, 800)
 
         self.set_resizable(False)
 
 
-        self.connect("destroy", Gtk.main_quit)
+        self.connect("destroy", self.on_destroy)
         self.connect("button-press-event", self.on_button_press)
         self.connect("notify::uri", self.on_uri_changed)
-        self.win2=""
-        self.win2=""
+        # The file explorer is built on the first file view, see get_explorer()
+        self.win2 = None
+        self.explorer_parent = None
+        self.explorer_prewarm = None
         self.fileView = False
         self.forceWeb = False
         self.scroll=1
-        self.history = []
+        # In-session back/forward list, separate from the persistent history_store
+        self.history = NavigationStack()
         self.skipHistory=False
-        self.histPoint = 0
-
         # Set up data directory
         self.data_dir = os.path.join(os.path.expanduser("~"), ".gtk-web-browser")
         if not os.path.exists(self.data_dir):
@@ -118,7 +161,28 @@ class WebBrowser(Gtk.Window):
         # Initialize bookmark manager
         self.bookmark_manager = BookmarkManager(self.data_dir)
 
+        # Persistent global history and the address bar index, shared by every window
+        history_service.load(self.data_dir, self.bookmark_manager)
+        self.history_store = history_service.store
+        self.typed_navigation = False
+        self.connect("key-press-event", self.on_user_activity)
+        self.connect("key-press-event", self.on_key_press)
+        self.omnibox_typed = ""
+
+        # Pooled HTTP session shared by every window's background fetches
+        self.http = http
+
+        # Favicons are decoded once and kept in memory; see FaviconService for where they come from
+        favicon_service.load(os.path.join(self.data_dir, "favicon-cache"), self.http)
+        self.favicon_service = favicon_service
+        self.favicon_service.changed_callbacks.append(self.on_favicon_changed)
+        self.internet_links = list(INTERNET_LINKS)
+        self.internet_menu = None
+        self.internet_menu_links = None
+
         # Context with optimizations and cookie support
+        profiler.begin("WebContext setup")
+        MemoryGovernor.apply_webkit_settings()
         self.context = WebKit2.WebContext.get_default()
 
         # Enable disk cache for better performance
@@ -128,6 +192,10 @@ class WebBrowser(Gtk.Window):
         self.context.set_disk_cache_directory(cache_dir)
         self.context.set_cache_model(WebKit2.CacheModel.WEB_BROWSER)
 
+        # Sites' real favicons, recorded by WebKit as pages load
+        self.context.set_favicon_database_directory(os.path.join(self.data_dir, "favicons"))
+        self.favicon_service.attach_database(self.context.get_favicon_database())
+
         # Cookie manager setup
         cookie_manager = self.context.get_cookie_manager()
         cookies_path = os.path.join(self.data_dir, "cookies.db")
@@ -137,6 +205,13 @@ class WebBrowser(Gtk.Window):
         )
         cookie_manager.set_accept_policy(WebKit2.CookieAcceptPolicy.ALWAYS)
 
+        # Ad and tracker requests are dropped before they reach the network; the rules
+        # are compiled once for all windows and every view joins them when it is created
+        profiler.begin("content filters")
+        content_rules.load(self.data_dir)
+        profiler.end("content filters")
+        profiler.end("WebContext setup")
+
         # Enable transparency support for the window
         screen = self.get_screen()
         visual = screen.get_rgba_visual()
@@ -152,14 +227,8 @@ class WebBrowser(Gtk.Window):
         # Create WebView with optimized settings
         self.webview = self.create_optimized_webview(False)
         self.webview_org = self.webview
-        self.yt_embed = self.create_optimized_webview(True)
-
-        self.tabs = []
-        for c in range(3):
-            b = self.create_optimized_webview(True)
-            b.connect("load-changed", self.on_load_changed)
-            b.load_uri("https://www.google.com")
-            self.tabs.append(b)
+        # The YouTube embed view and the other tabs get their WebView on first use
+        self.yt_embed = None
 
         #self.setup_youtube_content_blocker(self.webview)
         #self.inject_youtube_optimizer(self.webview)
@@ -167,8 +236,6 @@ class WebBrowser(Gtk.Window):
         self.save_path = "/home/sheeye/Videos/Download/"
         context = self.webview.get_context()
         context.connect("download-started", self.on_download_started)
-        # Add this line after creating the webview
-        #self.setup_memory_management()
 
         # Menu Bar
         self.create_menu_bar(vbox)
@@ -206,36 +273,36 @@ class WebBrowser(Gtk.Window):
         scrolled_window.add(self.webview)
         scrolled_window2 = Gtk.ScrolledWindow()
         scrolled_window2.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-        scrolled_window2.add(self.yt_embed)
         self.embed_view = scrolled_window2
         self.normie_view = scrolled_window
 
-        self.yt_embed.load_uri("https://www.youtube.com")
-
         self.allWeb = scrolled_window
         vbox.pack_start(scrolled_window, True, True, 0)
         vbox.pack_start(scrolled_window2, True, True, 0)
 
-        self.tabs_views = []
-        for c in range(3):
-            scrolled_window2 = Gtk.ScrolledWindow()
-            scrolled_window2.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-            scrolled_window2.add(self.tabs[c])
-            vbox.pack_start(scrolled_window2, True, True, 0)
-            self.tabs_views.append(scrolled_window2)
+        self.tab_manager.add_primary(self.webview, scrolled_window, self.history)
+        # The main window journals its tabs; tabs from the last session are recreated once the window is complete
+        self.session_journal = None
+        session = None
+        if main_window:
+            self.session_journal = SessionJournal(self.data_dir, self.tab_manager.collect_session)
+            session = self.session_journal.load()
+        if session is None:
+            for c in range(3):
+                self.tab_manager.add(TAB_START_URI)
+        self.memory_governor = MemoryGovernor(self.tab_manager)
 
         # Status Bar
         self.statusbar = Gtk.Statusbar()
         self.statusbar_context = self.statusbar.get_context_id("status")
 
-        toolbar_style_provider_full = Gtk.CssProvider()
         css_full = """
                 * { /* Target the box directly */
                     background-color: white;
                     color: black
                 }
                 """
-        toolbar_style_provider_full.load_from_data(css_full.encode())
+        toolbar_style_provider_full = styles.provider(css_full)
         toolbar_context_full = self.statusbar.get_style_context()
         toolbar_context_full.add_provider(
             toolbar_style_provider_full,
@@ -246,44 +313,83 @@ class WebBrowser(Gtk.Window):
         vbox.pack_end(self.statusbar, False, False, 0)
 
         # Load default page
-        self.webview.load_uri("https://www.google.com")
+        if session is None:
+            self.webview.load_uri("https://www.google.com")
         #self.webview.connect("scroll-event", self.on_scroll_event)
         self.webview.connect("button-press-event", self.on_button_press)
-        self.set_icon_from_file("icon.png")
+        self.set_icon(assets.pixbuf("icon.png"))
 
         # Bookmark button state (will update when page loads)
         self.bookmark_button = None
 
-        start_path="/"
-        self.win2 = FileExplorer(start_path, vbox, self.url_entry, self)
+        self.explorer_parent = vbox
         self.prefetch_dns()
-        self.setup_content_filters()
-        self.setup_script_blocking()
-        self.webview=self.yt_embed
-        self.setup_content_filters()
-        self.setup_script_blocking()
-        self.webview=self.webview_org
+        # Views start out filtered; the menu item switches the one on screen
+        self.show_ad_blocking(self.webview)
         self.changed=1
+        if session is not None:
+            self.tab_manager.restore(session)
+        self.tab_manager.journal = self.session_journal
+
+    def get_explorer(self, start_path="/"):
+        """The file explorer; built on first use, since building it scans the drives and loads start_path"""
+        if self.explorer_prewarm is not None:
+            GLib.source_remove(self.explorer_prewarm)
+            self.explorer_prewarm = None
+        if self.win2 is None:
+            profiler.begin("FileExplorer")
+            # explorer.py is a large module that web-only sessions never need
+            from explorer import FileExplorer
+            self.win2 = FileExplorer(start_path, self.explorer_parent, self.url_entry, self)
+            profiler.end("FileExplorer")
+        return self.win2
+
+    def prewarm_explorer(self):
+        self.explorer_prewarm = None
+        self.get_explorer()
+        return False
+
+    def on_key_press(self, widget, event):
+        if self.changed>0:
+            if self.tab_manager.handle_key(event):
+                return True
+        if not self.fileView and event.keyval == Gdk.KEY_Tab:
+            if self.webview==self.webview_org:
+                self.changed*=-1
+                if self.changed<0:
+                    self.get_yt_embed()
+                    self.embed_view.show_all()
+                    self.nav_bar.hide()
+                    self.menu_bar.hide()
+                    self.full_tool.hide()
+                    self.tab_menu.hide()
+                    self.normie_view.hide()
+                else:
+                    self.embed_view.hide()
+                    self.normie_view.show_all()
+                    self.nav_bar.show_all()
+                    self.menu_bar.show_all()
+                    self.full_tool.show_all()
+                    self.tab_menu.show_all()
+        if self.fileView and self.win2 is not None:
+            return self.win2.on_key_press(widget, event)
+        return False
+
+    def get_yt_embed(self, uri="https://www.youtube.com"):
+        """The YouTube embed WebView; created on first use and loaded with uri"""
+        if self.yt_embed is None:
+            self.yt_embed = self.create_optimized_webview(True)
+            self.embed_view.add(self.yt_embed)
+            self.yt_embed.load_uri(uri)
+        return self.yt_embed
 
+    @profiler.traced
     def create_tabs(self, vbox):
 
         toolbar2 = Gtk.Toolbar()
         toolbar2.set_style(Gtk.ToolbarStyle.ICONS)
 
-        # Add "Address:" label
-        self.tab_labels = []
-        for c in range(4):
-            sort_sep =  Gtk.SeparatorToolItem()
-            toolbar2.insert(sort_sep, -1)
-            address_label_item = Gtk.ToolItem()
-            address_label = Gtk.Label(label="google.com")
-            self.tab_labels.append(address_label)
-            address_label.set_markup(f"{c+1}. www.google.com")
-            address_label_item.add(address_label)
-            toolbar2.insert(address_label_item, -1)
-        sort_sep = Gtk.SeparatorToolItem()
-        toolbar2.insert(sort_sep, -1)
-
+        self.tab_manager = TabManager(self, toolbar2, vbox, TAB_START_URI)
         self.tab_menu = toolbar2
 
         vbox.pack_start(toolbar2, False, True, 0)
@@ -388,6 +494,7 @@ class WebBrowser(Gtk.Window):
         menu.show_all()
         menu.popup_at_pointer(None)
 
+    @profiler.traced
     def create_optimized_webview(self,complementary, noBloc = False):
         # Create WebView with our context
         webview = WebKit2.WebView.new_with_context(self.context)
@@ -457,6 +564,7 @@ class WebBrowser(Gtk.Window):
         self.context.set_cache_model(WebKit2.CacheModel.WEB_BROWSER)
 
         webview.set_settings(settings)
+        content_rules.join(webview)
 
         return webview
     
@@ -497,20 +605,20 @@ class WebBrowser(Gtk.Window):
 
 
 
+    @profiler.traced
     def create_menu_bar(self, vbox):
         menubar = Gtk.MenuBar()
         self.menu_bar = menubar
         #menubar.override_background_color(Gtk.StateType.NORMAL,Gdk.RGBA(0,0,0,1))
         menubar.set_opacity(1)
 
-        toolbar_style_provider_full = Gtk.CssProvider()
         css_full = """
         * { /* Target the box directly */
             background-color: white;
             color: black
         }
         """
-        toolbar_style_provider_full.load_from_data(css_full.encode())
+        toolbar_style_provider_full = styles.provider(css_full)
         toolbar_context_full = menubar.get_style_context()
         toolbar_context_full.add_provider(
              toolbar_style_provider_full,
@@ -794,6 +902,11 @@ class WebBrowser(Gtk.Window):
         self.ad_blocking.connect("toggled", self.on_ad_blocking_toggled)
         tools_menu.append(self.ad_blocking)
 
+        # Page text indexing for history search
+        self.index_page_text = Gtk.CheckMenuItem(label="Index Page Text for History Search")
+        self.index_page_text.set_active(False)
+        tools_menu.append(self.index_page_text)
+
         # Help Menu
         help_menu = Gtk.Menu()
         help_item = Gtk.MenuItem(label="Help")
@@ -826,13 +939,14 @@ class WebBrowser(Gtk.Window):
 
         # Add bookmarks
         for bookmark in self.bookmark_manager.get_all_bookmarks():
-            item = Gtk.MenuItem(label=bookmark.title)
-            item.connect("activate", self.on_bookmark_clicked, bookmark.url)
+            item = self.create_menu_item_with_favicon(bookmark.title, bookmark.url, item_class=Gtk.MenuItem)
             menu.append(item)
 
         menu.show_all()
+        self.favicon_service.fetch_missing()
 
 
+    @profiler.traced
     def create_feature_toolbar(self, vbox):
 
         # Main container box for the toolbars (already a Box, keeping it)
@@ -842,13 +956,12 @@ class WebBrowser(Gtk.Window):
         #toolbar_main_container.set_opacity(0.85)
 
         # --- Styling for the main container (Optional, if you want its background styled) ---
-        toolbar_style_provider_full = Gtk.CssProvider()
         css_full = """
         box { /* Target the box directly */
             background-color: rgb(99,51,103); /* Example slightly different color */
         }
         """
-        toolbar_style_provider_full.load_from_data(css_full.encode())
+        toolbar_style_provider_full = styles.provider(css_full)
         toolbar_context_full = toolbar_main_container.get_style_context()
         toolbar_context_full.add_provider(
              toolbar_style_provider_full,
@@ -859,7 +972,6 @@ class WebBrowser(Gtk.Window):
         toolbar_blue = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)  # Added spacing
 
         # Style Provider for the blue box
-        toolbar_style_provider_blue = Gtk.CssProvider()
         css_blue = """
         /* Apply styles directly to the widget this provider is attached to */
         GtkBox {
@@ -877,7 +989,7 @@ class WebBrowser(Gtk.Window):
 
 
         """
-        toolbar_style_provider_blue.load_from_data(css_blue.encode())
+        toolbar_style_provider_blue = styles.provider(css_blue)
         toolbar_context_blue = toolbar_blue.get_style_context()
         toolbar_context_blue.add_provider(
             toolbar_style_provider_blue,
@@ -895,9 +1007,7 @@ class WebBrowser(Gtk.Window):
         new_window_button = Gtk.Button()
 
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("read2.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("read2.png")
             new_window_button.set_image(image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
@@ -921,9 +1031,7 @@ class WebBrowser(Gtk.Window):
         toolbar_blue.pack_start(new_tab_button, False, False, 0)
 
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("write2.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("write2.png")
             new_tab_button.set_image(image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
@@ -944,7 +1052,6 @@ class WebBrowser(Gtk.Window):
         toolbar_green = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)  # Added spacing
 
         # Style Provider for the green box
-        toolbar_style_provider_green = Gtk.CssProvider()
         css_green = """
         /* Apply styles directly to the widget this provider is attached to */
         GtkBox {
@@ -962,7 +1069,7 @@ class WebBrowser(Gtk.Window):
 
 
         """
-        toolbar_style_provider_green.load_from_data(css_green.encode())
+        toolbar_style_provider_green = styles.provider(css_green)
         toolbar_context_green = toolbar_green.get_style_context()
         toolbar_context_green.add_provider(
             toolbar_style_provider_green,
@@ -977,9 +1084,7 @@ class WebBrowser(Gtk.Window):
         # Add/Remove Bookmark Button (Using ToggleButton)
         self.bookmark_button = Gtk.ToggleButton()  # Use ToggleButton
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("save2.png")
-            # Scale pixbuf if needed
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("save2.png")
             self.bookmark_button.set_image(image)
         except GLib.Error as e:
             print(f"Warning: Could not load save.png: {e}")
@@ -998,9 +1103,7 @@ class WebBrowser(Gtk.Window):
         # History Button
         history_button = Gtk.Button()  # Create a standard button
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("history2.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("history2.png")
             history_button.set_image(image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
@@ -1018,9 +1121,7 @@ class WebBrowser(Gtk.Window):
         # Bookmarks Button
         bookmarks_button = Gtk.Button()
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("bookmarks2.png")
-            # Scale pixbuf if needed
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("bookmarks2.png")
             bookmarks_button.set_image(image)
         except GLib.Error as e:
             print(f"Warning: Could not load bookmarks.png: {e}")
@@ -1040,7 +1141,6 @@ class WebBrowser(Gtk.Window):
         toolbar_gray = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)  # Added spacing
 
         # Style Provider for the green box
-        toolbar_style_provider_gray = Gtk.CssProvider()
         css_gray = """
         /* Apply styles directly to the widget this provider is attached to */
         GtkBox {
@@ -1058,7 +1158,7 @@ class WebBrowser(Gtk.Window):
 
 
         """
-        toolbar_style_provider_gray.load_from_data(css_gray.encode())
+        toolbar_style_provider_gray = styles.provider(css_gray)
         toolbar_context_gray = toolbar_gray.get_style_context()
         toolbar_context_gray.add_provider(
             toolbar_style_provider_gray,
@@ -1071,9 +1171,7 @@ class WebBrowser(Gtk.Window):
         dev_tools_button = Gtk.Button()
 
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("internet2.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("internet2.png")
             dev_tools_button.set_image(image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
@@ -1096,9 +1194,7 @@ class WebBrowser(Gtk.Window):
         dev_tools_button = Gtk.Button()
 
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("channels2.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
+            image = assets.image("channels2.png")
             dev_tools_button.set_image(image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
@@ -1120,7 +1216,6 @@ class WebBrowser(Gtk.Window):
         toolbar_purple = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)  # Added spacing
 
         # Style Provider for the green box
-        toolbar_style_provider_purple = Gtk.CssProvider()
         css_purple = """
         /* Apply styles directly to the widget this provider is attached to */
         GtkBox {
@@ -1138,7 +1233,7 @@ class WebBrowser(Gtk.Window):
 
 
         """
-        toolbar_style_provider_purple.load_from_data(css_purple.encode())
+        toolbar_style_provider_purple = styles.provider(css_purple)
         toolbar_context_purple = toolbar_purple.get_style_context()
         toolbar_context_purple.add_provider(
             toolbar_style_provider_purple,
@@ -1153,9 +1248,7 @@ class WebBrowser(Gtk.Window):
             dev_tools_button = Gtk.Button()
 
             try:
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file(name)
-                # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-                image = Gtk.Image.new_from_pixbuf(pixbuf)
+                image = assets.image(name)
                 dev_tools_button.set_image(image)  # Set the image widget onto the button
             except GLib.Error as e:  # Catch file not found error
                 print(f"Warning: Could not load history.png: {e}")
@@ -1180,12 +1273,14 @@ class WebBrowser(Gtk.Window):
 
         # Developer Tools Button
         self.load_button = Gtk.Button()
+        # The load indicator swaps between these two images, see show_loading()
+        self.loading_image = None
+        self.loaded_image = None
 
         try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("loaded.png")
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
-            self.load_button.set_image(image)  # Set the image widget onto the button
+            self.loading_image = assets.animated_image("aol_loading_image.gif")
+            self.loaded_image = assets.image("loaded.png")
+            self.load_button.set_image(self.loaded_image)  # Set the image widget onto the button
         except GLib.Error as e:  # Catch file not found error
             print(f"Warning: Could not load history.png: {e}")
             dev_tools_button.set_label("Hist")  # Fallback text
@@ -1207,132 +1302,24 @@ class WebBrowser(Gtk.Window):
         vbox.pack_start(toolbar_main_container,False,False,0)
 
     def on_ad_blocking_toggled(self, widget):
-        """Toggle ad blocking on/off"""
-        # When toggling, we need to recreate the WebView to clear/add filters
-        scrolled_window = self.webview.get_parent()
-
-        # Remove old webview
-        c = self.webview
-        scrolled_window.remove(self.webview)
-
-        # Create new content manager and webview
-        self.content_manager = WebKit2.UserContentManager()
-
-        # Create a new WebView with the settings
-        self.webview = WebKit2.WebView.new_with_user_content_manager(self.content_manager)
-        if c==self.webview_org:
-            self.webview_org=self.webview
-
-        # Apply same settings as original webview
-        settings = self.webview.get_settings()
-        settings.set_property("enable-javascript", True)
-        settings.set_property("allow-file-access-from-file-urls", True)
-        settings.set_property("enable-developer-extras", True)
-        settings.set_property("enable-page-cache", True)
-        settings.set_property("enable-dns-prefetching", True)
-
-        # Mobile user agent if active
-        if hasattr(self, 'mobile_agent') and self.mobile_agent.get_active():
-            mobile_user_agent = "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/604.1"
-            settings.set_property("user-agent", mobile_user_agent)
-
-        # Connect signals
-        self.webview.connect("load-changed", self.on_load_changed)
-        #self.webview.connect("notify::uri", self.on_uri_changed)
-        self.webview.connect("decide-policy", self.on_decide_policy)
-        self.webview.connect("create", self.on_create_window)
-        self.webview.connect("notify::uri", self.on_uri_changed)
-        self.webview.connect("button-press-event", self.on_button_press)
-        context = self.webview.get_context()
-        context.connect("download-started", self.on_download_started)
-
-
-        # Add to container
-        scrolled_window.add(self.webview)
-        scrolled_window.show_all()
-
-        # Apply ad blocking if enabled
+        """Toggle ad blocking on/off for the current view"""
+        if getattr(self.webview, "ad_blocking", False) == widget.get_active():
+            # Set from show_ad_blocking, or toggled back and forth
+            return
+        content_rules.set_enabled(self.webview, widget.get_active())
         if widget.get_active():
-            self.setup_content_filters()
-            self.setup_script_blocking()
             self.statusbar.push(self.statusbar_context, "Ad blocking enabled")
         else:
             self.statusbar.push(self.statusbar_context, "Ad blocking disabled")
 
-        # Navigate to current URL or home
-        current_url = self.url_entry.get_text()
-        if current_url:
-            self.webview.load_uri(current_url)
-        else:
-            self.webview.load_uri("https://www.google.com")
-
-    def create_menu_item_with_favicon(self, label, url, favicon_url):
-        # Create cache directory if it doesn't exist
-        cache_dir = "/home/sheeye/Videos/Cache"
-        os.makedirs(cache_dir, exist_ok=True)
-
-        # Create a filename based on the domain name and favicon URL
-        domain = urlparse(favicon_url).netloc or urlparse(url).netloc
-        # Use hash to handle special characters and long URLs
-        url_hash = hashlib.md5(favicon_url.encode()).hexdigest()[:8]
-        favicon_filename = f"{domain}_{url_hash}.png"
-        favicon_path = os.path.join(cache_dir, favicon_filename)
+    def show_ad_blocking(self, webview):
+        """Make the menu item show whether webview is filtered"""
+        self.ad_blocking.set_active(getattr(webview, "ad_blocking", False))
 
+    def create_menu_item_with_favicon(self, label, url, fallback_domain=None, item_class=Gtk.RadioMenuItem):
         # Create a horizontal box to hold icon and label
         box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
-
-        try:
-            # Check if favicon exists in cache
-            if os.path.exists(favicon_path):
-                print(f"Using cached favicon for {label}")
-                # Load from cache
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                    favicon_path, 16, 16, True
-                )
-                icon = Gtk.Image.new_from_pixbuf(pixbuf)
-            else:
-                print(f"Downloading favicon for {label}")
-                # Download favicon
-                response = requests.get(favicon_url, timeout=5)
-                response.raise_for_status()
-
-                # Load image from bytes
-                image_data = BytesIO(response.content)
-                pil_image = Image.open(image_data)
-
-                # Resize to 16x16 (standard favicon size)
-                pil_image = pil_image.resize((16, 16), Image.Resampling.LANCZOS)
-
-                # Convert to RGB if necessary (remove alpha channel for PNG saving)
-                if pil_image.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    if pil_image.mode == 'RGBA':
-                        background.paste(pil_image, mask=pil_image.split()[-1])
-                    else:
-                        background.paste(pil_image)
-                    pil_image = background
-
-                # Save to cache
-                pil_image.save(favicon_path, format='PNG')
-                print(f"Saved favicon to cache: {favicon_path}")
-
-                # Convert PIL image to GdkPixbuf
-                image_bytes = BytesIO()
-                pil_image.save(image_bytes, format='PNG')
-                image_bytes.seek(0)
-
-                loader = GdkPixbuf.PixbufLoader.new_with_type('png')
-                loader.write(image_bytes.getvalue())
-                loader.close()
-                pixbuf = loader.get_pixbuf()
-
-                # Create GTK Image widget
-                icon = Gtk.Image.new_from_pixbuf(pixbuf)
-
-        except Exception as e:
-            print(f"Failed to load favicon for {label}: {e}")
-            # Use a default icon
-            icon = Gtk.Image.new_from_icon_name("applications-internet", Gtk.IconSize.MENU)
+        icon = self.favicon_service.image_for(url, fallback_domain)
 
         # Create label
         label_widget = Gtk.Label(label=label)
@@ -1344,179 +1331,36 @@ class WebBrowser(Gtk.Window):
         box.show_all()
 
         # Create menu item and add the box
-        menu_item = Gtk.RadioMenuItem()
+        menu_item = item_class()
         menu_item.add(box)
         menu_item.connect("activate", lambda x: self.load_url(url))
 
         return menu_item
 
 
-    def on_internet_clicked(self, button):
-        # Create a menu for internet options
+    def build_internet_menu(self, links):
         menu = Gtk.Menu()
-
-        # VIDEO section
-        youtube_item = self.create_menu_item_with_favicon(
-            "Youtube (VIDEO)",
-            "https://youtube.com",
-            "https://www.google.com/s2/favicons?domain=youtube.com"
-        )
-        menu.append(youtube_item)
-
-
-
-        # SOCIAL section
-        discord_item = self.create_menu_item_with_favicon(
-            "Discord (Social)",
-            "https://discord.com/channels/@me",
-            "https://www.google.com/s2/favicons?domain=discord.com"
-        )
-        menu.append(discord_item)
-
-        reddit_item = self.create_menu_item_with_favicon(
-            "Reddit (Social)",
-            "https://old.reddit.com",
-            "https://www.google.com/s2/favicons?domain=reddit.com"
-        )
-        menu.append(reddit_item)
-
-        twitter_item = self.create_menu_item_with_favicon(
-            "Twitter (Social)",
-            "https://x.com",
-            "https://www.google.com/s2/favicons?domain=x.com"
-        )
-        menu.append(twitter_item)
-
-        # Separator
-        sort_sep = Gtk.SeparatorMenuItem()
-        menu.append(sort_sep)
-
-
-        # GAMES section
-        grypl_item = self.create_menu_item_with_favicon(
-            "GryPl (GAMES)",
-            "https://gry.pl",
-            "https://www.google.com/s2/favicons?domain=gry.pl"
-        )
-        menu.append(grypl_item)
-
-        # SHOP section
-        aliexpress_item = self.create_menu_item_with_favicon(
-            "Aliexpress (SHOP)",
-            "https://pl.aliexpress.com/",
-            "https://www.google.com/s2/favicons?domain=aliexpress.com"
-        )
-        menu.append(aliexpress_item)
-
-        # TEX section
-        overleaf_item = self.create_menu_item_with_favicon(
-            "Overleaf (TEX)",
-            "https://www.overleaf.com/project",
-            "https://www.google.com/s2/favicons?domain=overleaf.com"
-        )
-        menu.append(overleaf_item)
-
-        # DEV section
-        github_item = self.create_menu_item_with_favicon(
-            "Github (DEV)",
-            "https://github.com/",
-            "https://www.google.com/s2/favicons?domain=github.com"
-        )
-        menu.append(github_item)
-
-
-
-
-
-
-        # Separator
-        sort_sep = Gtk.SeparatorMenuItem()
-        menu.append(sort_sep)
-
-        # INFO section
-        wikipedia_item = self.create_menu_item_with_favicon(
-            "Wikipedia (INFO)",
-            "https://en.wikipedia.org/wiki/Special:Random",
-            "https://www.google.com/s2/favicons?domain=wikipedia.org"
-        )
-        menu.append(wikipedia_item)
-
-
-        lkml_item = self.create_menu_item_with_favicon(
-            "LKML (INFO)",
-            "https://lkml.org",
-            "https://www.google.com/s2/favicons?domain=error.com"
-        )
-        menu.append(lkml_item)
-
-        # Separator
-        sort_sep = Gtk.SeparatorMenuItem()
-        menu.append(sort_sep)
-
-        # IMG section
-        pinterest_item = self.create_menu_item_with_favicon(
-            "Pinterest (IMG)",
-            "https://pl.pinterest.com/",
-            "https://www.google.com/s2/favicons?domain=pinterest.com"
-        )
-        menu.append(pinterest_item)
-
-        danbooru_item = self.create_menu_item_with_favicon(
-            "Dan Booru (IMG)",
-            "https://danbooru.donmai.us/posts",
-            "https://www.google.com/s2/favicons?domain=danbooru.donmai.us"
-        )
-        menu.append(danbooru_item)
-
-        civitai_item = self.create_menu_item_with_favicon(
-            "Civitai (IMG)",
-            "https://civitai.com/home",
-            "https://www.google.com/s2/favicons?domain=civitai.com"
-        )
-        menu.append(civitai_item)
-
-        # Separator
-        sort_sep = Gtk.SeparatorMenuItem()
-        menu.append(sort_sep)
-
-        # AI section
-        chatgpt_item = self.create_menu_item_with_favicon(
-            "ChatGPT (AI)",
-            "https://chatgpt.com/",
-            "https://www.google.com/s2/favicons?domain=chatgpt.com"
-        )
-        menu.append(chatgpt_item)
-
-        claude_item = self.create_menu_item_with_favicon(
-            "Claude (AI)",
-            "https://claude.ai/",
-            "https://www.google.com/s2/favicons?domain=claude.ai"
-        )
-        menu.append(claude_item)
-
-        deepseek_item = self.create_menu_item_with_favicon(
-            "Deepseek (AI)",
-            "https://chat.deepseek.com/",
-            "https://www.google.com/s2/favicons?domain=deepseek.com"
-        )
-        menu.append(deepseek_item)
-
-        # Separator
-        sort_sep = Gtk.SeparatorMenuItem()
-        menu.append(sort_sep)
-
-        # TOOL section
-        translate_item = self.create_menu_item_with_favicon(
-            "Translate (TOOL)",
-            "https://www.google.com/search?q=google+translate",
-            "https://www.google.com/s2/favicons?domain=translate.google.com"
-        )
-        menu.append(translate_item)
-
+        for link in links:
+            if link is None:
+                menu.append(Gtk.SeparatorMenuItem())
+            else:
+                menu.append(self.create_menu_item_with_favicon(*link))
         menu.show_all()
-        menu.popup_at_pointer(None)
-
+        return menu
 
+    def on_internet_clicked(self, button):
+        # The menu is built once and only rebuilt when its links change
+        if self.internet_menu is None or self.internet_menu_links != self.internet_links:
+            if self.internet_menu is not None:
+                # Lets the favicon service forget the old menu's images
+                self.internet_menu.destroy()
+            self.internet_menu = self.build_internet_menu(self.internet_links)
+            self.internet_menu_links = list(self.internet_links)
+        self.internet_menu.popup_at_pointer(None)
+        self.favicon_service.fetch_missing()
+
+
+    @profiler.traced
     def create_navigation_toolbar(self, vbox):
         toolbar = Gtk.Toolbar()
         toolbar.set_style(Gtk.ToolbarStyle.ICONS)
@@ -1528,8 +1372,7 @@ class WebBrowser(Gtk.Window):
         self.back_button = Gtk.ToolButton()
         #self.back_button.set_icon_name("history-back")
 
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file("left.png")
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = assets.image("left.png")
         image.show()  # Important: make the image visible
         self.back_button.set_icon_widget(image)
         self.back_button.set_tooltip_text("Go Back")
@@ -1540,8 +1383,7 @@ class WebBrowser(Gtk.Window):
         # Forward Button
         self.forward_button = Gtk.ToolButton()
         #self.forward_button.set_icon_name("history-forward")
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file("right.png")
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = assets.image("right.png")
         image.show()  # Important: make the image visible
         self.forward_button.set_icon_widget(image)
         self.forward_button.set_tooltip_text("Go Forward")
@@ -1552,8 +1394,7 @@ class WebBrowser(Gtk.Window):
         refresh_button = Gtk.ToolButton()
         #refresh_button.set_icon_name("document-refresh")
 
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file("refresh.png")
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = assets.image("refresh.png")
         image.show()  # Important: make the image visible
         refresh_button.set_icon_widget(image)
         refresh_button.set_tooltip_text("Refresh")
@@ -1563,8 +1404,7 @@ class WebBrowser(Gtk.Window):
         # Home Button
         home_button = Gtk.ToolButton()
         #home_button.set_icon_name("go-home")
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file("home.png")
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = assets.image("home.png")
         image.show()  # Important: make the image visible
         home_button.set_icon_widget(image)
         home_button.set_tooltip_text("Home")
@@ -1578,6 +1418,21 @@ class WebBrowser(Gtk.Window):
         # URL Entry
         self.url_entry = Gtk.Entry()
         self.url_entry.connect("activate", self.on_url_entry_activated)
+        self.url_entry.connect("changed", self.on_url_entry_changed)
+
+        # Suggestion dropdown fed from the shared omnibox index
+        # Columns: Markup, URL
+        self.suggestion_store = Gtk.ListStore(str, str)
+        completion = Gtk.EntryCompletion()
+        completion.set_model(self.suggestion_store)
+        completion.set_match_func(lambda completion, key, iter: True)
+        completion.set_minimum_key_length(1)
+        renderer = Gtk.CellRendererText()
+        renderer.set_property("ellipsize", Pango.EllipsizeMode.END)
+        completion.pack_start(renderer, True)
+        completion.add_attribute(renderer, "markup", 0)
+        completion.connect("match-selected", self.on_suggestion_selected)
+        self.url_entry.set_completion(completion)
 
         # Create a tool item to hold the entry and set it to expand
         entry_item = Gtk.ToolItem()
@@ -1591,8 +1446,7 @@ class WebBrowser(Gtk.Window):
         go_button = Gtk.ToolButton()
         #go_button.set_icon_name("go-jump")
 
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file("go.png")
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = assets.image("go.png")
         image.show()  # Important: make the image visible
         go_button.set_icon_widget(image)
         go_button.set_tooltip_text("Go to URL")
@@ -1601,14 +1455,24 @@ class WebBrowser(Gtk.Window):
 
 
 
+    def on_destroy(self, widget):
+        if self.session_journal:
+            self.session_journal.close(self.tab_manager.session_state())
+        self.favicon_service.changed_callbacks.remove(self.on_favicon_changed)
+        WebBrowser.open_windows -= 1
+        if WebBrowser.open_windows == 0:
+            history_service.close()
+            self.favicon_service.shutdown()
+            self.http.close()
+            Gtk.main_quit()
+
     def on_new_window(self, widget):
         browser = WebBrowser()
         browser.show_all()
-        for c in browser.tabs_views:
-            c.hide()
+        browser.tab_manager.hide_inactive()
 
     def on_new_tab(self, widget):
-        self.statusbar.push(self.statusbar_context, "New Tab functionality not implemented")
+        self.tab_manager.add(TAB_START_URI, activate=True)
 
     def on_history(self, widget):
         self.statusbar.push(self.statusbar_context, "History functionality not implemented")
@@ -1670,47 +1534,42 @@ class WebBrowser(Gtk.Window):
         about_dialog.destroy()
 
     def on_back_clicked(self, widget):
-        urli = self.url_entry.get_text()
-        self.histPoint+=1
-
-        if self.histPoint>=len(self.history):
-            self.histPoint=len(self.history)-1
+        url = self.history.back()
+        if url is None:
+            return
         self.skipHistory=True
-        self.load_url(self.history[len(self.history)-1-self.histPoint])
-
-        new_urli = self.url_entry.get_text()
-        #self.win2.load_directory(self.history[len(self.history)-1-self.histPoint])
+        self.load_url(url)
         #self.skipHistory = True
         #self.win2.current_path=self.url_entry.get_text()
         #self.win2.on_refresh_clicked(None)
-        #print("GOING BACK",self.win2.current_path,self.url_entry.get_text(),self.history[len(self.history)-2-self.histPoint])
 
     def on_forward_clicked(self, widget):
-        urli = self.url_entry.get_text()
-        self.histPoint-=1
-        if self.histPoint<0:
-            self.histPoint=0
+        url = self.history.forward()
+        if url is None:
+            return
         self.skipHistory=True
-        self.load_url(self.history[len(self.history)-1-self.histPoint])
-        #self.win2.load_directory(self.history[len(self.history) - 1 - self.histPoint])
+        self.load_url(url)
         #self.win2.load_directory(self.win2.current_path)
         #self.win2.current_path=self.url_entry.get_text()
         #self.win2.on_refresh_clicked(None)
-        if self.win2.current_path!=self.url_entry.get_text():
+        if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
             #self.win2.current_path = self.url_entry.get_text()
             self.win2.load_directory(self.win2.current_path)
             print("DEB 1")
 
-        new_urli = self.url_entry.get_text()
-
     def on_refresh_clicked(self, widget):
         if not self.fileView:
             self.webview.reload()
         else:
-            self.win2.on_refresh_clicked(None)
+            self.get_explorer().on_refresh_clicked(None)
             #self.win2.load_directory(self.win2.current_path)
 
+    def on_user_activity(self, widget, event):
+        history_service.last_activity = time.monotonic()
+        return False
+
     def on_button_press(self, widget, event):
+        history_service.last_activity = time.monotonic()
         button_num = event.button
         #print("huh")
 
@@ -1731,73 +1590,105 @@ class WebBrowser(Gtk.Window):
         else:
             home = os.path.expanduser("~")
 
-            # Update history
-            if self.win2.history_pos < len(self.win2.history) - 1:
-                self.win2.history = self.win2.history[:self.win2.history_pos + 1]
-
-            self.win2.history.append(home)
-            self.win2.history_pos = len(self.win2.history) - 1
-
+            self.get_explorer().history.push(home)
             self.win2.load_directory(home)
             print("DEB 3")
-            #self.back_button.set_sensitive(len(self.win2.history) > 1)
-            #self.forward_button.set_sensitive(self.win2.history_pos < len(self.win2.history) - 1)
         #self.webview.override_background_color(Gtk.StateType.NORMAL, Gdk.RGBA(0, 0, 0, 0.65))
 
     def on_url_entry_activated(self, widget):
         if not self.fileView:
             url = self.url_entry.get_text()
+            self.typed_navigation = True
             self.load_url(url)
         else:
             url = self.url_entry.get_text()
-            self.win2.load_directory(url)
+            self.get_explorer().load_directory(url)
             print("DEB 4")
 
 
+    def on_url_entry_changed(self, entry):
+        text = entry.get_text()
+        previous = self.omnibox_typed
+        self.omnibox_typed = text
+        if self.fileView or not entry.has_focus():
+            return
+
+        self.suggestion_store.clear()
+        for suggestion in history_service.omnibox.suggest(text):
+            title = GLib.markup_escape_text(suggestion.title or suggestion.url)
+            url = GLib.markup_escape_text(suggestion.url)
+            self.suggestion_store.append([f"{title}\n<small>{url}</small>", suggestion.url])
+        entry.get_completion().complete()
+
+        # Only complete inline while the user is typing forward, never on delete
+        if len(text) > len(previous) and text.startswith(previous):
+            completed = history_service.omnibox.inline_completion(text)
+            if completed:
+                GLib.idle_add(self.apply_inline_completion, text, completed)
+
+    def apply_inline_completion(self, typed, completed):
+        if self.url_entry.get_text() == typed:
+            self.url_entry.handler_block_by_func(self.on_url_entry_changed)
+            self.url_entry.set_text(completed)
+            self.url_entry.select_region(len(typed), -1)
+            self.url_entry.handler_unblock_by_func(self.on_url_entry_changed)
+        return False
+
+    def on_suggestion_selected(self, completion, model, iter):
+        url = model.get_value(iter, 1)
+        self.url_entry.set_text(url)
+        self.typed_navigation = True
+        self.load_url(url)
+        return True
+
     def on_go_clicked(self, widget):
         if not self.fileView:
             url = self.url_entry.get_text()
+            self.typed_navigation = True
             self.load_url(url)
         else:
             url = self.url_entry.get_text()
-            self.win2.load_directory(url)
+            self.get_explorer().load_directory(url)
             print("DEB 5")
 
-    def update_tab_names(self):
-        for c in range(4):
-            name = ""
-            bold_start = ""
-            bold_end = ""
-            icona = ""
-            if c==0:
-                name=self.webview_org.get_uri()
-                if self.webview==self.webview_org:
-                    bold_start="<b>"
-                    bold_end="</b>"
-            else:
-                name=self.tabs[c-1].get_uri()
-                if self.webview==self.tabs[c-1]:
-                    bold_start="<b>"
-                    bold_end="</b>"
-            if name.startswith("file://") or name.startswith("/"):
-                icona = "📁 "
+    def update_tab_names(self, web_view=None):
+        """Refresh the tab strip; only web_view's tab if given"""
+        if web_view is None:
+            self.tab_manager.refresh()
+        else:
+            tab = self.tab_manager.tab_for(web_view)
+            if tab:
+                self.tab_manager.refresh([tab])
+
+    def tab_label(self, tab, position, active):
+        """Markup and favicon for a tab's strip entry"""
+        name = tab.uri()
+        bold_start = ""
+        bold_end = ""
+        icona = ""
+        if active:
+            bold_start="<b>"
+            bold_end="</b>"
+        pixbuf = None
+        if name.startswith("file://") or name.startswith("/"):
+            icona = "📁 "
+        else:
+            pixbuf = self.favicon_service.cached(name)
+            icona = "" if pixbuf else "🌐 "
+            if bold_start=="":
+                if len(name)>25:
+                    name=name[:25]
             else:
-                icona = "🌐 "
-                new_name = ""
-                name_parts = name.split("/")
-                if bold_start=="":
-                    if len(name)>25:
-                        name=name[:25]
-                else:
-                    if len(name)>35:
-                        name=name[:35]
-
+                if len(name)>35:
+                    name=name[:35]
 
+        #numbers = ["¹","²","³","⁴"]
+        #<span size="x-large">{numbers[c]}</span>
+        name = GLib.markup_escape_text(name)
+        return f'<span size="larger"><sup>{position+1}</sup></span>{bold_start}{icona}{name}{bold_end}', pixbuf
 
-            #self.tab_labels[c].set_markup(f"{bold_start}{icona}{c + 1}. {name}{bold_end}")
-            #numbers = ["¹","²","³","⁴"]
-            #<span size="x-large">{numbers[c]}</span>
-            self.tab_labels[c].set_markup(f'<span size="larger"><sup>{c+1}</sup></span>{bold_start}{icona}{name}{bold_end}')
+    def on_favicon_changed(self, site):
+        self.update_tab_names()
 
     def fileViewSwitch(self):
         url = self.webview.get_uri()
@@ -1806,23 +1697,17 @@ class WebBrowser(Gtk.Window):
         else:
             self.fileView=False
 
+        tab = self.tab_manager.tab_for(self.webview)
         if(self.fileView):
-            self.win2.load_directory(url)
+            self.get_explorer().load_directory(url)
             self.win2.main_vertical_box.show_all()
-            if self.webview==self.webview_org:
-                self.normie_view.hide()
-            else:
-                for c in range(3):
-                    if self.webview==self.tabs[c]:
-                        self.tabs_views[c].hide()
+            if tab:
+                tab.view.hide()
         else:
-            if self.webview == self.webview_org:
-                self.normie_view.show_all()
-            else:
-                for c in range(3):
-                    if self.webview == self.tabs[c]:
-                        self.tabs_views[c].show_all()
-            self.win2.main_vertical_box.hide()
+            if tab:
+                tab.view.show_all()
+            if self.win2 is not None:
+                self.win2.main_vertical_box.hide()
 
     def load_url(self, url):
         self.set_resizable(True)
@@ -1900,34 +1785,18 @@ class WebBrowser(Gtk.Window):
                     # desktop_user_agent = "Mozilla/5.0 (X11; CrOS x86_64 14541.0.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
                     settings_yt.set_property("user-agent", desktop_user_agent)
                 else:
-                    temp = self.webview
-                    self.webview = self.yt_embed
-                    self.setup_content_filters()
-                    self.setup_script_blocking()
-                    selg.yt_embed = self.webview
-                    self.webview = self.webview_org
-
-            self.yt_embed.load_uri(new_uri)
+                    content_rules.set_enabled(self.yt_embed, True)
+
+            if self.yt_embed is None:
+                self.get_yt_embed(new_uri)
+            else:
+                self.yt_embed.load_uri(new_uri)
         #if uri.__contains__("old.reddit"):
         #    new_uri = new_uri.replace("old.", "")
         if not self.skipHistory:
-            url = web_view.get_uri()
-            if url.endswith("/"):
-                url = url[:len(url) - 1]
-            if url.startswith("file://"):
-                url = url.replace("file://", "")
-            self.history.insert(len(self.history) - self.histPoint, url)
-            if len(self.history) - self.histPoint-1>=1 and self.history[len(self.history)-self.histPoint-1]== self.history[len(self.history)-self.histPoint-2]:
-                self.history[len(self.history)-self.histPoint-2]="null"
-            newHist = []
-            for c in range(len(self.history)):
-                if self.history[c]!="null":
-                    newHist.append(self.history[c])
-            self.history = newHist
-            #self.history = list(dict.fromkeys(self.history))
-        #print(self.history)
+            self.history.push(navigation_entry(web_view.get_uri()))
         self.url_entry.set_text(uri)
-        #if self.win2.current_path != self.url_entry.get_text():
+        #if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
         #    #self.win2.current_path = self.url_entry.get_text()
         #    #self.win2.load_directory(self.url_entry.get_text())
         #    #print("DEB 6")
@@ -1936,7 +1805,8 @@ class WebBrowser(Gtk.Window):
         #print("of uri was loaded!!!",uri)
         self.skipHistory = False
 
-        self.update_tab_names()
+        self.update_tab_names(web_view)
+        self.tab_manager.changed()
 
 
         #if self.win2!="":
@@ -1947,14 +1817,20 @@ class WebBrowser(Gtk.Window):
             #self.win2.on_refresh_clicked(None)
             #print("win2 loaded",self.win2.current_path)
 
+    def show_loading(self, loading):
+        image = self.loading_image if loading else self.loaded_image
+        if image is not None and self.load_button.get_image() is not image:
+            self.load_button.set_image(image)
+
     def on_load_changed(self, web_view, load_event):
-        self.update_tab_names()
+        history_service.last_activity = time.monotonic()
+        self.update_tab_names(web_view)
         self.fileViewSwitch()
+        if load_event in (WebKit2.LoadEvent.STARTED, WebKit2.LoadEvent.COMMITTED):
+            # Again on commit, a redirect may have moved the view to another site
+            content_rules.navigate(web_view.get_uri())
         if load_event == WebKit2.LoadEvent.STARTED:
-            pixbuf = GdkPixbuf.PixbufAnimation.new_from_file("aol_loading_image.gif")
-            # pixbuf = pixbuf.scale_simple(38, 38, GdkPixbufAnimation.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_animation(pixbuf)
-            self.load_button.set_image(image)
+            self.show_loading(True)
 
             self.statusbar.push(self.statusbar_context, "Loading...")
             self.statusbar.show_all()
@@ -1962,7 +1838,7 @@ class WebBrowser(Gtk.Window):
             if not myori==web_view.get_uri() and not myori+"/"==web_view.get_uri() and not myori==web_view.get_uri()+"/":
                 if self.webview==web_view:
                     self.url_entry.set_text(web_view.get_uri())
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 # self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.url_entry.get_text())
                 print("DEB 8")
@@ -1973,15 +1849,12 @@ class WebBrowser(Gtk.Window):
 
             uri = web_view.get_uri()
             if uri:
-                pixbuf = GdkPixbuf.PixbufAnimation.new_from_file("aol_loading_image.gif")
-                # pixbuf = pixbuf.scale_simple(38, 38, GdkPixbufAnimation.InterpType.BILINEAR)
-                image = Gtk.Image.new_from_animation(pixbuf)
-                self.load_button.set_image(image)
+                self.show_loading(True)
 
                 myori = self.url_entry.get_text()
                 if not myori == web_view.get_uri() and not myori + "/" == web_view.get_uri() and not myori == web_view.get_uri() + "/":
                     self.url_entry.set_text(web_view.get_uri())
-                if self.win2.current_path != self.url_entry.get_text():
+                if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                     # self.win2.current_path = self.url_entry.get_text()
                     self.win2.load_directory(self.url_entry.get_text())
                     print("DEB 9")
@@ -2008,7 +1881,7 @@ class WebBrowser(Gtk.Window):
                 if not myori == web_view.get_uri() and not myori + "/" == web_view.get_uri() and not myori == web_view.get_uri() + "/":
                     if self.webview==web_view:
                         self.url_entry.set_text(web_view.get_uri())
-                if self.win2.current_path != self.url_entry.get_text():
+                if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                     # self.win2.current_path = self.url_entry.get_text()
                     self.win2.load_directory(self.url_entry.get_text())
                     print("DEB 10")
@@ -2018,29 +1891,38 @@ class WebBrowser(Gtk.Window):
                 self.statusbar.push(self.statusbar_context, f"Loading: {uri}")
                 self.statusbar.show_all()
                 self.update_bookmark_button_state()
+
+                if uri.startswith(("http://", "https://")):
+                    typed = self.typed_navigation and web_view == self.webview
+                    self.history_store.record_visit(uri, web_view.get_title() or "", typed)
+                    history_service.omnibox.record_visit(uri, web_view.get_title() or "", typed)
+                if web_view == self.webview:
+                    self.typed_navigation = False
         elif load_event == WebKit2.LoadEvent.FINISHED:
             #self.webview.override_background_color(Gtk.Statetype.Normal,Gdk.RGBA(0.7,0.7,0.7,0.6))
             self.statusbar.push(self.statusbar_context, "Ready")
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file("loaded.png")
             myori = self.url_entry.get_text()
             if not myori == web_view.get_uri() and not myori + "/" == web_view.get_uri() and not myori == web_view.get_uri() + "/":
                 if self.webview==web_view:
                     self.url_entry.set_text(web_view.get_uri())
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 # self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.url_entry.get_text())
                 print("DEB 11")
             #self.win2.load_directory(self.url_entry.get_text())
             self.statusbar.hide()
-            # Scale pixbuf if needed: pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
-            image = Gtk.Image.new_from_pixbuf(pixbuf)
-            self.load_button.set_image(image)  # Set the image widget onto the button
+            self.show_loading(False)
             self.update_bookmark_button_state()
+            if self.index_page_text.get_active():
+                self.capture_page_text(web_view)
+            if self.win2 is None and self.explorer_prewarm is None:
+                # Build the explorer once the page is up so the first file view opens without the wait
+                self.explorer_prewarm = GLib.idle_add(self.prewarm_explorer, priority=GLib.PRIORITY_LOW)
 
         # Update navigation buttons
             self.back_button.set_sensitive(True)
             self.forward_button.set_sensitive(True)
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 #self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.win2.current_path)
                 print("DEB 12")
@@ -2050,6 +1932,22 @@ class WebBrowser(Gtk.Window):
 
 
 
+    def capture_page_text(self, web_view):
+        """Send the visible text of a finished page to the history full-text index"""
+        uri = web_view.get_uri()
+        if not uri or not uri.startswith(("http://", "https://")):
+            return
+
+        def on_text(web_view, result, uri):
+            try:
+                text = web_view.run_javascript_finish(result).get_js_value().to_string()
+                self.history_store.set_page_text(uri, text)
+            except GLib.Error as e:
+                print(f"Could not extract page text: {e}")
+
+        script = "document.body ? document.body.innerText.slice(0, 20000) : ''"
+        web_view.run_javascript(script, None, on_text, uri)
+
     def set_opp(self, opp):
         self.webview.set_opacity(opp)
         self.inject_transparency_css()
@@ -2123,12 +2021,21 @@ class WebBrowser(Gtk.Window):
 
     def on_title_changed(self, web_view, param):
         # Update the window title with the page title
-        title = web_view.get_title()
+        title = self.record_title(web_view)
         if title:
             self.set_title(f"{title} - America Online")
         else:
             self.set_title("America Online")
 
+    def record_title(self, web_view):
+        """Store the page's title with its visit; visits are recorded at COMMITTED, usually before there is one"""
+        title = web_view.get_title()
+        uri = web_view.get_uri()
+        if title and uri and uri.startswith(("http://", "https://")):
+            self.history_store.update_title(uri, title)
+            history_service.omnibox.update_title(uri, title)
+        return title
+
     def on_decide_policy(self, web_view, decision, decision_type):
         if decision_type == WebKit2.PolicyDecisionType.NAVIGATION_ACTION:
             uri = decision.get_request().get_uri()
@@ -2169,7 +2076,7 @@ class WebBrowser(Gtk.Window):
             url_label = Gtk.Label(label="URL:")
             url_entry = Gtk.Entry()
             url_entry.set_text(uri)
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 # self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.url_entry.get_text())
                 PRINT("deb 13")
@@ -2186,6 +2093,7 @@ class WebBrowser(Gtk.Window):
                 new_url = url_entry.get_text()
                 if new_title and new_url:
                     is_new = self.bookmark_manager.add_bookmark(new_title, new_url)
+                    history_service.omnibox.add_bookmark(new_url, new_title)
                     if is_new:
                         self.statusbar.push(self.statusbar_context, f"Bookmark added: {new_title}")
                     else:
@@ -2200,7 +2108,7 @@ class WebBrowser(Gtk.Window):
         self.back_button.set_sensitive(True)
         self.forward_button.set_sensitive(True)
         if self.fileView:
-            self.win2.main_vertical_box.show_all()
+            self.get_explorer().main_vertical_box.show_all()
             self.allWeb.hide()
             self.win2.load_directory("/home/sheeye/Videos/Download/")
             self.back_button.set_sensitive(True)
@@ -2220,7 +2128,7 @@ class WebBrowser(Gtk.Window):
         self.back_button.set_sensitive(True)
         self.forward_button.set_sensitive(True)
         if self.fileView:
-            self.win2.main_vertical_box.show_all()
+            self.get_explorer().main_vertical_box.show_all()
             self.allWeb.hide()
             self.win2.load_directory(self.url_entry.get_text().replace("file://",""))
             self.back_button.set_sensitive(True)
@@ -2228,7 +2136,8 @@ class WebBrowser(Gtk.Window):
 
 
         else:
-            self.win2.main_vertical_box.hide()
+            if self.win2 is not None:
+                self.win2.main_vertical_box.hide()
             self.allWeb.show_all()
             #self.load_url(self.url_entry.get_text())
         if False:
@@ -2339,8 +2248,6 @@ class WebBrowser(Gtk.Window):
 
 
     def on_show_history(self, widget):
-        bookmarks = self.bookmark_manager.get_all_bookmarks()
-
         dialog = Gtk.Dialog(
             title="History",
             parent=self,
@@ -2354,26 +2261,26 @@ class WebBrowser(Gtk.Window):
         scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         scrolled_window.set_shadow_type(Gtk.ShadowType.ETCHED_IN)
 
-        # Create liststore model for bookmark data
-        # Columns: Title, URL, Date Added, (hidden) Bookmark Object
+        # Create liststore model for history data
+        # Columns: Title, URL, Weight, (hidden) back/forward index or None for search results
         liststore = Gtk.ListStore(str, str, Pango.Weight, object)
-
-        #bookmarks = [Bookmark("Absolute Terry Davis","https://yewtu.be/channel/UCuIUshnWOUD-a4d5Z54kj8A"),Bookmark("African Mann","https://inv.nadeko.net/channel/UCz2bxDAlwdvI8UKJS_W6CgQ"),Bookmark("Dhar Mann","https://inv.nadeko.net/channel/UC_hK9fOxyy_TM8FJGXIyG8Q"),Bookmark("Destiny","https://yewtu.be/channel/UC554eY5jNUfDq3yDOJYirOQ"),Bookmark("Shady Penguinn","https://yewtu.be/channel/UCU_mC__7H8NBJzX8ubMGY4Q"),Bookmark("No Text To Speech","https://inv.nadeko.net/channel/UCxaaULLk6UCnRl5VKRc7G0A")]
-        bookmarks = []
-        b = 0
-        for c in self.history:
-            if b == len(self.history) - 1 - self.histPoint:
-                adder = "👉 "
-                # Add bold formatting to the selected entry
-                bookmarks.append(Bookmark(f"{adder} {self.history[b]}", self.history[b], Pango.Weight.BOLD))
-            else:
-                adder = f"{b + 1}. "
-                bookmarks.append(Bookmark(f"{adder} {self.history[b]}", self.history[b], Pango.Weight.NORMAL))
-            b += 1
-        # Fill the liststore with bookmarks
-        for bookmark in bookmarks:
-            #date_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(bookmark.date_added))
-            liststore.append([bookmark.title, bookmark.url, bookmark.date_added, bookmark])
+        self.fill_history_liststore(liststore, "")
+
+        # Search entry (full-text search over the persistent history)
+        search_entry = Gtk.SearchEntry()
+        search_entry.set_placeholder_text("Search history")
+        search_entry.connect("search-changed", lambda entry: self.fill_history_liststore(liststore, entry.get_text()))
+        dialog.get_content_area().pack_start(search_entry, False, False, 0)
+
+        # Database size and what the last cleanup did
+        stats = f"History database: {self.history_store.database_size() / 1048576:.1f} MB"
+        run = self.history_store.last_maintenance()
+        if run:
+            stats += f" - last cleanup {time.strftime('%Y-%m-%d %H:%M', time.localtime(run.started))}: {run.summary()}"
+        stats_label = Gtk.Label(label=stats)
+        stats_label.set_line_wrap(True)
+        stats_label.set_xalign(0)
+        dialog.get_content_area().pack_start(stats_label, False, False, 0)
 
         # Create TreeView
         treeview = Gtk.TreeView(model=liststore)
@@ -2419,6 +2326,21 @@ class WebBrowser(Gtk.Window):
         # After dialog is closed, update the bookmarks menu
         self.update_bookmarks_menu()
 
+    def fill_history_liststore(self, liststore, query):
+        liststore.clear()
+        if not query.strip():
+            # No search: show the in-session back/forward list
+            for b, url in enumerate(self.history.entries()):
+                if b == self.history.cursor:
+                    # Add bold formatting to the selected entry
+                    liststore.append([f"👉  {url}", url, Pango.Weight.BOLD, b])
+                else:
+                    liststore.append([f"{b + 1}.  {url}", url, Pango.Weight.NORMAL, b])
+            return
+
+        for entry in self.history_store.search(query):
+            liststore.append([f"🌐  {entry.title or entry.url}", entry.url, Pango.Weight.NORMAL, None])
+
     def on_show_bookmarks(self, widget):
         bookmarks = self.bookmark_manager.get_all_bookmarks()
 
@@ -2601,6 +2523,7 @@ class WebBrowser(Gtk.Window):
             if title and url:
                 # Add to bookmark manager
                 is_new = self.bookmark_manager.add_bookmark(title, url)
+                history_service.omnibox.add_bookmark(url, title)
 
                 # Add to liststore
                 if is_new:
@@ -2648,7 +2571,7 @@ class WebBrowser(Gtk.Window):
             url_label = Gtk.Label(label="URL:")
             url_entry = Gtk.Entry()
             url_entry.set_text(bookmark.url)
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 # self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.url_entry.get_text())
             url_box.pack_start(url_label, False, False, 0)
@@ -2726,13 +2649,11 @@ class WebBrowser(Gtk.Window):
         model, iter = selection.get_selected()
 
         if iter is not None:
-            # Get the selected path
-            path = model.get_path(iter)
-            # Get the index from the path (first element of the tuple)
-            index = path.get_indices()[0]
-
-            self.skipHistory = True
-            self.histPoint = len(self.history) - 1 - index
+            # Back/forward entries jump within the list, search results are new navigations
+            index = model.get_value(iter, 3)
+            if index is not None:
+                self.skipHistory = True
+                self.history.go_to(index)
             url = model.get_value(iter, 1)
             self.load_url(url)
             treeview.get_toplevel().response(Gtk.ResponseType.CLOSE)
@@ -2784,9 +2705,9 @@ class WebBrowser(Gtk.Window):
         print(navigation_action.get_request().get_uri())
         browser = self.create_new_browser_window(navigation_action.get_request().get_uri())
         browser.show_all()
-        for c in browser.tabs_views:
-            c.hide()
-        browser.win2.main_vertical_box.hide()
+        browser.tab_manager.hide_inactive()
+        if browser.win2 is not None:
+            browser.win2.main_vertical_box.hide()
 
         #self.webview.load_uri(navigation_action.get_request().get_uri())
 
@@ -2883,181 +2804,6 @@ class WebBrowser(Gtk.Window):
         dialog.destroy()
         return result
 
-    def setup_content_filters(self):
-        """Set up content filters to block ads and tracking scripts using CSS"""
-        # Get the user content manager
-        content_manager = self.webview.get_user_content_manager()
-
-        # CSS to hide common ad elements
-        ad_blocking_css = """
-            /* Ad containers */
-            div[class*="ad-"],
-            div[class*="ad_"],
-            div[id*="ad-"],
-            div[id*="ad_"],
-            div[class*="ads-"],
-            div[class*="ads_"],
-            div[id*="ads-"],
-            div[id*="ads_"],
-            div[class*="advert"],
-            div[id*="advert"],
-            iframe[id*="ad_"],
-            iframe[id*="ad-"],
-            iframe[src*="ad_"],
-            iframe[src*="ad-"],
-
-            /* Banner containers */
-            div[class*="banner"],
-            div[id*="banner"],
-
-            /* Other common ad containers */
-            .advertisement,
-            .advertising,
-            .adsbygoogle,
-            .adsbox,
-
-            /* Cookie notices and popups */
-            div[class*="cookie-banner"],
-            div[class*="cookie-consent"],
-            div[class*="cookie-notice"],
-            div[class*="gdpr"],
-            div[class*="consent"],
-            div[class*="popup"],
-            div[id*="popup"],
-            div[class*="modal"][class*="overlay"],
-            div[class*="lightbox"],
-
-            /* Tracking pixels are usually hidden */
-            img[width="1"][height="1"],
-            iframe[width="1"][height="1"],
-
-            /* Social tracking widgets */
-            div[class*="share-buttons"],
-            div[id*="share-buttons"],
-            div[class*="social-buttons"],
-            div[id*="social-buttons"],
-
-            /* Newsletter signups and overlays */
-            div[class*="newsletter"],
-            div[id*="newsletter"],
-            div[class*="subscribe"],
-            div[id*="subscribe"],
-
-            /* Common ad networks */
-            iframe[src*="doubleclick.net"],
-            iframe[src*="googleadservices"],
-            iframe[src*="googlesyndication"],
-            iframe[src*="adservice.google"],
-            iframe[src*="amazon-adsystem"],
-            img[src*="ad.doubleclick.net"],
-            img[src*="googleadservices"],
-            img[src*="googlesyndication"],
-            img[src*="adservice.google"],
-            img[src*="amazon-adsystem"]
-            {
-                display: none !important;
-                opacity: 0 !important;
-                pointer-events: none !important;
-                height: 0 !important;
-                position: absolute !important;
-                z-index: -999 !important;
-            }
-        """
-
-        # Add the CSS as a user style sheet
-        content_manager.add_style_sheet(WebKit2.UserStyleSheet(
-            ad_blocking_css,
-            WebKit2.UserContentInjectedFrames.ALL_FRAMES,
-            WebKit2.UserStyleLevel.USER,
-            None,
-            None
-        ))
-
-        self.statusbar.push(self.statusbar_context, "Ad blocking CSS enabled")
-
-    def setup_script_blocking(self):
-        """Set up script blocking for common tracking scripts"""
-        content_manager = self.webview.get_user_content_manager()
-
-        # Create script blocking rules
-        script_block = """
-        (function() {
-            // Block common trackers by overriding their functions
-            const blockObject = function(obj) {
-                if (typeof obj === 'string') {
-                    try {
-                        // Handle dot notation by splitting
-                        const parts = obj.split('.');
-                        let current = window;
-
-                        // Navigate to the parent object
-                        for (let i = 0; i < parts.length - 1; i++) {
-                            if (current[parts[i]] === undefined) {
-                                return; // Object path doesn't exist
-                            }
-                            current = current[parts[i]];
-                        }
-
-                        // Replace the final property with a dummy function
-                        const lastPart = parts[parts.length - 1];
-                        if (current[lastPart]) {
-                            current[lastPart] = function() { return false; };
-                        }
-
-                        // Also try to intercept via Object.defineProperty if possible
-                        try {
-                            Object.defineProperty(current, lastPart, {
-                                get: function() { return function() { return false; }; },
-                                set: function() { return false; }
-                            });
-                        } catch(e) {}
-                    } catch(e) {}
-                }
-            };
-
-            // Block these common trackers
-            const trackers = [
-                'ga', 'gaData', 'GoogleAnalyticsObject', 'gtag', 
-                'fbq', 'fbevents', 'twttr.conversion', 'pintrk', 
-                'snaptr', '_qevents', 'heap', 'mixpanel', 'plausible',
-                '_hsq', 'hj', 'clarity'
-            ];
-
-            // Apply blocking
-            trackers.forEach(blockObject);
-
-            // Block common tracking URLs before they load
-            const observer = new MutationObserver(function(mutations) {
-                mutations.forEach(function(mutation) {
-                    if (mutation.type === 'childList') {
-                        mutation.addedNodes.forEach(function(node) {
-                            if (node.tagName === 'SCRIPT' || node.tagName === 'IMG' || node.tagName === 'IFRAME') {
-                                const src = node.src || '';
-                                if (src.match(/analytics|tracker|pixel|beacon|doubleclick|googleadservices|facebook.*\/tr|ads/i)) {
-                                    node.remove();
-                                }
-                            }
-                        });
-                    }
-                });
-            });
-
-            // Start observing the document for tracking scripts
-            observer.observe(document, { childList: true, subtree: true });
-        })();
-        """
-
-        # Add the script blocking as a user script
-        content_manager.add_script(WebKit2.UserScript(
-            script_block,
-            WebKit2.UserContentInjectedFrames.ALL_FRAMES,
-            WebKit2.UserScriptInjectionTime.START,
-            None,
-            None
-        ))
-
-        self.statusbar.push(self.statusbar_context, "Script blocking enabled")
-
     # Add this function to the WebBrowser class:
     def setup_memory_management(self):
         """Setup advanced memory management for the browser"""
@@ -3103,7 +2849,7 @@ class WebBrowser(Gtk.Window):
             #self.last_cleanup_position = y
             #self.perform_memory_cleanup()
             self.url_entry.set_text(self.webview.get_uri())
-            if self.win2.current_path != self.url_entry.get_text():
+            if self.win2 is not None and self.win2.current_path != self.url_entry.get_text():
                 # self.win2.current_path = self.url_entry.get_text()
                 self.win2.load_directory(self.url_entry.get_text())
             #self.win2.load_directory(self.url_entry.get_text())
@@ -3153,33 +2899,10 @@ class WebBrowser(Gtk.Window):
             print(f"Memory cleanup error: {e}")
         return False  # One-time execution
 
-    # Add this function for periodic memory cleanup
     def perform_memory_cleanup(self, widget):
-        """Perform periodic memory cleanup"""
-        # Only clean if the browser is still running
-        if not self.get_realized():
-            return False
-
-        # Run a lighter memory cleanup
-        script = """
-        // Clear console
-        console.clear();
-
-        // Clear timeout and intervals that are no longer needed
-        for (let i = 0; i < 1000; i++) {
-            window.clearTimeout(i);
-            window.clearInterval(i);
-        }
-
-        // Request garbage collection
-        if (window.gc) { window.gc(); }
-        """
-        try:
-            self.webview.evaluate_javascript(script, -1, None, None, None)
-        except:
-            pass
-
-        return True  # Continue the timer
+        """Hibernate every background tab now"""
+        self.memory_governor.check(force=True)
+        self.statusbar.push(self.statusbar_context, "Background tabs hibernated")
 
     def fix_youtube_seeking(self, webview):
         # This script detects seeking events and helps prevent freezing
@@ -3353,27 +3076,50 @@ class WebBrowser(Gtk.Window):
         #content_manager.add_filter(WebKit2.UserContentFilter.new("youtube-optimizer", blocker_rule))
 
 def main():
+    parser = argparse.ArgumentParser(description="GTK Web Browser")
+    parser.add_argument("--profile-startup", nargs="?", const="startup-trace.json", metavar="PATH",
+                        help="write startup phase timings as Chrome trace JSON (default: startup-trace.json)")
+    args, _ = parser.parse_known_args()
+    if not args.profile_startup:
+        profiler.stop()
+
     # Enable GTK application to use X11 backend for hardware acceleration
     os.environ['GDK_BACKEND'] = 'x11'
 
     # Enable WebKit hardware acceleration
     os.environ['WEBKIT_FORCE_ACCELERATED_COMPOSITING'] = '1'
     # Initialize GTK
+    profiler.begin("GTK init")
     Gtk.init(None)
+    profiler.end("GTK init")
 
     # Create and show the browser
-    browser = WebBrowser()
+    profiler.begin("WebBrowser")
+    browser = WebBrowser(main_window=True)
+    profiler.end("WebBrowser")
     browser.override_background_color(Gtk.StateType.NORMAL, Gdk.RGBA(0, 0, 0, 0.65))
+    if args.profile_startup:
+        def on_first_draw(widget, cr):
+            widget.disconnect(first_draw)
+            profiler.end("first paint")
+            profiler.mark("first paint")
+            GLib.idle_add(profiler.save, args.profile_startup)
+            return False
+        first_draw = browser.connect("draw", on_first_draw)
+        profiler.begin("first paint")
     browser.show_all()
     browser.embed_view.hide()
     browser.statusbar.hide()
-    browser.win2.main_vertical_box.hide()
-    for c in browser.tabs_views:
-        c.hide()
+    if browser.win2 is not None:
+        browser.win2.main_vertical_box.hide()
+    browser.tab_manager.hide_inactive()
     browser.tab_menu.hide()
     browser.resize(1200, 700)
 
     Gtk.main()
+    if args.profile_startup:
+        # Rewrite with the phases that ran after the first paint, e.g. lazily built views
+        profiler.save(args.profile_startup)
 
 if __name__ == "__main__":
     main()
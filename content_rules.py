@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os
+
+import gi
+
+gi.require_version('WebKit2', '4.0')
+from gi.repository import WebKit2
+
+from adblock import ContentBlocker, default_rules
+from filterlists import CosmeticFilter, FilterLists
+
+# Stubs out the common trackers' APIs and drops tracking tags added later on
+TRACKER_SCRIPT = """
+(function() {
+    // Block common trackers by overriding their functions
+    const blockObject = function(obj) {
+        if (typeof obj === 'string') {
+            try {
+                // Handle dot notation by splitting
+                const parts = obj.split('.');
+                let current = window;
+
+                // Navigate to the parent object
+                for (let i = 0; i < parts.length - 1; i++) {
+                    if (current[parts[i]] === undefined) {
+                        return; // Object path doesn't exist
+                    }
+                    current = current[parts[i]];
+                }
+
+                // Replace the final property with a dummy function
+                const lastPart = parts[parts.length - 1];
+                if (current[lastPart]) {
+                    current[lastPart] = function() { return false; };
+                }
+
+                // Also try to intercept via Object.defineProperty if possible
+                try {
+                    Object.defineProperty(current, lastPart, {
+                        get: function() { return function() { return false; }; },
+                        set: function() { return false; }
+                    });
+                } catch(e) {}
+            } catch(e) {}
+        }
+    };
+
+    // Block these common trackers
+    const trackers = [
+        'ga', 'gaData', 'GoogleAnalyticsObject', 'gtag', 
+        'fbq', 'fbevents', 'twttr.conversion', 'pintrk', 
+        'snaptr', '_qevents', 'heap', 'mixpanel', 'plausible',
+        '_hsq', 'hj', 'clarity'
+    ];
+
+    // Apply blocking
+    trackers.forEach(blockObject);
+
+    // Block common tracking URLs before they load
+    const observer = new MutationObserver(function(mutations) {
+        mutations.forEach(function(mutation) {
+            if (mutation.type === 'childList') {
+                mutation.addedNodes.forEach(function(node) {
+                    if (node.tagName === 'SCRIPT' || node.tagName === 'IMG' || node.tagName === 'IFRAME') {
+                        const src = node.src || '';
+                        if (src.match(/analytics|tracker|pixel|beacon|doubleclick|googleadservices|facebook.*\/tr|ads/i)) {
+                            node.remove();
+                        }
+                    }
+                });
+            }
+        });
+    });
+
+    // Start observing the document for tracking scripts
+    observer.observe(document, { childList: true, subtree: true });
+})();
+"""
+
+
+class ContentRules:
+    """The ad and tracker filtering every WebView in the process shares.
+
+    load() reads the filter lists, compiles the network rules and builds the
+    element-hiding sheets and the tracker script once; the main view, tabs,
+    the YouTube embed and popup windows are all filtered with those same
+    objects. Each view keeps its own UserContentManager so filtering can be
+    switched per view without a reload; whether it is on is kept on the view
+    as webview.ad_blocking. Views stop being tracked when they are destroyed.
+    """
+
+    def __init__(self):
+        self.content_blocker = None
+        self.filter_lists = None
+        self.cosmetic_filter = None
+        self.tracker_script = None
+
+    def load(self, data_dir):
+        """Set up the rules from data_dir; later calls, e.g. from popup windows, do nothing"""
+        if self.content_blocker is not None:
+            return
+        # Filter lists (EasyList and the like) placed in filter-lists/ add to the built-in rules
+        self.content_blocker = ContentBlocker(os.path.join(data_dir, "content-filters"))
+        self.filter_lists = FilterLists(os.path.join(data_dir, "filter-lists"), os.path.join(data_dir, "filter-cache"))
+        compiled_lists = self.filter_lists.load(default_rules())
+        self.content_blocker.load_source(compiled_lists.key, compiled_lists.network_source)
+        self.cosmetic_filter = CosmeticFilter(compiled_lists.cosmetic)
+        self.tracker_script = WebKit2.UserScript(
+            TRACKER_SCRIPT,
+            WebKit2.UserContentInjectedFrames.ALL_FRAMES,
+            WebKit2.UserScriptInjectionTime.START,
+            None,
+            None
+        )
+
+    def join(self, webview, enabled=True):
+        """Filter a new view; called for every WebView the browser creates"""
+        webview.connect("destroy", self.leave)
+        self.set_enabled(webview, enabled)
+
+    def leave(self, webview):
+        self.set_enabled(webview, False)
+
+    def set_enabled(self, webview, enabled):
+        """Add or remove the filters on the view's content manager; the page is not reloaded.
+
+        Element hiding changes on the page on screen right away, request
+        blocking and the tracker script from the next request and load on.
+        """
+        if getattr(webview, "ad_blocking", False) == enabled:
+            return
+        content_manager = webview.get_user_content_manager()
+        if enabled:
+            self.content_blocker.attach(content_manager)
+            # Site-specific hiding rules are added as views navigate, see navigate()
+            self.cosmetic_filter.attach(content_manager)
+            content_manager.add_script(self.tracker_script)
+        else:
+            self.content_blocker.detach(content_manager)
+            self.cosmetic_filter.detach(content_manager)
+            if hasattr(content_manager, "remove_script"):
+                content_manager.remove_script(self.tracker_script)
+            else:
+                # Before WebKitGTK 2.32 the only way is to drop every script and put back the others
+                content_manager.remove_all_scripts()
+                for script in getattr(content_manager, "user_scripts", ()):
+                    content_manager.add_script(script)
+        webview.ad_blocking = enabled
+
+    @staticmethod
+    def add_script(webview, script):
+        """Add one of the browser's own user scripts to webview.
+
+        Scripts added here rather than on the content manager directly are put
+        back when the tracker script is switched off on WebKitGTK before 2.32.
+        """
+        content_manager = webview.get_user_content_manager()
+        if not hasattr(content_manager, "user_scripts"):
+            content_manager.user_scripts = []
+        content_manager.user_scripts.append(script)
+        content_manager.add_script(script)
+
+    def navigate(self, uri):
+        self.cosmetic_filter.navigate(uri)
+
+
+content_rules = ContentRules()
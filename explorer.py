@@ -10,12 +10,28 @@ import hashlib
 import stat
 import time
 import gi
-import cv2
 import tempfile
+from assets import assets
+from history import NavigationStack
+from styles import styles
 
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GdkPixbuf, Gdk, Gio, GLib
 
+SIDEBAR_CSS = f"""
+box {{
+    background-image: url('{assets.uri("gradient.png")}');
+    background-repeat: repeat-y;
+}}
+"""
+
+DROP_HIGHLIGHT_CSS = """
+flowboxchild {
+    background-color: rgba(100, 149, 237, 0.3);
+    border: 1px solid #6495ED;
+}
+"""
+
 
 class FileExplorer(Gtk.Window):
     def __init__(self, start_path, window, nav_bar,transient):
@@ -30,8 +46,8 @@ class FileExplorer(Gtk.Window):
         # Initialize variables
         self.trans = transient
         self.current_path = os.path.expanduser("~") if not start_path else start_path
-        self.history = [self.current_path]
-        self.history_pos = 0
+        self.history = NavigationStack()
+        self.history.push(self.current_path)
 
         self.show_hidden = True
         self.show_backup = False
@@ -104,13 +120,12 @@ class FileExplorer(Gtk.Window):
         # Connect button-press-event to the flow box for right-click detection
         self.flow_box.connect("button-press-event", self.on_flow_box_button_press)
         scrolled_window.add(self.flow_box)
-        css_provider = Gtk.CssProvider()
         css = """
         flowbox {
             color: white;
         }
         """
-        css_provider.load_from_data(css.encode())
+        css_provider = styles.provider(css)
 
         # Apply CSS
         context = self.flow_box.get_style_context()
@@ -129,9 +144,7 @@ class FileExplorer(Gtk.Window):
         if window==0:
             # Connect key press event
             self.connect("key-press-event", self.on_key_press)
-        else:
-            transient.connect("key-press-event", self.on_key_press)
-            #transient.connect("button-press-event", self.on_button_press)
+        # Embedded, the browser's own key handler forwards file view keys here
 
         # Try to import Pango
         try:
@@ -489,7 +502,6 @@ class FileExplorer(Gtk.Window):
 
         # Store the last highlighted folder child during drag
         self.last_highlighted_child = None
-        self.last_highlight_css = None
 
         # For tracking whether we're the source of the drag
         self.is_drag_source = False
@@ -582,29 +594,11 @@ class FileExplorer(Gtk.Window):
 
     def highlight_child(self, child):
         # Apply highlight to indicate drop target
-        css_provider = Gtk.CssProvider()
-        css = """
-        flowboxchild {
-            background-color: rgba(100, 149, 237, 0.3);
-            border: 1px solid #6495ED;
-        }
-        """
-        css_provider.load_from_data(css.encode())
-
-        style_context = child.get_style_context()
-        style_context.add_provider(
-            css_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
-        # Store the provider for later removal
-        self.last_highlight_css = css_provider
+        styles.attach(child, DROP_HIGHLIGHT_CSS)
 
     def unhighlight_child(self, child):
         # Remove highlight
-        style_context = child.get_style_context()
-        if self.last_highlight_css:
-            style_context.remove_provider(self.last_highlight_css)
-            self.last_highlight_css = None
+        styles.detach(child, DROP_HIGHLIGHT_CSS)
 
     def on_drag_data_received(self, widget, drag_context, x, y, data, info, time):
         # Reset any highlight
@@ -752,19 +746,7 @@ class FileExplorer(Gtk.Window):
             self.file_details_box.hide()
 
             # Reset sidebar background
-            sidebar_style_provider = Gtk.CssProvider()
-            css = """
-            box {
-                background-image: url('gradient.png');
-                background-repeat: repeat-y;
-            }
-            """
-            sidebar_style_provider.load_from_data(css.encode())
-            sidebar_context = self.sidebar.get_style_context()
-            sidebar_context.add_provider(
-                sidebar_style_provider,
-                Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-            )
+            styles.attach(self.sidebar, SIDEBAR_CSS)
 
             self.selected_file_path = None
             return
@@ -826,19 +808,7 @@ class FileExplorer(Gtk.Window):
                 self.file_details_box.hide()
 
                 # Reset sidebar background
-                sidebar_style_provider = Gtk.CssProvider()
-                css = """
-                box {
-                    background-image: url('gradient.png');
-                    background-repeat: repeat-y;
-                }
-                """
-                sidebar_style_provider.load_from_data(css.encode())
-                sidebar_context = self.sidebar.get_style_context()
-                sidebar_context.add_provider(
-                    sidebar_style_provider,
-                    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-                )
+                styles.attach(self.sidebar, SIDEBAR_CSS)
 
     def get_default_app(self, file_path, content_type=None):
         """Get the default application name for a file"""
@@ -1148,33 +1118,32 @@ class FileExplorer(Gtk.Window):
     def make_section(self, name):
 
         # Set up CSS styling for buttons to remove hover/active effects
-        new_style_provider = Gtk.CssProvider()
-        css = """
-        box {
-            background-image: url('box.png');
+        css = f"""
+        box {{
+            background-image: url('{assets.uri("box.png")}');
             background-size: 100% 100%;
             font-size: 14px;
-        }
+        }}
 
 
-        button {
-            background-image: url('title.png');
+        button {{
+            background-image: url('{assets.uri("title.png")}');
             background-size: 100% 100%;
             font-size: 14px;
             border: none;
             box-shadow: none;
             text-shadow: none;
-        }
+        }}
 
-        button:hover, button:active, button:checked, button:selected {
-            background-image: url('title.png');
+        button:hover, button:active, button:checked, button:selected {{
+            background-image: url('{assets.uri("title.png")}');
             font-size: 14px;
             border: none;
             box-shadow: none;
             text-shadow: none;
-        }
+        }}
         """
-        new_style_provider.load_from_data(css.encode())
+        new_style_provider = styles.provider(css)
 
         section = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         section.set_margin_start(10)
@@ -1209,45 +1178,15 @@ class FileExplorer(Gtk.Window):
         sidebar.set_size_request(200, -1)
 
         # Set background image
-        sidebar_style_provider = Gtk.CssProvider()
-        css = """
-        box {
-            background-image: url('gradient.png');
-            background-repeat: repeat-y;
-        }
-        """
-        sidebar_style_provider.load_from_data(css.encode())
-        sidebar_context = sidebar.get_style_context()
-        sidebar_context.add_provider(
-            sidebar_style_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        styles.attach(sidebar, SIDEBAR_CSS)
         # Set up CSS styling for buttons to remove hover/active effects
-        new_style_provider = Gtk.CssProvider()
-        css = """
-        box {
-            background-image: url('box.png');
-            background-size: 100% 100%;
-        }
-
-
-        button {
-            background-image: url('title.png');
-            background-size: 100% 100%;
-            font-size: 13px;
-        }
-        """
-        new_style_provider.load_from_data(css.encode())
-
-        # Set up CSS styling for buttons to remove hover/active effects
-        sidebar_style_provider = Gtk.CssProvider()
-        css = """
-        box {
-            background-image: url('gradient.png');
+        css = f"""
+        box {{
+            background-image: url('{assets.uri("gradient.png")}');
             background-repeat: repeat-y;
-        }
+        }}
 
-        button {
+        button {{
             background-image: none;
             background-color: transparent;
             border: none;
@@ -1256,9 +1195,9 @@ class FileExplorer(Gtk.Window):
             margin-top: 3px;
             margin-bottom: 2px;
             text-shadow: none;
-        }
+        }}
 
-        button:hover, button:active, button:checked, button:selected {
+        button:hover, button:active, button:checked, button:selected {{
             background-image: none;
             background-color: transparent;
             font-size: 14px;
@@ -1267,9 +1206,9 @@ class FileExplorer(Gtk.Window):
             border: none;
             box-shadow: none;
             text-shadow: none;
-        }
+        }}
         """
-        sidebar_style_provider.load_from_data(css.encode())
+        sidebar_style_provider = styles.provider(css)
         sidebar_context = sidebar.get_style_context()
         sidebar_context.add_provider(
             sidebar_style_provider,
@@ -1708,14 +1647,6 @@ class FileExplorer(Gtk.Window):
             print("LOAD DIRECTORY ",self.current_path,path)
             self.current_path=path
             self.transient.on_uri_changed(self.transient.webview,"")
-            newHist = []
-            if False:
-                transient = self.trans
-                for c in range(len(transient.history)):
-                    if c == 0 or (transient.history[c] != transient.history[c - 1] and transient.history[c]+"/" != transient.history[c - 1] and transient.history[c] != transient.history[c - 1]+"/"):
-                        newHist.append(transient.history[c])
-                transient.history = newHist
-
 
         if not path.startswith(("/","~","file://")):
             #path="/home/sheeye/"
@@ -1738,20 +1669,7 @@ class FileExplorer(Gtk.Window):
         if path=="/":
             self.devices.show_all()
 
-
-        sidebar_style_provider = Gtk.CssProvider()
-        css = """
-        box {
-            background-image: url('gradient.png');
-            background-repeat: repeat-y;
-        }
-        """
-        sidebar_style_provider.load_from_data(css.encode())
-        sidebar_context = self.sidebar.get_style_context()
-        sidebar_context.add_provider(
-            sidebar_style_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        styles.attach(self.sidebar, SIDEBAR_CSS)
 
         # Make sure the flowbox is empty
         while self.flow_box.get_child_at_index(0) is not None:
@@ -1769,14 +1687,14 @@ class FileExplorer(Gtk.Window):
                 if self.trans.skipHistory:
                     self.trans.skipHistory = False
                 else:
-                    self.trans.history.insert(len(self.trans.history) - self.trans.histPoint,  path)
+                    self.trans.history.push(path)
                 try:
-                    subprocess.Popen(["aplay", "folder_opened.wav"], stdout=subprocess.DEVNULL,
+                    subprocess.Popen(["aplay", assets.path("folder_opened.wav")], stdout=subprocess.DEVNULL,
                                      stderr=subprocess.DEVNULL)
                 except:
                     # If aplay doesn't work, try paplay (PulseAudio)
                     try:
-                        subprocess.Popen(["paplay", "folder_opened.wav"], stdout=subprocess.DEVNULL,
+                        subprocess.Popen(["paplay", assets.path("folder_opened.wav")], stdout=subprocess.DEVNULL,
                                          stderr=subprocess.DEVNULL)
                     except:
                         pass  # Silently fail if the sound can't be played
@@ -2407,12 +2325,7 @@ class FileExplorer(Gtk.Window):
         path = box.path
 
         if box.is_dir:
-            # Update history
-            if self.history_pos < len(self.history) - 1:
-                self.history = self.history[:self.history_pos + 1]
-
-            self.history.append(path)
-            self.history_pos = len(self.history) - 1
+            self.history.push(path)
 
             # Navigate to directory
             print("DEB A")
@@ -2423,7 +2336,6 @@ class FileExplorer(Gtk.Window):
                 self.trans.fileView = False
                 self.trans.forceWeb = True
                 self.trans.load_url("file://"+path)
-                #self.trans.histPoint+=1
                 #subprocess.Popen(["xdg-open", path])
             except Exception as e:
                 self.show_error_dialog("Error opening file", str(e))
@@ -2800,13 +2712,7 @@ class FileExplorer(Gtk.Window):
         if os.path.isdir(os.path.expanduser(path)):
             path = os.path.expanduser(path)
 
-            # Update history
-            if self.history_pos < len(self.history) - 1:
-                self.history = self.history[:self.history_pos + 1]
-
-            self.history.append(path)
-            self.history_pos = len(self.history) - 1
-
+            self.history.push(path)
             self.load_directory(path)
         else:
             self.show_error_dialog("Invalid Path", f"The path '{path}' is not a valid directory")
@@ -2816,39 +2722,25 @@ class FileExplorer(Gtk.Window):
         self.go_back()
 
     def go_back(self):
-        if self.history_pos > 0:
-            self.history_pos -= 1
-            path = self.history[self.history_pos]
+        path = self.history.back()
+        if path is not None:
             self.load_directory(path)
 
     def on_forward_clicked(self, button):
-        if self.history_pos < len(self.history) - 1:
-            self.history_pos += 1
-            path = self.history[self.history_pos]
+        path = self.history.forward()
+        if path is not None:
             self.load_directory(path)
 
     def on_up_clicked(self, button):
         parent = os.path.dirname(self.current_path)
         if parent and parent != self.current_path:
-            # Update history
-            if self.history_pos < len(self.history) - 1:
-                self.history = self.history[:self.history_pos + 1]
-
-            self.history.append(parent)
-            self.history_pos = len(self.history) - 1
-
+            self.history.push(parent)
             self.load_directory(parent)
 
     def on_home_clicked(self, button):
         home = os.path.expanduser("~")
 
-        # Update history
-        if self.history_pos < len(self.history) - 1:
-            self.history = self.history[:self.history_pos + 1]
-
-        self.history.append(home)
-        self.history_pos = len(self.history) - 1
-
+        self.history.push(home)
         self.load_directory(home)
 
     def on_refresh_clicked(self, button):
@@ -2920,46 +2812,6 @@ class FileExplorer(Gtk.Window):
 
     def on_key_press(self, widget, event):
         print(event.keyval)
-        button_num = event.keyval
-        if self.transient.changed>0:
-            if button_num == 65470:
-                print("changed")
-                self.transient.webview = self.transient.webview_org
-                self.transient.normie_view.show_all()
-                for c in self.transient.tabs_views:
-                    c.hide()
-                self.transient.update_tab_names()
-                self.transient.tab_menu.show_all()
-                self.transient.fileViewSwitch()
-                return True
-            elif button_num > 65470 and button_num <= 65473:
-                print("changed")
-                for c in self.transient.tabs_views:
-                    c.hide()
-                self.transient.normie_view.hide()
-                self.transient.webview = self.transient.tabs[button_num-65471]
-                self.transient.tabs_views[button_num-65471].show_all()
-                self.transient.update_tab_names()
-                self.transient.tab_menu.show_all()
-                self.transient.fileViewSwitch()
-                return True
-        if not self.transient.fileView and event.keyval == Gdk.KEY_Tab:
-            if self.transient.webview==self.transient.webview_org:
-                self.transient.changed*=-1
-                if self.transient.changed<0:
-                    self.transient.embed_view.show_all()
-                    self.transient.nav_bar.hide()
-                    self.transient.menu_bar.hide()
-                    self.transient.full_tool.hide()
-                    self.transient.tab_menu.hide()
-                    self.transient.normie_view.hide()
-                else:
-                    self.transient.embed_view.hide()
-                    self.transient.normie_view.show_all()
-                    self.transient.nav_bar.show_all()
-                    self.transient.menu_bar.show_all()
-                    self.transient.full_tool.show_all()
-                    self.transient.tab_menu.show_all()
         if not self.transient.fileView:
             return False
 
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlparse
+
+import gi
+
+from http_client import ValidatorStore
+
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
+
+
+def favicon_cache_path(cache_dir, url, favicon_url):
+    """Cache file for a favicon, named after its domain plus a short hash of the favicon URL"""
+    domain = urlparse(favicon_url).netloc or urlparse(url).netloc
+    url_hash = hashlib.md5(favicon_url.encode()).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{domain}_{url_hash}.png")
+
+
+FAVICON_SIZE = 16
+
+
+def decode_favicon(content):
+    """Raw 16x16 RGBA pixels for a downloaded icon (PNG, ICO, GIF, SVG, ...), alpha kept"""
+    head = content[:256].lstrip()
+    if head.startswith(b"<svg") or head.startswith(b"<?xml"):
+        # PIL cannot rasterize SVG; GdkPixbuf can, straight at the target size
+        loader = GdkPixbuf.PixbufLoader()
+        loader.set_size(FAVICON_SIZE, FAVICON_SIZE)
+        loader.write(content)
+        loader.close()
+        pixbuf = loader.get_pixbuf()
+        if (pixbuf.get_width(), pixbuf.get_height()) != (FAVICON_SIZE, FAVICON_SIZE):
+            pixbuf = pixbuf.scale_simple(FAVICON_SIZE, FAVICON_SIZE, GdkPixbuf.InterpType.BILINEAR)
+        if not pixbuf.get_has_alpha():
+            pixbuf = pixbuf.add_alpha(False, 0, 0, 0)
+        pixels = pixbuf.get_pixels()
+        stride = pixbuf.get_rowstride()
+        return b"".join(pixels[y * stride:y * stride + FAVICON_SIZE * 4] for y in range(FAVICON_SIZE))
+
+    # PIL is only needed when an icon has to be downloaded, so it is not imported at startup
+    from PIL import Image
+    pil_image = Image.open(BytesIO(content)).convert("RGBA")
+    if pil_image.size != (FAVICON_SIZE, FAVICON_SIZE):
+        pil_image = pil_image.resize((FAVICON_SIZE, FAVICON_SIZE), Image.Resampling.LANCZOS)
+    return pil_image.tobytes()
+
+
+def pixbuf_from_rgba(rgba):
+    """Wrap decode_favicon() output in a pixbuf without another encode/decode round trip"""
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(rgba), GdkPixbuf.Colorspace.RGB, True, 8,
+        FAVICON_SIZE, FAVICON_SIZE, FAVICON_SIZE * 4
+    )
+
+
+def save_favicon(rgba, path):
+    """Store decode_favicon() output as PNG"""
+    # Write under a temporary name so readers never see a half-written file
+    tmp_path = path + ".tmp"
+    from PIL import Image
+    Image.frombytes("RGBA", (FAVICON_SIZE, FAVICON_SIZE), rgba).save(tmp_path, format='PNG')
+    os.replace(tmp_path, path)
+
+
+class FaviconFetcher:
+    """Downloads missing favicons in parallel on a small thread pool.
+
+    A batch shares one deadline: downloads that have not finished by then are
+    abandoned, so a slow or dead site can never hold up the rest of the menu.
+    Icons already on disk are revalidated with a conditional GET, so an
+    unchanged icon costs a 304 instead of a second download.
+    """
+
+    def __init__(self, cache_dir, http, workers=8, timeout=5, deadline=8):
+        self.cache_dir = cache_dir
+        self.http = http
+        self.timeout = timeout
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="favicon")
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.validators = ValidatorStore(os.path.join(cache_dir, "validators.json"))
+
+    def fetch_all(self, jobs, on_ready):
+        """Download each (favicon_url, path) job.
+
+        on_ready(favicon_url, path, rgba) is called from a worker thread for
+        every icon decoded before the deadline, with its raw 16x16 RGBA
+        pixels; the disk copy is written afterwards. URLs that are already
+        downloading are skipped.
+        """
+        deadline = time.monotonic() + self.deadline
+        for favicon_url, path in jobs:
+            with self.lock:
+                if favicon_url in self.in_flight:
+                    continue
+                self.in_flight.add(favicon_url)
+            self.executor.submit(self.fetch, favicon_url, path, deadline, on_ready)
+
+    def fetch(self, favicon_url, path, deadline, on_ready):
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            validators = self.validators.get(favicon_url) if os.path.exists(path) else None
+            response = self.http.conditional_get(favicon_url, validators, timeout=min(self.timeout, remaining))
+            if response.status_code == 304:
+                # Unchanged; the cached copy counts as fresh again
+                os.utime(path)
+                return
+            response.raise_for_status()
+            rgba = decode_favicon(response.content)
+            if time.monotonic() <= deadline:
+                on_ready(favicon_url, path, rgba)
+            save_favicon(rgba, path)
+            self.validators.update(favicon_url, response)
+        except Exception as e:
+            print(f"Failed to fetch favicon {favicon_url}: {e}")
+        finally:
+            with self.lock:
+                self.in_flight.discard(favicon_url)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def site_key(url):
+    """'https://www.github.com/foo' -> 'github.com'"""
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def surface_to_pixbuf(surface):
+    pixbuf = Gdk.pixbuf_get_from_surface(surface, 0, 0, surface.get_width(), surface.get_height())
+    if pixbuf is not None and (pixbuf.get_width(), pixbuf.get_height()) != (16, 16):
+        pixbuf = pixbuf.scale_simple(16, 16, GdkPixbuf.InterpType.BILINEAR)
+    return pixbuf
+
+
+class FaviconService:
+    """16x16 favicon pixbufs keyed by site.
+
+    Icons come from WebKit's favicon database, which is filled as pages load.
+    Only sites with an explicit fallback domain (the Internet menu links) go on
+    to the on-disk cache and the external favicon service, so browsing history
+    is never sent there. Each icon is decoded once and then served from memory.
+    All windows share one service (favicon_service), and with it the icons in
+    memory, the download pool and the stored validators.
+    """
+
+    FALLBACK_URL = "https://www.google.com/s2/favicons?domain={}"
+    # Cached fallback icons older than this are revalidated in the background
+    MAX_AGE = 7 * 24 * 3600
+
+    def __init__(self):
+        self.fetcher = None
+        self.database = None
+        self.pixbufs = {}
+        # site -> [page url, fallback domain] for sites whose favicon is still missing
+        self.waiting = {}
+        # site -> every image handed out for it, updated whenever its favicon changes
+        self.images = {}
+        # Called with the site key whenever a favicon arrives or changes
+        self.changed_callbacks = []
+
+    def load(self, cache_dir, http):
+        """Set up the on-disk cache and downloads; later calls, e.g. from popup windows, do nothing"""
+        if self.fetcher is None:
+            self.fetcher = FaviconFetcher(cache_dir, http)
+
+    def attach_database(self, database):
+        if database is self.database:
+            return
+        self.database = database
+        database.connect("favicon-changed", self.on_favicon_changed)
+
+    def fallback_url(self, domain):
+        return self.FALLBACK_URL.format(domain)
+
+    def cache_path(self, domain):
+        return favicon_cache_path(self.fetcher.cache_dir, "", self.fallback_url(domain))
+
+    def cached(self, url):
+        """The favicon for url's site if it is already in memory, else None"""
+        return self.pixbufs.get(site_key(url))
+
+    def image_for(self, url, fallback_domain=None):
+        """A Gtk.Image showing the favicon, or a placeholder that is filled in once fetch_missing() finds it"""
+        key = site_key(url)
+        pixbuf = self.pixbufs.get(key)
+        if pixbuf is not None:
+            image = Gtk.Image.new_from_pixbuf(pixbuf)
+        else:
+            image = Gtk.Image.new_from_icon_name("applications-internet", Gtk.IconSize.MENU)
+            entry = self.waiting.setdefault(key, [url, fallback_domain])
+            # Whichever caller knows a fallback domain, the site keeps it
+            if fallback_domain is not None:
+                entry[1] = fallback_domain
+        self.images.setdefault(key, []).append(image)
+        image.connect("destroy", self.on_image_destroyed, key)
+        return image
+
+    def on_image_destroyed(self, image, key):
+        images = self.images.get(key, [])
+        if image in images:
+            images.remove(image)
+
+    def fetch_missing(self):
+        """Look up favicons for every placeholder still waiting"""
+        for key, (url, _) in list(self.waiting.items()):
+            if self.database is not None:
+                self.database.get_favicon(url, None, self.on_database_favicon, key)
+            else:
+                self.fetch_fallback(key)
+
+    def on_database_favicon(self, database, result, key):
+        try:
+            surface = database.get_favicon_finish(result)
+        except GLib.Error:
+            surface = None
+        pixbuf = surface_to_pixbuf(surface) if surface is not None else None
+        if pixbuf is not None:
+            self.install(key, pixbuf)
+        elif key in self.waiting:
+            self.fetch_fallback(key)
+
+    def on_favicon_changed(self, database, page_uri, favicon_uri):
+        database.get_favicon(page_uri, None, self.on_database_favicon, site_key(page_uri))
+
+    def fetch_fallback(self, key):
+        domain = self.waiting[key][1]
+        if domain is None:
+            return
+        path = self.cache_path(domain)
+        if os.path.exists(path):
+            self.install_from_file(key, path)
+            if time.time() - os.path.getmtime(path) < self.MAX_AGE:
+                return
+
+        def on_ready(favicon_url, path, rgba):
+            GLib.idle_add(self.install_rgba, key, rgba)
+
+        self.fetcher.fetch_all([(self.fallback_url(domain), path)], on_ready)
+
+    def install_from_file(self, key, path):
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, 16, 16, True)
+        except GLib.Error as e:
+            print(f"Failed to load favicon for {key}: {e}")
+            return False
+        self.install(key, pixbuf)
+        return False
+
+    def install_rgba(self, key, rgba):
+        self.install(key, pixbuf_from_rgba(rgba))
+        return False
+
+    def install(self, key, pixbuf):
+        self.pixbufs[key] = pixbuf
+        self.waiting.pop(key, None)
+        for image in self.images.get(key, []):
+            image.set_from_pixbuf(pixbuf)
+        for callback in self.changed_callbacks:
+            callback(key)
+
+    def shutdown(self):
+        if self.fetcher is not None:
+            self.fetcher.shutdown()
+
+
+favicon_service = FaviconService()
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import gi
+
+gi.require_version('WebKit2', '4.0')
+from gi.repository import WebKit2
+
+from adblock import BlockRule, compile_rules
+
+HOST_ANCHOR = r"^[^:]+:(//)?([^/]+\.)?"
+# ABP's ^: anything but a letter, digit or one of _-.%
+SEPARATOR = "[^-.%a-zA-Z0-9_]"
+REGEX_SPECIAL = set(".+?()[]{}\\$|")
+
+ALL_TYPES = ["document", "image", "style-sheet", "script", "font", "raw", "svg-document", "media", "popup"]
+# ABP and uBlock option -> WebKit resource type
+TYPE_OPTIONS = {
+    "script": "script",
+    "image": "image",
+    "stylesheet": "style-sheet",
+    "css": "style-sheet",
+    "font": "font",
+    "media": "media",
+    "object": "raw",
+    "xmlhttprequest": "raw",
+    "xhr": "raw",
+    "websocket": "raw",
+    "ping": "raw",
+    "other": "raw",
+    "subdocument": "document",
+    "frame": "document",
+    "popup": "popup",
+}
+# Options that do not change what a rule matches here
+IGNORED_OPTIONS = {"important", "collapse", "~collapse", "all"}
+# Selectors using procedural or uBlock-only syntax are not CSS
+NON_CSS_SELECTOR = re.compile(r":(-abp-|has-text|upward|xpath|matches-|min-text-length|watch-attr|remove|style|others)")
+COSMETIC_SEPARATOR = re.compile(r"#@?[?$%]?#")
+
+# Element hiding that applies without any filter list. Only class, id and
+# tag-qualified selectors: substring matches on every div's class and id are
+# slow to match and hid cookie dialogs, modals and newsletters people wanted
+BUILTIN_COSMETIC_RULES = """
+##.advertisement
+##.advertising
+##.adsbygoogle
+##.adsbox
+##img[width="1"][height="1"]
+##iframe[width="1"][height="1"]
+##iframe[src*="doubleclick.net"]
+##iframe[src*="googleadservices"]
+##iframe[src*="googlesyndication"]
+##iframe[src*="adservice.google"]
+##iframe[src*="amazon-adsystem"]
+##img[src*="ad.doubleclick.net"]
+##img[src*="googleadservices"]
+##img[src*="googlesyndication"]
+##img[src*="adservice.google"]
+##img[src*="amazon-adsystem"]
+"""
+
+
+def translate_pattern(pattern):
+    """WebKit url-filter regex for an ABP pattern, None if it cannot be expressed"""
+    if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"):
+        # Regex filters use syntax (alternation, lookarounds) WebKit does not support
+        return None
+    if not pattern.isascii():
+        return None
+    regex = ""
+    host_anchored = pattern.startswith("||")
+    if host_anchored:
+        regex = HOST_ANCHOR
+        pattern = pattern[2:]
+    elif pattern.startswith("|"):
+        regex = "^"
+        pattern = pattern[1:]
+    end = ""
+    if pattern.endswith("|"):
+        end = "$"
+        pattern = pattern[:-1]
+    for i, c in enumerate(pattern):
+        if c == "*":
+            regex += ".*"
+        elif c == "^":
+            if i < len(pattern) - 1:
+                regex += SEPARATOR
+            elif host_anchored and "/" not in pattern:
+                # ||example.com^ : the host is always followed by a port or a path
+                regex += "[/:]"
+            # A trailing ^ elsewhere may also match the end of the URL, which WebKit cannot express
+            # without alternation; dropping it matches slightly more
+        elif c in REGEX_SPECIAL:
+            regex += "\\" + c
+        else:
+            regex += c
+    regex += end
+    if not host_anchored and not regex.startswith("^"):
+        while regex.startswith(".*"):
+            regex = regex[2:]
+    if not end:
+        while regex.endswith(".*"):
+            regex = regex[:-2]
+    return regex or ".*"
+
+
+def parse_domains(value, separator):
+    """(included, excluded) domains from "a.com|~b.com" style lists"""
+    included, excluded = [], []
+    for domain in value.split(separator):
+        domain = domain.strip().lower()
+        if not domain:
+            continue
+        if domain.startswith("~"):
+            excluded.append(domain[1:])
+        else:
+            included.append(domain)
+    if not all(domain.isascii() for domain in included + excluded):
+        return None
+    return included, excluded
+
+
+def parse_network_rule(line):
+    """BlockRule for one network filter line, None if it is unsupported"""
+    exception = line.startswith("@@")
+    if exception:
+        line = line[2:]
+    pattern, options = line, []
+    dollar = line.rfind("$")
+    if dollar >= 0 and not line.endswith("$") and "/" not in line[dollar:]:
+        pattern, options = line[:dollar], line[dollar + 1:].split(",")
+
+    types, negated_types = [], []
+    load_type = None
+    case_sensitive = False
+    domains = ([], [])
+    for option in options:
+        option = option.strip().lower()
+        name = option.lstrip("~")
+        if name in TYPE_OPTIONS:
+            (negated_types if option.startswith("~") else types).append(TYPE_OPTIONS[name])
+        elif option in ("third-party", "3p", "~first-party", "~1p"):
+            load_type = "third-party"
+        elif option in ("~third-party", "~3p", "first-party", "1p"):
+            load_type = "first-party"
+        elif option == "match-case":
+            case_sensitive = True
+        elif option.startswith("domain="):
+            domains = parse_domains(option[len("domain="):], "|")
+            if domains is None:
+                return None
+        elif option in ("document", "doc") and exception:
+            # @@||example.com^$document turns blocking off on example.com itself
+            host = pattern[2:].rstrip("^") if pattern.startswith("||") else ""
+            if not host or not re.fullmatch(r"[a-z0-9.-]+", host.lower()):
+                return None
+            return BlockRule(".*", "ignore-previous-rules", if_domain=[host.lower()])
+        elif option in ("document", "doc"):
+            types.append("document")
+        elif option in IGNORED_OPTIONS:
+            continue
+        else:
+            # csp=, redirect=, removeparam=, elemhide, generichide, ... have no WebKit equivalent
+            return None
+
+    url_filter = translate_pattern(pattern)
+    if url_filter is None:
+        return None
+    if negated_types and not types:
+        types = [t for t in ALL_TYPES if t not in negated_types]
+    elif negated_types:
+        types = [t for t in types if t not in negated_types]
+    included, excluded = domains
+    return BlockRule(
+        url_filter,
+        "ignore-previous-rules" if exception else "block",
+        resource_types=sorted(set(types)) or None,
+        load_type=load_type,
+        # WebKit takes either list, not both; the included domains are the tighter restriction
+        if_domain=included or None,
+        unless_domain=None if included else excluded or None,
+        case_sensitive=case_sensitive,
+    )
+
+
+class CosmeticRules:
+    """Element hiding rules (##selector) grouped by the domains they apply to.
+
+    Exceptions (#@#) are kept apart and only resolved by resolved(), so
+    they apply whichever order the rules came in.
+    """
+
+    def __init__(self):
+        # selector -> domains where it must not apply
+        self.generic = {}
+        # domain -> {selector: subdomains where it must not apply}
+        self.by_domain = {}
+        # domain -> selectors excepted there; "" excepts them everywhere
+        self.exceptions = {}
+
+    def add(self, domains, selector, exception):
+        if NON_CSS_SELECTOR.search(selector) or "{" in selector or "}" in selector:
+            return False
+        parsed = parse_domains(domains, ",")
+        if parsed is None:
+            return False
+        included, excluded = parsed
+        if exception:
+            for domain in included or [""]:
+                self.exceptions.setdefault(domain, set()).add(selector)
+        elif included:
+            for domain in included:
+                self.by_domain.setdefault(domain, {}).setdefault(selector, set()).update(
+                    d for d in excluded if d.endswith("." + domain))
+        else:
+            self.generic.setdefault(selector, set()).update(excluded)
+        return True
+
+    def merge(self, other):
+        for selector, excluded in other.generic.items():
+            self.generic.setdefault(selector, set()).update(excluded)
+        for domain, selectors in other.by_domain.items():
+            for selector, excluded in selectors.items():
+                self.by_domain.setdefault(domain, {}).setdefault(selector, set()).update(excluded)
+        for domain, selectors in other.exceptions.items():
+            self.exceptions.setdefault(domain, set()).update(selectors)
+
+    def resolved(self):
+        """[(domain or "", selector, excluded domains)] with the exceptions applied"""
+        excepted = {}
+        for domain, selectors in self.exceptions.items():
+            for selector in selectors:
+                excepted.setdefault(selector, set()).add(domain)
+        rules = []
+        for selector, excluded in self.generic.items():
+            domains = excepted.get(selector, set())
+            if "" not in domains:
+                rules.append(("", selector, excluded | domains))
+        for domain, selectors in self.by_domain.items():
+            for selector, excluded in selectors.items():
+                domains = excepted.get(selector, set())
+                if "" in domains or domain in domains:
+                    continue
+                rules.append((domain, selector, excluded | {d for d in domains if d.endswith("." + domain)}))
+        return rules
+
+    def to_json(self):
+        return {
+            "generic": {selector: sorted(excluded) for selector, excluded in self.generic.items()},
+            "by_domain": {domain: {selector: sorted(excluded) for selector, excluded in selectors.items()}
+                          for domain, selectors in self.by_domain.items()},
+            "exceptions": {domain: sorted(selectors) for domain, selectors in self.exceptions.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        rules = cls()
+        rules.generic = {selector: set(excluded) for selector, excluded in data["generic"].items()}
+        rules.by_domain = {domain: {selector: set(excluded) for selector, excluded in selectors.items()}
+                           for domain, selectors in data["by_domain"].items()}
+        rules.exceptions = {domain: set(selectors) for domain, selectors in data["exceptions"].items()}
+        return rules
+
+
+def style_sheet(selectors, domains=(), excluded=()):
+    """A UserStyleSheet hiding selectors, limited to domains (and their subdomains) if given"""
+    def url_patterns(hosts):
+        return [pattern for host in sorted(hosts) for pattern in (f"*://{host}/*", f"*://*.{host}/*")] or None
+
+    # One rule per selector: an invalid selector in a list would void the whole list
+    css = "".join(f"{selector}{{display:none!important}}\n" for selector in sorted(selectors))
+    return WebKit2.UserStyleSheet(
+        css,
+        WebKit2.UserContentInjectedFrames.ALL_FRAMES,
+        WebKit2.UserStyleLevel.USER,
+        url_patterns(domains),
+        url_patterns(excluded),
+    )
+
+
+class CosmeticFilter:
+    """Injects element hiding rules into UserContentManagers, scoped to the sites they are for.
+
+    Generic rules go into sheets shared by every page. Site-specific rules
+    are only turned into a sheet when a view navigates to that site, and the
+    sheet carries the site as its allow list, so other pages never match
+    against them. The MAX_SITE_SHEETS most recently visited sites keep
+    theirs; older ones are removed again.
+    """
+
+    MAX_SITE_SHEETS = 16
+
+    def __init__(self, rules):
+        generic = {}
+        # domain -> {excluded subdomains: selectors}
+        self.by_domain = {}
+        for domain, selector, excluded in rules.resolved():
+            if domain:
+                self.by_domain.setdefault(domain, {}).setdefault(tuple(sorted(excluded)), []).append(selector)
+            else:
+                generic.setdefault(tuple(sorted(excluded)), []).append(selector)
+        self.generic_sheets = [style_sheet(selectors, excluded=excluded) for excluded, selectors in generic.items()]
+        self.site_sheets = OrderedDict()
+        self.managers = []
+
+    def sheets(self):
+        return self.generic_sheets + [sheet for sheets in self.site_sheets.values() for sheet in sheets]
+
+    def attach(self, content_manager):
+        if content_manager in self.managers:
+            return
+        self.managers.append(content_manager)
+        for sheet in self.sheets():
+            content_manager.add_style_sheet(sheet)
+
+    def detach(self, content_manager):
+        if content_manager not in self.managers:
+            return
+        self.managers.remove(content_manager)
+        self.remove(content_manager, self.sheets())
+
+    def navigate(self, uri):
+        """Make sure the rules for uri's site are injected; cheap when they already are"""
+        host = urlparse(uri).hostname if uri else None
+        if not host:
+            return
+        parts = host.split(".")
+        for i in range(len(parts) - 1):
+            domain = ".".join(parts[i:])
+            if domain in self.site_sheets:
+                self.site_sheets.move_to_end(domain)
+            elif domain in self.by_domain:
+                sheets = [style_sheet(selectors, (domain,), excluded)
+                          for excluded, selectors in self.by_domain[domain].items()]
+                self.site_sheets[domain] = sheets
+                for manager in self.managers:
+                    for sheet in sheets:
+                        manager.add_style_sheet(sheet)
+        while len(self.site_sheets) > self.MAX_SITE_SHEETS:
+            _, sheets = self.site_sheets.popitem(last=False)
+            for manager in self.managers:
+                self.remove(manager, sheets)
+
+    def remove(self, content_manager, sheets):
+        if hasattr(content_manager, "remove_style_sheet"):
+            for sheet in sheets:
+                content_manager.remove_style_sheet(sheet)
+            return
+        # Before WebKitGTK 2.32 the only way is to drop every sheet and put back the others
+        content_manager.remove_all_style_sheets()
+        if content_manager in self.managers:
+            for sheet in self.sheets():
+                if sheet not in sheets:
+                    content_manager.add_style_sheet(sheet)
+
+
+def parse_filter_list(text):
+    """(network rules, CosmeticRules, number of skipped lines) for an EasyList/ABP/uBlock style list"""
+    network = []
+    cosmetic = CosmeticRules()
+    skipped = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("!") or line.startswith("["):
+            continue
+        match = COSMETIC_SEPARATOR.search(line)
+        if match:
+            separator = match.group()
+            # #?# procedural, #$# CSS injection and #%# scriptlet rules cannot be expressed as hiding CSS
+            if separator not in ("##", "#@#") or line[match.end():].startswith("+js(") \
+                    or not cosmetic.add(line[:match.start()], line[match.end():], separator == "#@#"):
+                skipped += 1
+            continue
+        rule = parse_network_rule(line)
+        if rule is None:
+            skipped += 1
+        else:
+            network.append(rule)
+    return network, cosmetic, skipped
+
+
+class CompiledLists:
+    def __init__(self, key, cosmetic, network_path):
+        self.key = key
+        self.cosmetic = cosmetic
+        self.network_path = network_path
+
+    def network_source(self):
+        with open(self.network_path, "r") as f:
+            return f.read()
+
+
+class FilterLists:
+    """Filter list files (*.txt) from lists_dir, parsed once per distinct content.
+
+    The parse results are cached in cache_dir under a hash of the list
+    files and the built-in rules: the content-blocker JSON in one file, the
+    cosmetic rules in another. When nothing changed, load() reads and hashes
+    the lists and loads the cosmetic rules; the network JSON is only read if
+    WebKit has no compiled filter for the same hash.
+    """
+
+    # Bump when the parser's output changes, so old caches are not reused
+    VERSION = 2
+
+    def __init__(self, lists_dir, cache_dir):
+        self.lists_dir = lists_dir
+        self.cache_dir = cache_dir
+        os.makedirs(lists_dir, exist_ok=True)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def paths(self):
+        return sorted(os.path.join(self.lists_dir, name) for name in os.listdir(self.lists_dir) if name.endswith(".txt"))
+
+    def load(self, builtin_rules):
+        """CompiledLists for the lists on disk plus builtin_rules, parsing only if the cache is stale"""
+        contents = [("built-in", BUILTIN_COSMETIC_RULES.encode())]
+        for path in self.paths():
+            try:
+                with open(path, "rb") as f:
+                    contents.append((os.path.basename(path), f.read()))
+            except OSError as e:
+                print(f"Error reading filter list {path}: {e}")
+        builtin = compile_rules(builtin_rules)
+        digest = hashlib.sha1(f"{self.VERSION}\0{builtin}".encode())
+        for name, data in contents:
+            digest.update(f"\0{name}\0{len(data)}\0".encode())
+            digest.update(data)
+        key = digest.hexdigest()[:16]
+
+        network_path = os.path.join(self.cache_dir, f"{key}.network.json")
+        cosmetic_path = os.path.join(self.cache_dir, f"{key}.cosmetic.json")
+        if os.path.exists(network_path) and os.path.exists(cosmetic_path):
+            try:
+                with open(cosmetic_path, "r") as f:
+                    return CompiledLists(key, CosmeticRules.from_json(json.load(f)), network_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading cached filter lists: {e}")
+
+        network = list(builtin_rules)
+        cosmetic = CosmeticRules()
+        for name, data in contents:
+            list_network, list_cosmetic, skipped = parse_filter_list(data.decode("utf-8", "replace"))
+            print(f"{name}: {len(list_network)} network rules, {skipped} lines skipped")
+            network += list_network
+            cosmetic.merge(list_cosmetic)
+        self.write(network_path, compile_rules(network))
+        self.write(cosmetic_path, json.dumps(cosmetic.to_json()))
+        self.remove_stale(key)
+        return CompiledLists(key, cosmetic, network_path)
+
+    def write(self, path, text):
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error caching filter lists: {e}")
+
+    def remove_stale(self, key):
+        for name in os.listdir(self.cache_dir):
+            if not name.startswith(key + "."):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# Frecency is kept as log(sum of decayed visit weights), measured against a
+# fixed epoch so that stored scores never need to be re-decayed: a newer
+# visit simply contributes a larger term.
+FRECENCY_EPOCH = 1700000000
+FRECENCY_HALF_LIFE = 30 * 24 * 3600
+FRECENCY_TYPED_BONUS = math.log(2)
+
+
+def visit_score(when, typed):
+    score = (when - FRECENCY_EPOCH) * math.log(2) / FRECENCY_HALF_LIFE
+    return score + FRECENCY_TYPED_BONUS if typed else score
+
+
+def frecency_add(frecency, when, typed):
+    """Fold one more visit into a stored frecency score"""
+    score = visit_score(when, typed)
+    if frecency is None:
+        return score
+    high, low = max(frecency, score), min(frecency, score)
+    return high + math.log1p(math.exp(low - high))
+
+
+def frecency_key(frecency):
+    """frecency as a fixed-point integer, fine enough to tell visits a second apart"""
+    return math.floor(frecency * 2 ** 32)
+
+
+def host_of(url):
+    return urlparse(url).hostname or ""
+
+
+def fts_query(text):
+    """Turn free text typed by the user into an FTS5 prefix query"""
+    terms = []
+    for word in text.split():
+        word = word.replace('"', '""')
+        terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+
+class HistoryStore:
+    """Persistent browsing history stored in an SQLite database inside the profile directory.
+
+    Writes are queued and committed in batches by a background thread, so
+    navigation never waits on the disk. Reads use their own connection,
+    which WAL mode lets run alongside the writer. Titles, URLs and
+    (optionally) page text are indexed with FTS5 for search.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS urls (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL DEFAULT '',
+        visit_count INTEGER NOT NULL DEFAULT 0,
+        last_visit REAL NOT NULL,
+        typed INTEGER NOT NULL DEFAULT 0,
+        frecency REAL,
+        seq INTEGER,
+        host TEXT NOT NULL DEFAULT ''
+    );
+    CREATE INDEX IF NOT EXISTS urls_last_visit ON urls(last_visit);
+    CREATE TABLE IF NOT EXISTS maintenance_log (
+        started REAL NOT NULL,
+        duration REAL NOT NULL,
+        steps INTEGER NOT NULL,
+        expired_age INTEGER NOT NULL,
+        expired_rows INTEGER NOT NULL,
+        expired_host INTEGER NOT NULL,
+        pages_freed INTEGER NOT NULL,
+        size_before INTEGER NOT NULL,
+        size_after INTEGER NOT NULL
+    );
+    """
+
+    # The FTS rowid is the url's frecency key (urls.seq, see frecency_key()),
+    # which a visit only ever raises. Searches walk the matches from the
+    # highest rowid down and stop after the first few, so they are ranked by
+    # frecency without reading every hit. Prefixes of up to 10 characters are
+    # indexed: a longer prefix, or one without an index, makes FTS5 collect
+    # every matching row before it can return the first.
+    FTS_SCHEMA = """
+    CREATE UNIQUE INDEX IF NOT EXISTS urls_seq ON urls(seq);
+    CREATE INDEX IF NOT EXISTS urls_frecency ON urls(frecency);
+    CREATE VIRTUAL TABLE urls_fts USING fts5(title, url, body, prefix='2 3 4 5 6 7 8 9 10');
+    CREATE TRIGGER urls_fts_delete AFTER DELETE ON urls BEGIN
+        DELETE FROM urls_fts WHERE rowid = old.seq;
+    END;
+    """
+    # PRAGMA user_version of databases whose FTS index is laid out as above
+    FTS_VERSION = 1
+
+    def __init__(self, data_dir, flush_interval=1.0, batch_size=500):
+        self.db_path = os.path.join(data_dir, "history.db")
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending = queue.Queue()
+        self.maintenance_job = None
+
+        self.conn = self.connect()
+        # Only takes effect for a new database; older ones switch on their first full VACUUM
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.executescript(self.SCHEMA)
+        self.migrate()
+        self.conn.commit()
+
+        self.writer = threading.Thread(target=self.writer_loop, name="history-writer", daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def migrate(self):
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(urls)")]
+        for column in ("frecency REAL", "seq INTEGER", "host TEXT NOT NULL DEFAULT ''"):
+            if column.split()[0] not in columns:
+                self.conn.execute(f"ALTER TABLE urls ADD COLUMN {column}")
+        if "host" not in columns:
+            rows = self.conn.execute("SELECT id, url FROM urls").fetchall()
+            self.conn.executemany("UPDATE urls SET host = ? WHERE id = ?", [(host_of(url), i) for i, url in rows])
+        self.conn.execute("CREATE INDEX IF NOT EXISTS urls_host ON urls(host, frecency)")
+        has_fts = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'urls_fts'"
+        ).fetchone()
+        if not has_fts or self.conn.execute("PRAGMA user_version").fetchone()[0] < self.FTS_VERSION:
+            self.rebuild_fts(has_fts)
+            self.conn.execute(f"PRAGMA user_version = {self.FTS_VERSION}")
+
+    def rebuild_fts(self, has_fts):
+        """(Re)create the FTS index keyed by frecency, keeping the page text already indexed"""
+        self.conn.execute("CREATE TEMP TABLE fts_bodies (id INTEGER PRIMARY KEY, body TEXT NOT NULL)")
+        if has_fts:
+            self.conn.execute(
+                "INSERT INTO fts_bodies SELECT u.id, f.body FROM urls u JOIN urls_fts f ON f.rowid = u.seq WHERE f.body != ''"
+            )
+            self.conn.executescript("""
+            DROP TRIGGER IF EXISTS urls_fts_delete;
+            DROP TABLE urls_fts;
+            DROP INDEX IF EXISTS urls_seq;
+            """)
+        updates = []
+        used = set()
+        for url_id, frecency, last_visit, typed in self.conn.execute("SELECT id, frecency, last_visit, typed FROM urls"):
+            if frecency is None:
+                frecency = visit_score(last_visit, typed)
+            seq = frecency_key(frecency)
+            while seq in used:
+                seq += 1
+            used.add(seq)
+            updates.append((frecency, seq, url_id))
+        self.conn.executemany("UPDATE urls SET frecency = ?, seq = ? WHERE id = ?", updates)
+        self.conn.executescript(self.FTS_SCHEMA)
+        self.conn.execute(
+            """
+            INSERT INTO urls_fts (rowid, title, url, body)
+            SELECT u.seq, u.title, u.url, COALESCE(b.body, '') FROM urls u LEFT JOIN fts_bodies b ON b.id = u.id
+            """
+        )
+        self.conn.execute("DROP TABLE fts_bodies")
+
+    def record_visit(self, url, title="", typed=False):
+        """Queue a visit to url; returns immediately"""
+        self.pending.put(("visit", url, title or "", 1 if typed else 0, time.time()))
+
+    def update_title(self, url, title):
+        if title:
+            self.pending.put(("title", url, title))
+
+    def set_page_text(self, url, text):
+        """Queue extracted page text for full-text indexing"""
+        if text:
+            self.pending.put(("text", url, text))
+
+    def run_maintenance(self, policy):
+        """Queue an expiry and compaction pass; it runs in small steps on the writer thread"""
+        if self.maintenance_job is None:
+            self.maintenance_job = MaintenanceJob(self, policy)
+            self.pending.put(("maintain", self.maintenance_job))
+
+    def database_size(self):
+        """Bytes on disk, including the write-ahead log"""
+        size = 0
+        for path in (self.db_path, self.db_path + "-wal"):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def last_maintenance(self):
+        row = self.conn.execute(
+            """
+            SELECT started, duration, steps, expired_age, expired_rows, expired_host, pages_freed, size_before, size_after
+            FROM maintenance_log ORDER BY started DESC LIMIT 1
+            """
+        ).fetchone()
+        return MaintenanceRun(*row) if row else None
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        done = threading.Event()
+        self.pending.put(("flush", done))
+        done.wait()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.pending.put(("stop",))
+            self.writer.join()
+        self.conn.close()
+
+    def writer_loop(self):
+        conn = self.connect()
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] not in ("flush", "stop", "maintain"):
+                try:
+                    batch.append(self.pending.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            try:
+                with conn:
+                    for op in batch:
+                        self.apply(conn, op)
+            except sqlite3.Error as e:
+                print(f"Error writing history: {e}")
+
+            for op in batch:
+                if op[0] == "maintain":
+                    # One small step per turn, so queued visits are never held up for long
+                    job = op[1]
+                    try:
+                        more = job.step(conn)
+                    except sqlite3.Error as e:
+                        print(f"Error during history maintenance: {e}")
+                        more = False
+                    if more:
+                        self.pending.put(op)
+                    else:
+                        self.maintenance_job = None
+                elif op[0] == "flush":
+                    op[1].set()
+                elif op[0] == "stop":
+                    running = False
+        conn.close()
+
+    def apply(self, conn, op):
+        if op[0] == "visit":
+            _, url, title, typed, when = op
+            row = conn.execute("SELECT id, seq, title, frecency FROM urls WHERE url = ?", (url,)).fetchone()
+            frecency = frecency_add(row[3] if row else None, when, typed)
+            seq = self.free_seq(conn, frecency)
+            if row is None:
+                conn.execute(
+                    """
+                    INSERT INTO urls (url, title, visit_count, last_visit, typed, frecency, seq, host)
+                    VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                    """,
+                    (url, title, when, typed, frecency, seq, host_of(url))
+                )
+                conn.execute(
+                    "INSERT INTO urls_fts (rowid, title, url, body) VALUES (?, ?, ?, '')",
+                    (seq, title, url)
+                )
+            else:
+                url_id, old_seq, old_title, _ = row
+                title = title or old_title
+                conn.execute(
+                    """
+                    UPDATE urls SET
+                        visit_count = visit_count + 1,
+                        last_visit = ?,
+                        typed = MAX(typed, ?),
+                        frecency = ?,
+                        title = ?,
+                        seq = ?
+                    WHERE id = ?
+                    """,
+                    (when, typed, frecency, title, seq, url_id)
+                )
+                conn.execute(
+                    "INSERT INTO urls_fts (rowid, title, url, body) SELECT ?, ?, url, body FROM urls_fts WHERE rowid = ?",
+                    (seq, title, old_seq)
+                )
+                conn.execute("DELETE FROM urls_fts WHERE rowid = ?", (old_seq,))
+        elif op[0] == "title":
+            _, url, title = op
+            row = conn.execute("SELECT seq FROM urls WHERE url = ? AND title != ?", (url, title)).fetchone()
+            if row:
+                conn.execute("UPDATE urls SET title = ? WHERE seq = ?", (title, row[0]))
+                conn.execute("UPDATE urls_fts SET title = ? WHERE rowid = ?", (title, row[0]))
+        elif op[0] == "text":
+            _, url, text = op
+            conn.execute(
+                "UPDATE urls_fts SET body = ? WHERE rowid = (SELECT seq FROM urls WHERE url = ?)",
+                (text, url)
+            )
+
+    @staticmethod
+    def free_seq(conn, frecency):
+        """The frecency key for a url, moved up past any other url that already has it"""
+        seq = frecency_key(frecency)
+        while conn.execute("SELECT 1 FROM urls WHERE seq = ?", (seq,)).fetchone():
+            seq += 1
+        return seq
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT url, title, visit_count, last_visit, typed FROM urls WHERE url = ?", (url,)
+        ).fetchone()
+        return HistoryEntry(*row) if row else None
+
+    def recent(self, limit=100):
+        rows = self.conn.execute(
+            "SELECT url, title, visit_count, last_visit, typed FROM urls ORDER BY last_visit DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def all_for_index(self):
+        """(url, title, frecency) for every url, for building in-memory indexes.
+
+        Uses its own connection so it can run on a background thread.
+        """
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT url, title, frecency FROM urls").fetchall()
+        finally:
+            conn.close()
+
+    def search(self, text, limit=50):
+        """Full-text search over titles, URLs and page text, best frecency first"""
+        query = fts_query(text)
+        if not query:
+            return []
+        try:
+            rows = self.conn.execute(
+                """
+                SELECT u.url, u.title, u.visit_count, u.last_visit, u.typed
+                FROM (
+                    SELECT rowid AS seq FROM urls_fts WHERE urls_fts MATCH ?
+                    ORDER BY rowid DESC LIMIT ?
+                ) hits
+                JOIN urls u ON u.seq = hits.seq
+                ORDER BY u.seq DESC
+                """,
+                (query, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching history: {e}")
+            return []
+        return [HistoryEntry(*row) for row in rows]
+
+
+class HistoryEntry:
+    def __init__(self, url, title, visit_count, last_visit, typed):
+        self.url = url
+        self.title = title
+        self.visit_count = visit_count
+        self.last_visit = last_visit
+        self.typed = bool(typed)
+
+
+def navigation_entry(uri):
+    """How a page is kept in a NavigationStack: without the trailing slash, files as plain paths"""
+    if uri.endswith("/"):
+        uri = uri[:len(uri) - 1]
+    if uri.startswith("file://"):
+        uri = uri.replace("file://", "")
+    return uri
+
+
+class NavigationStack:
+    """Capped back/forward list shared by web and file navigation.
+
+    Entries live in a fixed-size ring buffer so push, back and forward are
+    all O(1). Pushing while not at the newest entry drops the forward
+    entries, and when the buffer is full the oldest entry is overwritten.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.start = 0      # ring index of the oldest entry
+        self.size = 0       # entries in use, including forward entries
+        self.cursor = -1    # offset of the current entry from start
+
+    def __len__(self):
+        return self.size
+
+    def slot(self, offset):
+        return (self.start + offset) % self.capacity
+
+    def same(self, a, b):
+        # "example.com/" and "example.com" are the same page
+        return a is not None and b is not None and a.rstrip("/") == b.rstrip("/")
+
+    def current(self):
+        if self.cursor < 0:
+            return None
+        return self.slots[self.slot(self.cursor)]
+
+    def push(self, url):
+        """Make url the current entry; returns False if it was suppressed as a duplicate"""
+        if self.same(url, self.current()):
+            return False
+        if self.cursor + 1 < self.size and self.same(url, self.slots[self.slot(self.cursor + 1)]):
+            # Navigating to the page we just came back from keeps the forward list
+            self.cursor += 1
+            return False
+
+        if self.cursor + 1 == self.capacity:
+            self.slots[self.start] = None
+            self.start = (self.start + 1) % self.capacity
+            self.cursor -= 1
+        self.cursor += 1
+        self.slots[self.slot(self.cursor)] = url
+        # Forward entries past the new cursor are simply left unreachable
+        self.size = self.cursor + 1
+        return True
+
+    def can_go_back(self):
+        return self.cursor > 0
+
+    def can_go_forward(self):
+        return self.cursor + 1 < self.size
+
+    def back(self):
+        if not self.can_go_back():
+            return None
+        self.cursor -= 1
+        return self.current()
+
+    def forward(self):
+        if not self.can_go_forward():
+            return None
+        self.cursor += 1
+        return self.current()
+
+    def go_to(self, index):
+        """Jump to the entry at index (0 is the oldest) without changing the list"""
+        if not 0 <= index < self.size:
+            return None
+        self.cursor = index
+        return self.current()
+
+    def entries(self):
+        return [self.slots[self.slot(i)] for i in range(self.size)]
+
+    def to_dict(self):
+        return {"entries": self.entries(), "cursor": self.cursor}
+
+    @classmethod
+    def from_dict(cls, data, capacity=500):
+        stack = cls(capacity)
+        entries = data.get("entries", [])
+        dropped = max(len(entries) - capacity, 0)
+        entries = entries[dropped:]
+        stack.slots[:len(entries)] = entries
+        stack.size = len(entries)
+        stack.cursor = min(max(data.get("cursor", len(entries) - 1) - dropped, -1), len(entries) - 1)
+        return stack
+
+
+class RetentionPolicy:
+    """How much history to keep; None disables a limit"""
+
+    def __init__(self, max_age_days=180, max_rows=200000, max_per_host=5000):
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self.max_per_host = max_per_host
+
+
+class MaintenanceJob:
+    """Expires history according to a RetentionPolicy, then compacts the database.
+
+    Each call to step() does one bounded piece of work in its own short
+    transaction and returns True while there is more to do.
+    """
+
+    PHASES = ("age", "rows", "hosts", "optimize", "vacuum", "done")
+    VACUUM_PAGES = 256
+
+    def __init__(self, store, policy, batch_size=500):
+        self.store = store
+        self.policy = policy
+        self.batch_size = batch_size
+        self.phase = 0
+        self.hosts = None
+        self.started = time.time()
+        self.duration = 0.0
+        self.steps = 0
+        self.expired = {"age": 0, "rows": 0, "hosts": 0}
+        self.pages_freed = 0
+        self.size_before = store.database_size()
+
+    def step(self, conn):
+        began = time.perf_counter()
+        name = self.PHASES[self.phase]
+        finished = getattr(self, "step_" + name)(conn)
+        self.steps += 1
+        self.duration += time.perf_counter() - began
+        if finished:
+            self.phase += 1
+            if self.PHASES[self.phase] == "done":
+                self.finish(conn)
+                return False
+        return True
+
+    def delete(self, conn, select, params):
+        with conn:
+            deleted = conn.execute(f"DELETE FROM urls WHERE id IN ({select})", params).rowcount
+        return deleted
+
+    def step_age(self, conn):
+        if self.policy.max_age_days is None:
+            return True
+        cutoff = time.time() - self.policy.max_age_days * 24 * 3600
+        deleted = self.delete(conn, "SELECT id FROM urls WHERE last_visit < ? LIMIT ?", (cutoff, self.batch_size))
+        self.expired["age"] += deleted
+        return deleted < self.batch_size
+
+    def step_rows(self, conn):
+        if self.policy.max_rows is None:
+            return True
+        excess = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] - self.policy.max_rows
+        if excess <= 0:
+            return True
+        limit = min(excess, self.batch_size)
+        deleted = self.delete(conn, "SELECT id FROM urls ORDER BY frecency ASC LIMIT ?", (limit,))
+        self.expired["rows"] += deleted
+        return deleted == excess
+
+    def step_hosts(self, conn):
+        if self.policy.max_per_host is None:
+            return True
+        if self.hosts is None:
+            self.hosts = conn.execute(
+                "SELECT host, COUNT(*) - ? FROM urls GROUP BY host HAVING COUNT(*) > ?",
+                (self.policy.max_per_host, self.policy.max_per_host)
+            ).fetchall()
+        if not self.hosts:
+            return True
+        host, excess = self.hosts.pop()
+        limit = min(excess, self.batch_size)
+        deleted = self.delete(
+            conn, "SELECT id FROM urls WHERE host = ? ORDER BY frecency ASC LIMIT ?", (host, limit)
+        )
+        self.expired["hosts"] += deleted
+        if excess > limit:
+            self.hosts.append((host, excess - limit))
+        return not self.hosts
+
+    def step_optimize(self, conn):
+        if sum(self.expired.values()):
+            with conn:
+                conn.execute("INSERT INTO urls_fts (urls_fts) VALUES ('optimize')")
+        return True
+
+    def step_vacuum(self, conn):
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            return True
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            conn.execute(f"PRAGMA incremental_vacuum({self.VACUUM_PAGES})").fetchall()
+            self.pages_freed += min(free, self.VACUUM_PAGES)
+            return free <= self.VACUUM_PAGES
+        # Databases created before auto_vacuum was enabled need one full VACUUM to switch
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        self.pages_freed += free
+        return True
+
+    def finish(self, conn):
+        run = MaintenanceRun(
+            self.started, self.duration, self.steps, self.expired["age"], self.expired["rows"],
+            self.expired["hosts"], self.pages_freed, self.size_before, self.store.database_size()
+        )
+        with conn:
+            conn.execute(
+                "INSERT INTO maintenance_log VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run.started, run.duration, run.steps, run.expired_age, run.expired_rows,
+                 run.expired_host, run.pages_freed, run.size_before, run.size_after)
+            )
+        print(f"History maintenance: {run.summary()}")
+
+
+class MaintenanceRun:
+    def __init__(self, started, duration, steps, expired_age, expired_rows, expired_host,
+                 pages_freed, size_before, size_after):
+        self.started = started
+        self.duration = duration
+        self.steps = steps
+        self.expired_age = expired_age
+        self.expired_rows = expired_rows
+        self.expired_host = expired_host
+        self.pages_freed = pages_freed
+        self.size_before = size_before
+        self.size_after = size_after
+
+    def summary(self):
+        expired = self.expired_age + self.expired_rows + self.expired_host
+        return (f"expired {expired} urls (age {self.expired_age}, rows {self.expired_rows}, "
+                f"host {self.expired_host}), freed {self.pages_freed} pages in {self.steps} steps, "
+                f"{self.duration * 1000:.0f} ms of work, {self.size_before} -> {self.size_after} bytes")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+from gi.repository import GLib
+
+from history import HistoryStore, RetentionPolicy
+from omnibox import OmniboxIndex
+
+
+class HistoryService:
+    """The history database and address bar index every window shares.
+
+    load() opens the store, which migrates it, builds the omnibox index on a
+    worker thread and schedules maintenance; all of that happens once per
+    process, however many windows are opened. Every window marks user
+    activity in last_activity, so maintenance only runs while the whole
+    browser has been idle for a minute.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.omnibox = None
+        self.bookmark_manager = None
+        self.policy = RetentionPolicy()
+        self.last_activity = time.monotonic()
+        self.last_maintenance = 0
+
+    def load(self, data_dir, bookmark_manager):
+        """Open the history in data_dir; later calls, e.g. from popup windows, do nothing"""
+        if self.store is not None:
+            return
+        # Writes go through a background thread, see HistoryStore
+        self.store = HistoryStore(data_dir)
+        self.bookmark_manager = bookmark_manager
+        # The full index is built off the GTK thread; until then visits go into an empty one
+        self.omnibox = OmniboxIndex(GLib.idle_add)
+        threading.Thread(target=self.build_omnibox_index, daemon=True).start()
+        # Expire old history and compact the database while the user is idle
+        GLib.timeout_add_seconds(300, self.maybe_run_maintenance)
+
+    def build_omnibox_index(self):
+        index = OmniboxIndex(GLib.idle_add)
+        index.build(self.store.all_for_index())
+        GLib.idle_add(self.install_omnibox_index, index)
+
+    def install_omnibox_index(self, index):
+        if self.store is None:
+            return False
+        # Keep whatever was visited while the index was being built
+        for entry in self.omnibox.by_url.values():
+            index.record(entry.url, entry.title, entry.score)
+        for bookmark in self.bookmark_manager.get_all_bookmarks():
+            index.add_bookmark(bookmark.url, bookmark.title)
+        self.omnibox = index
+        return False
+
+    def maybe_run_maintenance(self):
+        if self.store is None:
+            return False
+        now = time.monotonic()
+        if now - self.last_activity > 60 and now - self.last_maintenance > 3600:
+            self.last_maintenance = now
+            self.store.run_maintenance(self.policy)
+        return True
+
+    def close(self):
+        """Flush and close the store; called when the last window is destroyed"""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+
+history_service = HistoryService()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+
+
+class HttpClient:
+    """Shared requests.Session for the browser's own background fetches.
+
+    Connections are kept alive and pooled per host. At most per_host
+    requests run against one host at a time, and further callers wait for a
+    free connection instead of opening new ones. The session, and with it
+    the requests module, is only set up by the first request.
+    """
+
+    USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AOL-Browser"
+
+    def __init__(self, per_host=4, pool_hosts=16):
+        self.per_host = per_host
+        self.pool_hosts = pool_hosts
+        self.session = None
+        self.lock = threading.Lock()
+
+    def open_session(self):
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.headers["User-Agent"] = self.USER_AGENT
+                adapter = HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.per_host, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def get(self, url, timeout=10, headers=None):
+        return self.open_session().get(url, timeout=timeout, headers=headers)
+
+    def conditional_get(self, url, validators=None, timeout=10):
+        """GET that sends If-None-Match/If-Modified-Since from validators; 304 means the cached copy is current"""
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        return self.get(url, timeout=timeout, headers=headers)
+
+    def close(self):
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+
+
+class ValidatorStore:
+    """ETag and Last-Modified headers per URL, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.validators = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.validators = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading validators: {e}")
+
+    def get(self, url):
+        with self.lock:
+            return self.validators.get(url)
+
+    def update(self, url, response):
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        with self.lock:
+            if not any(validators.values()):
+                if self.validators.pop(url, None) is None:
+                    return
+            elif self.validators.get(url) == validators:
+                return
+            else:
+                self.validators[url] = validators
+            self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.validators, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving validators: {e}")
+
+
+# The one session every window's background fetches go through
+http = HttpClient()
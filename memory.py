@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import os
+import time
+
+import gi
+
+gi.require_version('WebKit2', '4.0')
+from gi.repository import GLib, WebKit2
+
+MB = 1024 * 1024
+
+
+def read_meminfo():
+    """/proc/meminfo as a dict of byte counts"""
+    info = {}
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                fields = value.split()
+                info[name] = int(fields[0]) * (1024 if len(fields) > 1 else 1)
+    except (OSError, ValueError) as e:
+        print(f"Error reading /proc/meminfo: {e}")
+    return info
+
+
+def read_psi():
+    """avg10 of /proc/pressure/memory as {"some": %, "full": %}, or None without PSI support"""
+    try:
+        with open("/proc/pressure/memory", "r") as f:
+            lines = f.read().split("\n")
+    except OSError:
+        return None
+    pressure = {}
+    for line in lines:
+        fields = line.split()
+        if fields:
+            pressure[fields[0]] = float(fields[1].split("=")[1])
+    return pressure
+
+
+def web_processes():
+    """PIDs of the WebKit web processes spawned by this browser.
+
+    With the sandbox enabled they are started through bwrap and are not
+    direct children, so every descendant of this process is considered.
+    """
+    children = {}
+    commands = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm is truncated to 15 characters and may contain spaces, so split around the parentheses
+        pid = int(entry)
+        commands[pid] = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(pid)
+    pids = []
+    pending = list(children.get(os.getpid(), []))
+    while pending:
+        pid = pending.pop()
+        if commands[pid].startswith("WebKitWebProces"):
+            pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def process_rss(pid):
+    """Resident set size of pid in bytes, 0 if it has exited"""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def web_process_rss():
+    """Combined RSS of all web processes in bytes"""
+    return sum(process_rss(pid) for pid in web_processes())
+
+
+class MemorySample:
+    def __init__(self):
+        info = read_meminfo()
+        total = info.get("MemTotal") or 1
+        self.available = info.get("MemAvailable", info.get("MemFree", total))
+        self.available_percent = 100.0 * self.available / total
+        psi = read_psi() or {}
+        self.psi_some = psi.get("some", 0.0)
+        self.psi_full = psi.get("full", 0.0)
+        self.web_rss = web_process_rss()
+
+    def describe(self):
+        return (f"available {self.available / MB:.0f} MB ({self.available_percent:.0f}%), "
+                f"PSI some {self.psi_some:.1f}% full {self.psi_full:.1f}%, web processes {self.web_rss / MB:.0f} MB")
+
+
+class MemoryGovernor:
+    """Watches system memory and the web processes, and hibernates background tabs when it runs short.
+
+    Every interval seconds it samples /proc/meminfo, memory PSI and the
+    web processes' RSS. Under moderate pressure the least recently used
+    background tab is hibernated; under critical pressure all of them are.
+    Exceeding web_rss_budget counts as moderate pressure.
+    """
+
+    MODERATE = {"available_percent": 20, "psi_some": 10.0}
+    CRITICAL = {"available_percent": 10, "psi_some": 40.0, "psi_full": 5.0}
+    # Give a hibernation time to show up in the numbers before acting again
+    COOLDOWN = 30
+    # WebKit only reads the settings before the first web process starts
+    webkit_settings_applied = False
+
+    def __init__(self, tab_manager, interval=10, web_rss_budget=None):
+        self.tab_manager = tab_manager
+        self.interval = interval
+        total = read_meminfo().get("MemTotal", 0)
+        self.web_rss_budget = web_rss_budget if web_rss_budget is not None else total // 2
+        self.last_action = 0
+        GLib.timeout_add_seconds(interval, self.check)
+
+    @classmethod
+    def apply_webkit_settings(cls):
+        """Cap each web process at a quarter of RAM (512 MB-4 GB) for WebKit's own pressure handler.
+
+        Needs WebKitGTK 2.34+ and only affects web processes started afterwards;
+        calls after the first do nothing.
+        """
+        if cls.webkit_settings_applied or not hasattr(WebKit2, "MemoryPressureSettings"):
+            return False
+        cls.webkit_settings_applied = True
+        total = read_meminfo().get("MemTotal", 0)
+        limit = max(512, min(total // 4, 4096 * MB) // MB)
+        settings = WebKit2.MemoryPressureSettings.new()
+        settings.set_memory_limit(limit)
+        WebKit2.WebContext.set_memory_pressure_settings(settings)
+        return True
+
+    def level(self, sample):
+        if (sample.available_percent < self.CRITICAL["available_percent"]
+                or sample.psi_some > self.CRITICAL["psi_some"] or sample.psi_full > self.CRITICAL["psi_full"]):
+            return "critical"
+        if (sample.available_percent < self.MODERATE["available_percent"]
+                or sample.psi_some > self.MODERATE["psi_some"] or sample.web_rss > self.web_rss_budget):
+            return "moderate"
+        return None
+
+    def check(self, force=False):
+        """Sample memory and act on it; force relieves pressure regardless of the numbers"""
+        sample = MemorySample()
+        level = "critical" if force else self.level(sample)
+        if level is None:
+            return True
+        now = time.monotonic()
+        if not force and now - self.last_action < self.COOLDOWN:
+            return True
+        self.last_action = now
+        tabs = self.tab_manager.background_tabs()
+        if not tabs:
+            print(f"Memory {level}: {sample.describe()}; no background tabs left to hibernate")
+            return True
+        if level == "moderate":
+            tabs = tabs[:1]
+        print(f"Memory {level}{' (manual)' if force else ''}: {sample.describe()}; hibernating {len(tabs)} background tab(s)")
+        self.tab_manager.hibernate(tabs, f"memory {level}")
+        return True
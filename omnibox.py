@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+import heapq
+import math
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from history import frecency_add, visit_score
+
+
+WORD_SPLIT = re.compile(r"[^\w]+")
+
+
+def strip_url(url):
+    """'https://www.github.com/foo' -> 'github.com/foo', the form users type"""
+    url = url.lower()
+    for prefix in ("https://", "http://", "www."):
+        if url.startswith(prefix):
+            url = url[len(prefix):]
+    return url
+
+
+class OmniboxEntry:
+    def __init__(self, url, title, score):
+        self.url = url
+        self.title = title or ""
+        self.score = score
+        self.typed_form = strip_url(url)
+        # Whether the cold tier has its address keys
+        self.cold = False
+
+
+class PrefixTier:
+    """Sorted (key, entry) arrays searched with bisect"""
+
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+
+    def build(self, pairs):
+        pairs.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.entries = [entry for _, entry in pairs]
+
+    def add(self, key, entry):
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.entries.insert(i, entry)
+
+    def merged(self, pairs):
+        """A new tier with pairs added to these keys.
+
+        The key strings already here are reused rather than rebuilt, so
+        dropping this tier afterwards frees little more than two lists. The
+        merge goes slice by slice instead of one big sort, so a worker thread
+        doing it keeps letting the main thread run.
+        """
+        tier = PrefixTier()
+        if not self.keys:
+            tier.build(pairs)
+            return tier
+        pairs.sort(key=lambda pair: pair[0])
+        start = 0
+        for key, entry in pairs:
+            i = bisect_right(self.keys, key, start)
+            tier.keys += self.keys[start:i]
+            tier.entries += self.entries[start:i]
+            tier.keys.append(key)
+            tier.entries.append(entry)
+            start = i
+        tier.keys += self.keys[start:]
+        tier.entries += self.entries[start:]
+        return tier
+
+    def remove(self, key, entry):
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.entries[i] is entry:
+                del self.keys[i]
+                del self.entries[i]
+                return
+            i += 1
+
+    def drop(self, entries):
+        """Remove every key of the given entries"""
+        kept = [i for i, entry in enumerate(self.entries) if entry not in entries]
+        self.keys = [self.keys[i] for i in kept]
+        self.entries = [self.entries[i] for i in kept]
+
+    def range(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        return lo, hi
+
+
+class OmniboxIndex:
+    """In-memory prefix index over history and bookmarks for url_entry suggestions.
+
+    Keys are the typed form of each URL, its host labels and its title words.
+    The most frecent URLs live in a small "hot" tier; whenever it yields
+    enough matches those are the best ones, because every other URL scores
+    lower. Only rare prefixes fall through to a capped scan of the much
+    larger cold tier, which keeps each keystroke to a few milliseconds even
+    with a million URLs indexed.
+
+    Once twice HOT_SIZE URLs have been promoted the tiers are rebuilt. With
+    run_on_main (e.g. GLib.idle_add) that happens on a worker thread and the
+    new tiers are swapped in on the main thread; without it, inline.
+    """
+
+    HOT_SIZE = 5000
+    COLD_SCAN = 5000
+    HOST_MATCH_BONUS = math.log(8)
+    BOOKMARK_BONUS = math.log(4)
+
+    def __init__(self, run_on_main=None):
+        self.by_url = {}
+        self.hot = PrefixTier()
+        self.cold = PrefixTier()
+        self.hot_urls = set()
+        self.run_on_main = run_on_main
+        # URLs recorded while a rebalance runs on the worker thread, else None
+        self.rebalancing = None
+
+    def keys_for(self, entry, titles=True):
+        keys = [entry.typed_form]
+        host = entry.typed_form.split("/", 1)[0]
+        labels = host.split(".")
+        # "en.wikipedia.org" is also found by "wikipedia"
+        for i in range(1, len(labels) - 1):
+            keys.append(".".join(labels[i:]))
+        if titles:
+            keys.extend(self.title_keys(entry.title))
+        return keys
+
+    @staticmethod
+    def title_keys(title):
+        return [sys.intern(word) for word in WORD_SPLIT.split(title.lower())[:8] if len(word) >= 2]
+
+    def build(self, rows):
+        """Replace the index with (url, title, frecency) rows, e.g. from HistoryStore.all_for_index()"""
+        self.by_url = {}
+        for url, title, score in rows:
+            self.by_url[url] = OmniboxEntry(url, title, score if score is not None else 0)
+        self.cold = PrefixTier()
+        self.install_tiers(*self.split(list(self.by_url.values())))
+
+    def split(self, entries):
+        """New (hot URLs, hot tier, cold tier) for entries, leaving the tiers in use untouched"""
+        hot = heapq.nlargest(self.HOT_SIZE, entries, key=lambda entry: entry.score)
+        hot_urls = {entry.url for entry in hot}
+        hot_tier = PrefixTier()
+        hot_tier.build([(key, entry) for entry in hot for key in self.keys_for(entry)])
+        # Title words are only indexed for hot URLs; the cold tier is matched by address.
+        # URLs stay in it once added, so a rebalance only merges in the ones new since the last
+        demoted = [entry for entry in entries if not entry.cold and entry.url not in hot_urls]
+        demoted.sort(key=lambda entry: entry.score, reverse=True)
+        cold_tier = self.cold.merged([(key, entry) for entry in demoted for key in self.keys_for(entry, False)])
+        for entry in demoted:
+            entry.cold = True
+        return hot_urls, hot_tier, cold_tier
+
+    def install_tiers(self, hot_urls, hot, cold):
+        recorded, self.rebalancing = self.rebalancing, None
+        self.hot_urls, self.hot, self.cold = hot_urls, hot, cold
+        if recorded:
+            # Visited since the worker took its snapshot: hot again, under their current titles
+            entries = {self.by_url[url] for url in recorded}
+            self.hot.drop(entries)
+            self.hot = self.hot.merged([(key, entry) for entry in entries for key in self.keys_for(entry)])
+            self.hot_urls.update(recorded)
+        return False
+
+    def add_bookmark(self, url, title):
+        self.record(url, title, visit_score(time.time(), True) + self.BOOKMARK_BONUS)
+
+    def record_visit(self, url, title="", typed=False):
+        entry = self.by_url.get(url)
+        score = frecency_add(entry.score if entry else None, time.time(), typed)
+        self.record(url, title, score)
+
+    def update_title(self, url, title):
+        entry = self.by_url.get(url)
+        if entry and title and title != entry.title:
+            self.record(url, title, entry.score)
+
+    def record(self, url, title, score):
+        entry = self.by_url.get(url)
+        if entry is None:
+            entry = OmniboxEntry(url, title, score)
+            self.by_url[url] = entry
+        else:
+            entry.score = max(entry.score, score)
+        old_title = entry.title
+        new_title = title and title != old_title
+        if new_title:
+            entry.title = title
+        if self.rebalancing is not None:
+            self.rebalancing.add(url)
+
+        # A fresh visit always outranks old history, so it belongs in the hot tier
+        if url not in self.hot_urls:
+            self.hot_urls.add(url)
+            for key in self.keys_for(entry):
+                self.hot.add(key, entry)
+        elif new_title:
+            for key in self.title_keys(old_title):
+                self.hot.remove(key, entry)
+            for key in self.title_keys(entry.title):
+                self.hot.add(key, entry)
+        if len(self.hot_urls) > 2 * self.HOT_SIZE and self.rebalancing is None:
+            self.rebalance()
+
+    def rebalance(self):
+        """Demote everything but the HOT_SIZE best URLs back to the cold tier"""
+        entries = list(self.by_url.values())
+        if self.run_on_main is None:
+            self.install_tiers(*self.split(entries))
+            return
+        self.rebalancing = set()
+
+        def worker():
+            self.run_on_main(self.install_tiers, *self.split(entries))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def suggest(self, text, limit=8):
+        """Best entries for what the user has typed so far, best first"""
+        words = strip_url(text.strip()).split()
+        if not words:
+            return []
+        prefix, extra = words[0], words[1:]
+
+        best = {}
+        self.collect(self.hot, prefix, extra, best, None)
+        if len(best) < limit:
+            self.collect(self.cold, prefix, extra, best, self.COLD_SCAN)
+        return heapq.nlargest(limit, best, key=best.get)
+
+    def collect(self, tier, prefix, extra, best, cap):
+        lo, hi = tier.range(prefix)
+        if cap is not None:
+            hi = min(hi, lo + cap)
+        for i in range(lo, hi):
+            entry = tier.entries[i]
+            if extra:
+                haystack = entry.typed_form + " " + entry.title.lower()
+                if not all(word in haystack for word in extra):
+                    continue
+            score = entry.score
+            if entry.typed_form.startswith(prefix):
+                score += self.HOST_MATCH_BONUS
+            if score > best.get(entry, -math.inf):
+                best[entry] = score
+
+    def inline_completion(self, text):
+        """Text to complete inline after what the user typed, or None"""
+        typed = strip_url(text)
+        if not typed or " " in typed:
+            return None
+        for entry in self.suggest(text, limit=1):
+            form = entry.typed_form
+            # Complete to the host first, like other browsers do
+            host = form.split("/", 1)[0]
+            for candidate in (host, form):
+                if candidate.startswith(typed) and len(candidate) > len(typed):
+                    return text + candidate[len(typed):]
+        return None
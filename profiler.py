@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+
+def vm_rss_mb():
+    """This process's resident set size in MB, from /proc/self/status; None where there is none"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class StartupProfiler:
+    """Wall and CPU time of named phases, saved as Chrome trace-event JSON.
+
+    The file opens in Perfetto (ui.perfetto.dev) or chrome://tracing. Each
+    phase becomes a complete event whose duration is wall time and whose
+    thread duration is the CPU time the thread spent in it; its args add the
+    process's resident memory when it ended (rss_mb). Recording starts
+    at import so the browser's own imports can be measured; call stop() when
+    nobody asked for a profile.
+    """
+
+    def __init__(self):
+        self.recording = True
+        self.events = []
+        self.started = {}
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter_ns() // 1000, time.thread_time_ns() // 1000
+
+    def begin(self, name):
+        if self.recording:
+            self.started[name] = self.now()
+
+    def end(self, name, **args):
+        start = self.started.pop(name, None)
+        if start is not None:
+            self.record(name, start, args)
+
+    def record(self, name, start, args=None):
+        if not self.recording:
+            return
+        wall, cpu = self.now()
+        event = {
+            "name": name, "cat": "startup", "ph": "X",
+            "ts": start[0], "dur": wall - start[0],
+            "tts": start[1], "tdur": cpu - start[1],
+            "pid": self.pid, "tid": threading.get_native_id(),
+            "args": dict(args or {}, cpu_ms=round((cpu - start[1]) / 1000, 3), rss_mb=vm_rss_mb()),
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def mark(self, name):
+        """An instant event, e.g. first paint"""
+        if not self.recording:
+            return
+        with self.lock:
+            self.events.append({
+                "name": name, "cat": "startup", "ph": "i", "s": "p",
+                "ts": self.now()[0], "pid": self.pid, "tid": threading.get_native_id(),
+                "args": {"rss_mb": vm_rss_mb()},
+            })
+
+    def traced(self, func):
+        """Decorator recording every call of func as a phase named after it"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.recording:
+                return func(*args, **kwargs)
+            start = self.now()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(func.__name__, start)
+        return wrapper
+
+    def save(self, path):
+        with self.lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(trace, f, indent=1)
+            os.replace(tmp_path, path)
+            print(f"Startup profile written to {path}")
+        except OSError as e:
+            print(f"Error saving startup profile: {e}")
+
+    def stop(self):
+        self.recording = False
+        self.started.clear()
+        with self.lock:
+            self.events.clear()
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+
+from gi.repository import GLib
+
+
+class SessionJournal:
+    """The open tabs, their scroll positions and back/forward lists, kept in session.json.
+
+    changed() is cheap enough to call on every navigation: it only arms a
+    short timer, so a burst of changes results in one write. Writes happen on
+    a background thread into a temporary file that is fsynced and renamed
+    over the journal, so a crash leaves the previous or the new session on
+    disk but never a torn one.
+    """
+
+    VERSION = 1
+    DEBOUNCE_MS = 1000
+
+    def __init__(self, data_dir, collect):
+        """collect(callback) gathers the current state on the GTK thread and passes it to callback"""
+        self.path = os.path.join(data_dir, "session.json")
+        self.collect = collect
+        self.timer = None
+        self.condition = threading.Condition()
+        self.pending = None
+        self.stopping = False
+        self.writer = threading.Thread(target=self.writer_loop, name="session-writer", daemon=True)
+        self.writer.start()
+
+    def load(self):
+        """The last saved session, or None if there is none worth restoring"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading session: {e}")
+            return None
+        if state.get("version") != self.VERSION or not state.get("tabs"):
+            return None
+        return state
+
+    def changed(self):
+        if self.timer is None:
+            self.timer = GLib.timeout_add(self.DEBOUNCE_MS, self.on_timer)
+
+    def on_timer(self):
+        self.timer = None
+        self.collect(self.submit)
+        return False
+
+    def submit(self, state):
+        with self.condition:
+            self.pending = dict(state, version=self.VERSION)
+            self.condition.notify()
+
+    def writer_loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+                state, self.pending = self.pending, None
+                stopping = self.stopping
+            if state is not None:
+                self.write(state)
+            if stopping:
+                return
+
+    def write(self, state):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving session: {e}")
+
+    def close(self, state):
+        """Write state as the final session and stop the writer"""
+        if self.timer is not None:
+            GLib.source_remove(self.timer)
+            self.timer = None
+        self.submit(state)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.writer.join()
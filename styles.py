@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import gi
+
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+
+class StyleRegistry:
+    """CSS snippets compiled once into shared Gtk.CssProviders.
+
+    Every provider added to a style context stays there until it is removed,
+    and GTK consults all of them whenever the widget's style is recomputed.
+    attach() therefore adds a given snippet to a widget at most once, no
+    matter how often it is called; the snippets a widget carries are kept on
+    the widget itself.
+    """
+
+    def __init__(self):
+        self.providers = {}
+
+    @staticmethod
+    def key(css):
+        # Snippets pasted at different indentation are the same stylesheet
+        return " ".join(css.split())
+
+    def provider(self, css):
+        key = self.key(css)
+        provider = self.providers.get(key)
+        if provider is None:
+            provider = Gtk.CssProvider()
+            provider.load_from_data(css.encode())
+            self.providers[key] = provider
+        return provider
+
+    def attach(self, widget, css, priority=Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION):
+        """Style widget with css; does nothing if it already is"""
+        key = self.key(css)
+        if not hasattr(widget, "style_snippets"):
+            widget.style_snippets = set()
+        if key in widget.style_snippets:
+            return
+        widget.get_style_context().add_provider(self.provider(css), priority)
+        widget.style_snippets.add(key)
+
+    def detach(self, widget, css):
+        key = self.key(css)
+        if key in getattr(widget, "style_snippets", ()):
+            widget.get_style_context().remove_provider(self.providers[key])
+            widget.style_snippets.discard(key)
+
+
+styles = StyleRegistry()
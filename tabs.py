@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+import time
+
+import gi
+
+from history import NavigationStack, navigation_entry
+from memory import MB, web_process_rss
+
+gi.require_version('Gtk', '3.0')
+gi.require_version('WebKit2', '4.0')
+from gi.repository import Gtk, Gdk, GLib, WebKit2
+
+
+class Tab:
+    """One tab: its WebView (created on first activation), ScrolledWindow, strip entry and back/forward history"""
+
+    def __init__(self, manager, uri, webview=None, view=None, history=None):
+        self.manager = manager
+        self.start_uri = uri
+        self.webview = webview
+        self.history = history if history is not None else NavigationStack()
+        # Tabs that own their view pack it themselves; the primary tab reuses the window's
+        self.view = view
+        if self.view is None:
+            self.view = Gtk.ScrolledWindow()
+            self.view.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+            if webview is not None:
+                self.view.add(webview)
+
+        # Strip entry: separator, then favicon and label inside an event box for clicks
+        self.separator = Gtk.SeparatorToolItem()
+        self.item = Gtk.ToolItem()
+        event_box = Gtk.EventBox()
+        event_box.connect("button-press-event", self.on_strip_clicked)
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
+        self.icon = Gtk.Image()
+        self.icon.set_no_show_all(True)
+        self.label = Gtk.Label()
+        box.pack_start(self.icon, False, False, 0)
+        box.pack_start(self.label, False, False, 0)
+        event_box.add(box)
+        self.item.add(event_box)
+        # What the strip currently shows, so unchanged tabs are not redrawn
+        self.shown = None
+
+        # When the tab last went to the background
+        self.last_active = time.monotonic()
+        # Last known scroll position of the page
+        self.scroll = (0, 0)
+        # While hibernated or restored from a session: {"uri", "title", "scroll"} of the page to bring back,
+        # and a snapshot standing in for it
+        self.hibernated = None
+        self.snapshot = None
+        self.restore_scroll = None
+        self.hibernating = False
+
+    def uri(self):
+        """Current address; tabs that were never opened report the page they will start on"""
+        if self.hibernated is not None:
+            return self.hibernated["uri"]
+        if self.webview is None:
+            return self.start_uri
+        return self.webview.get_uri() or self.start_uri
+
+    def title(self):
+        if self.hibernated is not None:
+            return self.hibernated["title"]
+        if self.webview is None:
+            return ""
+        return self.webview.get_title() or ""
+
+    def ensure_webview(self):
+        if self.webview is None:
+            self.webview = self.manager.browser.create_optimized_webview(True)
+            self.manager.connect_webview(self.webview)
+            if self.hibernated is None:
+                self.view.add(self.webview)
+                self.webview.load_uri(self.start_uri)
+        if self.hibernated is not None:
+            # Keep showing the snapshot until the page is back, then put it where it was
+            self.restore_scroll = tuple(self.hibernated["scroll"])
+            self.webview.connect("load-changed", self.on_restore_load_changed)
+            self.webview.load_uri(self.hibernated["uri"])
+            self.hibernated = None
+        return self.webview
+
+    def can_hibernate(self):
+        return (self.webview is not None and self.hibernated is None and not self.hibernating
+                and self is not self.manager.active and self is not self.manager.tabs[0]
+                and not self.webview.is_playing_audio())
+
+    def read_scroll(self, on_done):
+        """Refresh self.scroll from the page, then call on_done(tab)"""
+        self.webview.run_javascript("[window.scrollX, window.scrollY]", None, self.on_scroll_position, on_done)
+
+    def on_scroll_position(self, webview, result, on_done):
+        try:
+            value = webview.run_javascript_finish(result).get_js_value()
+            self.scroll = (value.object_get_property_at_index(0).to_int32(), value.object_get_property_at_index(1).to_int32())
+        except GLib.Error as e:
+            print(f"Could not read scroll position: {e}")
+        on_done(self)
+
+    def hibernate(self, on_done):
+        """Save the page state and snapshot, then release the WebView; on_done(tab) runs either way"""
+        self.hibernating = True
+        webview = self.webview
+        self.read_scroll(lambda tab: webview.get_snapshot(
+            WebKit2.SnapshotRegion.VISIBLE, WebKit2.SnapshotOptions.NONE, None, self.on_snapshot, on_done
+        ))
+
+    def on_snapshot(self, webview, result, on_done):
+        self.hibernating = False
+        try:
+            surface = webview.get_snapshot_finish(result)
+        except GLib.Error:
+            surface = None
+        # The tab may have been activated or closed while we waited
+        if self.webview is webview and self in self.manager.tabs and self.can_hibernate():
+            self.hibernated = {"uri": webview.get_uri() or self.start_uri, "title": webview.get_title() or "", "scroll": self.scroll}
+            self.view.remove(webview)
+            webview.destroy()
+            self.webview = None
+            if surface is not None:
+                self.snapshot = Gtk.Image.new_from_surface(surface)
+                self.view.add(self.snapshot)
+        on_done(self)
+
+    def on_restore_load_changed(self, webview, load_event):
+        if load_event != WebKit2.LoadEvent.FINISHED:
+            return
+        webview.disconnect_by_func(self.on_restore_load_changed)
+        if webview.get_parent() is None:
+            child = self.view.get_child()
+            if child is not None:
+                self.view.remove(child)
+            self.snapshot = None
+            self.view.add(webview)
+            webview.show()
+        x, y = self.restore_scroll
+        webview.run_javascript(f"window.scrollTo({x}, {y})", None, None, None)
+
+    def session_state(self):
+        scroll = self.hibernated["scroll"] if self.hibernated is not None else self.scroll
+        return {"uri": self.uri(), "title": self.title(), "scroll": list(scroll), "history": self.history.to_dict()}
+
+    def on_strip_clicked(self, widget, event):
+        if event.button == 1:
+            self.manager.activate(self)
+            return True
+        if event.button == 2:
+            self.manager.close(self)
+            return True
+        return False
+
+
+class TabManager:
+    """Ordered tabs in the tab strip; exactly one of them is active.
+
+    The first tab wraps the window's primary WebView and cannot be closed.
+    Every other tab gets its WebView the first time it is activated, and
+    gives it up again (hibernates) after hibernate_after seconds in the
+    background. The MemoryGovernor hibernates tabs sooner under memory pressure.
+    """
+
+    HIBERNATE_AFTER = 30 * 60
+
+    def __init__(self, browser, toolbar, container, start_uri):
+        self.browser = browser
+        self.start_uri = start_uri
+        self.toolbar = toolbar
+        self.container = container
+        self.tabs = []
+        self.active = None
+        self.hibernate_after = self.HIBERNATE_AFTER
+        self.reclaimed = 0
+        # SessionJournal told about every change, if any
+        self.journal = None
+        GLib.timeout_add_seconds(60, self.check_hibernation)
+        # Closes the strip after the last tab
+        self.end_separator = Gtk.SeparatorToolItem()
+        self.toolbar.insert(self.end_separator, -1)
+
+    def add_primary(self, webview, view, history):
+        tab = Tab(self, webview.get_uri() or "", webview=webview, view=view, history=history)
+        self.insert(tab, 0)
+        self.active = tab
+        return tab
+
+    def add(self, uri, position=None, activate=False):
+        tab = Tab(self, uri)
+        self.container.pack_start(tab.view, True, True, 0)
+        self.insert(tab, len(self.tabs) if position is None else position)
+        tab.separator.show()
+        tab.item.show_all()
+        if activate:
+            self.activate(tab)
+        return tab
+
+    def insert(self, tab, position):
+        self.tabs.insert(position, tab)
+        self.toolbar.insert(tab.separator, 2 * position)
+        self.toolbar.insert(tab.item, 2 * position + 1)
+        # Numbers after the insertion point shift
+        self.refresh(self.tabs[position:])
+        self.changed()
+
+    def connect_webview(self, webview):
+        webview.connect("load-changed", self.browser.on_load_changed)
+        webview.connect("notify::uri", self.on_uri_changed)
+        webview.connect("notify::title", self.on_title_changed)
+
+    def close(self, tab):
+        index = self.tabs.index(tab)
+        if index == 0:
+            return False
+        if tab is self.active:
+            self.activate(self.tabs[index + 1] if index + 1 < len(self.tabs) else self.tabs[index - 1])
+        self.tabs.remove(tab)
+        self.toolbar.remove(tab.separator)
+        self.toolbar.remove(tab.item)
+        tab.view.destroy()
+        tab.webview = None
+        self.refresh(self.tabs[index:])
+        self.changed()
+        return True
+
+    def move(self, tab, position):
+        position = max(0, min(position, len(self.tabs) - 1))
+        old = self.tabs.index(tab)
+        if old == position:
+            return
+        self.tabs.remove(tab)
+        self.tabs.insert(position, tab)
+        self.toolbar.remove(tab.separator)
+        self.toolbar.remove(tab.item)
+        self.toolbar.insert(tab.separator, 2 * position)
+        self.toolbar.insert(tab.item, 2 * position + 1)
+        self.refresh(self.tabs[min(old, position):max(old, position) + 1])
+        self.changed()
+
+    def activate(self, tab):
+        previous = self.active
+        if previous is not None and previous is not tab:
+            previous.last_active = time.monotonic()
+        for other in self.tabs:
+            if other is not tab:
+                other.view.hide()
+        self.active = tab
+        self.browser.webview = tab.ensure_webview()
+        self.browser.history = tab.history
+        tab.view.show_all()
+        self.refresh([t for t in (previous, tab) if t in self.tabs])
+        self.browser.tab_menu.show_all()
+        self.browser.fileViewSwitch()
+        self.browser.show_ad_blocking(self.browser.webview)
+        self.changed()
+
+    def background_tabs(self):
+        """Tabs that could hibernate, least recently used first"""
+        return sorted((tab for tab in self.tabs if tab.can_hibernate()), key=lambda tab: tab.last_active)
+
+    def check_hibernation(self):
+        now = time.monotonic()
+        idle = [tab for tab in self.background_tabs() if now - tab.last_active > self.hibernate_after]
+        if idle:
+            self.hibernate(idle, "idle")
+        return True
+
+    def hibernate(self, tabs, reason):
+        before = web_process_rss()
+        pending = set(tabs)
+
+        def on_done(tab):
+            pending.discard(tab)
+            if not pending:
+                # Web processes exit asynchronously, so measure once they have had time to go
+                GLib.timeout_add_seconds(5, self.report_reclaimed, len(tabs), before, reason)
+
+        for tab in tabs:
+            tab.hibernate(on_done)
+
+    def report_reclaimed(self, count, before, reason):
+        after = web_process_rss()
+        reclaimed = max(before - after, 0)
+        self.reclaimed += reclaimed
+        print(f"Hibernated {count} tab(s) ({reason}): web process RSS {before / MB:.0f} -> {after / MB:.0f} MB, "
+              f"reclaimed {reclaimed / MB:.0f} MB, {self.reclaimed / MB:.0f} MB this session")
+        return False
+
+    def hide_inactive(self):
+        for tab in self.tabs:
+            if tab is not self.active:
+                tab.view.hide()
+
+    def tab_for(self, webview):
+        for tab in self.tabs:
+            if tab.webview is webview:
+                return tab
+        return None
+
+    def on_uri_changed(self, webview, pspec):
+        # The primary tab records history through WebBrowser.on_uri_changed
+        tab = self.tab_for(webview)
+        if tab is None:
+            return
+        if self.browser.skipHistory:
+            self.browser.skipHistory = False
+        else:
+            tab.history.push(navigation_entry(webview.get_uri()))
+        self.refresh([tab])
+        self.changed()
+
+    def on_title_changed(self, webview, pspec):
+        self.browser.record_title(webview)
+        tab = self.tab_for(webview)
+        if tab is not None:
+            self.refresh([tab])
+
+    def changed(self):
+        if self.journal is not None:
+            self.journal.changed()
+
+    def session_state(self):
+        return {"active": self.tabs.index(self.active), "tabs": [tab.session_state() for tab in self.tabs]}
+
+    def collect_session(self, callback):
+        """Refresh the scroll positions of open pages, then callback(session_state()).
+
+        Pages that do not answer within half a second keep their last known position.
+        """
+        live = [tab for tab in self.tabs if tab.webview is not None and tab.hibernated is None]
+        waiting = {"tabs": len(live), "done": False}
+
+        def finish():
+            if not waiting["done"]:
+                waiting["done"] = True
+                callback(self.session_state())
+            return False
+
+        def on_scroll(tab):
+            waiting["tabs"] -= 1
+            if waiting["tabs"] == 0:
+                finish()
+
+        if not live:
+            finish()
+            return
+        GLib.timeout_add(500, finish)
+        for tab in live:
+            tab.read_scroll(on_scroll)
+
+    def restore(self, state):
+        """Recreate a saved session. Only the active tab loads; the rest come back like hibernated tabs"""
+        saved = state["tabs"]
+        for i, tab_state in enumerate(saved):
+            tab = self.tabs[0] if i == 0 else self.add(tab_state["uri"])
+            tab.hibernated = {"uri": tab_state["uri"], "title": tab_state.get("title", ""),
+                              "scroll": tab_state.get("scroll", [0, 0])}
+            tab.history = NavigationStack.from_dict(tab_state.get("history", {}))
+        self.browser.history = self.tabs[0].history
+        active = state.get("active", 0)
+        self.activate(self.tabs[active if 0 <= active < len(self.tabs) else 0])
+
+    def refresh(self, tabs=None):
+        """Redraw the strip entries of tabs (all by default) whose text, weight or icon changed"""
+        for tab in self.tabs if tabs is None else tabs:
+            position = self.tabs.index(tab)
+            markup, pixbuf = self.browser.tab_label(tab, position, tab is self.active)
+            if (markup, pixbuf) == tab.shown:
+                continue
+            tab.shown = (markup, pixbuf)
+            tab.label.set_markup(markup)
+            if pixbuf:
+                tab.icon.set_from_pixbuf(pixbuf)
+                tab.icon.show()
+            else:
+                tab.icon.hide()
+
+    def handle_key(self, event):
+        """F1-F4 pick a tab; Ctrl+T/W open and close; Ctrl+PageUp/Down switch, with Shift they move the tab"""
+        if Gdk.KEY_F1 <= event.keyval <= Gdk.KEY_F4:
+            index = event.keyval - Gdk.KEY_F1
+            if index < len(self.tabs):
+                self.activate(self.tabs[index])
+                return True
+            return False
+        if not event.state & Gdk.ModifierType.CONTROL_MASK:
+            return False
+        index = self.tabs.index(self.active)
+        if event.keyval == Gdk.KEY_t and not self.browser.fileView:
+            self.add(self.start_uri, index + 1, activate=True)
+        elif event.keyval == Gdk.KEY_w:
+            return self.close(self.active)
+        elif event.keyval in (Gdk.KEY_Page_Up, Gdk.KEY_Page_Down):
+            step = -1 if event.keyval == Gdk.KEY_Page_Up else 1
+            if event.state & Gdk.ModifierType.SHIFT_MASK:
+                self.move(self.active, index + step)
+            else:
+                self.activate(self.tabs[(index + step) % len(self.tabs)])
+        else:
+            return False
+        return True
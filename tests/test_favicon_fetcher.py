@@ -0,0 +1,140 @@
+"""FaviconFetcher and HttpClient against a local HTTP server."""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("gi")
+pytest.importorskip("requests")
+Image = pytest.importorskip("PIL.Image")
+
+from favicons import FaviconFetcher
+from http_client import HttpClient
+
+
+def png(color):
+    data = BytesIO()
+    Image.new("RGBA", (16, 16), color).save(data, format="PNG")
+    return data.getvalue()
+
+
+class IconHandler(BaseHTTPRequestHandler):
+    """/icon.png carries an ETag and answers a matching If-None-Match with 304; /slow.png takes a second"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/slow.png":
+            time.sleep(1)
+        if self.path == "/icon.png" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = png((255, 0, 0, 255))
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/icon.png":
+            self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), IconHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def http():
+    client = HttpClient()
+    yield client
+    client.close()
+
+
+def wait_idle(fetcher, timeout=10):
+    deadline = time.monotonic() + timeout
+    while fetcher.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not fetcher.in_flight
+
+
+def collect():
+    ready = []
+    return ready, lambda favicon_url, path, rgba: ready.append((favicon_url, path, rgba))
+
+
+def test_download_and_304_only_touches_mtime(server, http, tmp_path):
+    fetcher = FaviconFetcher(str(tmp_path), http)
+    url = server.url + "/icon.png"
+    path = str(tmp_path / "icon.png")
+    ready, on_ready = collect()
+
+    fetcher.fetch_all([(url, path)], on_ready)
+    wait_idle(fetcher)
+    assert len(ready) == 1 and len(ready[0][2]) == 16 * 16 * 4
+    assert fetcher.validators.get(url)["etag"] == '"v1"'
+    with open(path, "rb") as f:
+        content = f.read()
+
+    os.utime(path, (1000, 1000))
+    fetcher.fetch_all([(url, path)], on_ready)
+    wait_idle(fetcher)
+    assert server.requests[-1] == ("/icon.png", '"v1"')
+    assert len(ready) == 1
+    assert os.path.getmtime(path) > 1000
+    with open(path, "rb") as f:
+        assert f.read() == content
+    fetcher.shutdown()
+
+
+def test_in_flight_urls_are_fetched_once(server, http, tmp_path):
+    fetcher = FaviconFetcher(str(tmp_path), http)
+    url = server.url + "/slow.png"
+    path = str(tmp_path / "slow.png")
+    ready, on_ready = collect()
+
+    fetcher.fetch_all([(url, path), (url, path)], on_ready)
+    fetcher.fetch_all([(url, path)], on_ready)
+    wait_idle(fetcher)
+    assert [request for request, _ in server.requests] == ["/slow.png"]
+    assert len(ready) == 1
+
+    # Once finished, the same URL can be fetched again
+    fetcher.fetch_all([(url, path)], on_ready)
+    wait_idle(fetcher)
+    assert len(server.requests) == 2
+    fetcher.shutdown()
+
+
+def test_deadline_abandons_the_batch(server, http, tmp_path):
+    fetcher = FaviconFetcher(str(tmp_path), http, workers=1, deadline=0.3)
+    ready, on_ready = collect()
+    jobs = [(server.url + "/slow.png", str(tmp_path / "slow.png")),
+            (server.url + "/icon.png", str(tmp_path / "icon.png"))]
+
+    started = time.monotonic()
+    fetcher.fetch_all(jobs, on_ready)
+    wait_idle(fetcher)
+    # The first download times out at the deadline; the second is never started
+    assert time.monotonic() - started < 1
+    assert [request for request, _ in server.requests] == ["/slow.png"]
+    assert ready == []
+    assert not os.path.exists(jobs[0][1])
+    fetcher.shutdown()
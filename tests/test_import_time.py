@@ -0,0 +1,53 @@
+"""Importing browser.py stays within budget and leaves the heavy modules for first use.
+
+The same check, with a table of the slowest imports, is benchmarks/import_time.py.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+gi = pytest.importorskip("gi")
+try:
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('WebKit2', '4.0')
+except ValueError:
+    pytest.skip("needs GTK 3 and WebKit2GTK 4.0", allow_module_level=True)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ["explorer", "cv2", "PIL", "requests", "numpy"]
+BUDGET_MS = 600
+
+
+def import_times():
+    """{module: self us} for one fresh interpreter importing browser"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import browser"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+@pytest.fixture(scope="module")
+def samples():
+    # The first run warms the page cache and writes .pyc files
+    import_times()
+    return [import_times() for _ in range(3)]
+
+
+def test_heavy_modules_are_not_imported(samples):
+    for times in samples:
+        assert [name for name in LAZY_MODULES if name in times] == []
+
+
+def test_imports_fit_the_budget(samples):
+    total_ms = min(sum(times.values()) for times in samples) / 1000
+    assert total_ms <= BUDGET_MS
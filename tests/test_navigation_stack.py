@@ -0,0 +1,113 @@
+from history import NavigationStack
+
+
+def stack_of(*urls, capacity=500):
+    stack = NavigationStack(capacity)
+    for url in urls:
+        stack.push(url)
+    return stack
+
+
+def test_empty_stack():
+    stack = NavigationStack()
+    assert stack.current() is None
+    assert len(stack) == 0
+    assert stack.back() is None
+    assert stack.forward() is None
+    assert not stack.can_go_back()
+    assert not stack.can_go_forward()
+
+
+def test_ring_buffer_wraps_at_capacity():
+    stack = stack_of(*[f"https://example.com/{i}" for i in range(7)], capacity=3)
+    assert len(stack) == 3
+    assert stack.entries() == ["https://example.com/4", "https://example.com/5", "https://example.com/6"]
+    assert stack.current() == "https://example.com/6"
+    assert stack.back() == "https://example.com/5"
+    assert stack.back() == "https://example.com/4"
+    assert stack.back() is None
+
+
+def test_push_after_wrapping_keeps_order():
+    stack = stack_of("a", "b", "c", "d", capacity=3)
+    stack.back()
+    stack.push("e")
+    assert stack.entries() == ["b", "c", "e"]
+    assert stack.current() == "e"
+
+
+def test_push_drops_forward_entries():
+    stack = stack_of("a", "b", "c")
+    stack.back()
+    stack.back()
+    assert stack.push("d")
+    assert stack.entries() == ["a", "d"]
+    assert not stack.can_go_forward()
+    assert stack.forward() is None
+
+
+def test_duplicates_are_suppressed():
+    stack = stack_of("https://example.com")
+    assert not stack.push("https://example.com")
+    assert not stack.push("https://example.com/")
+    assert len(stack) == 1
+    assert stack.push("https://example.org/")
+    assert not stack.push("https://example.org")
+    assert stack.entries() == ["https://example.com", "https://example.org/"]
+
+
+def test_navigating_to_page_just_left_reuses_forward_entry():
+    stack = stack_of("a", "b", "c")
+    stack.back()
+    stack.back()
+    assert not stack.push("b/")
+    assert stack.current() == "b"
+    assert stack.entries() == ["a", "b", "c"]
+    assert stack.forward() == "c"
+
+
+def test_go_to():
+    stack = stack_of("a", "b", "c")
+    assert stack.go_to(0) == "a"
+    assert stack.entries() == ["a", "b", "c"]
+    assert stack.can_go_forward()
+    assert stack.go_to(2) == "c"
+    assert not stack.can_go_forward()
+    assert stack.go_to(3) is None
+    assert stack.go_to(-1) is None
+    assert stack.current() == "c"
+
+
+def test_back_and_forward_at_the_ends():
+    stack = stack_of("a", "b")
+    assert stack.forward() is None
+    assert stack.current() == "b"
+    assert stack.back() == "a"
+    assert stack.back() is None
+    assert stack.current() == "a"
+    assert stack.forward() == "b"
+    assert stack.forward() is None
+
+
+def test_round_trip():
+    stack = stack_of("a", "b", "c")
+    stack.back()
+    restored = NavigationStack.from_dict(stack.to_dict())
+    assert restored.entries() == ["a", "b", "c"]
+    assert restored.current() == "b"
+
+
+def test_from_dict_trims_to_capacity():
+    restored = NavigationStack.from_dict({"entries": ["a", "b", "c", "d", "e"], "cursor": 3}, capacity=3)
+    assert restored.entries() == ["c", "d", "e"]
+    assert restored.current() == "d"
+    restored.push("f")
+    assert restored.entries() == ["c", "d", "f"]
+
+
+def test_from_dict_clamps_cursor():
+    assert NavigationStack.from_dict({"entries": ["a", "b"], "cursor": 9}).current() == "b"
+    assert NavigationStack.from_dict({"entries": ["a", "b"], "cursor": -5}).current() is None
+    assert NavigationStack.from_dict({"entries": ["a", "b", "c", "d"], "cursor": 0}, capacity=2).current() is None
+    assert NavigationStack.from_dict({"entries": ["a", "b"]}).current() == "b"
+    assert NavigationStack.from_dict({}).current() is None
@@ -0,0 +1,71 @@
+"""OmniboxIndex tiers, title changes and rebalancing."""
+import threading
+
+from omnibox import OmniboxIndex, PrefixTier
+
+
+class SmallIndex(OmniboxIndex):
+    HOT_SIZE = 3
+
+
+def urls(entries):
+    return [entry.url for entry in entries]
+
+
+def test_merged_keeps_keys_sorted():
+    tier = PrefixTier()
+    tier.build([(key, key) for key in ("b", "d", "f")])
+    merged = tier.merged([("e", "e"), ("a", "a"), ("d", "d2")])
+    assert merged.keys == ["a", "b", "d", "d", "e", "f"]
+    assert merged.entries == ["a", "b", "d", "d2", "e", "f"]
+    assert tier.keys == ["b", "d", "f"]
+
+
+def test_title_change_drops_the_old_title_words():
+    index = OmniboxIndex()
+    index.record("https://example.com/", "Kernel news", 1.0)
+    assert urls(index.suggest("kernel")) == ["https://example.com/"]
+
+    index.update_title("https://example.com/", "Weather report")
+    assert index.suggest("kernel") == []
+    assert urls(index.suggest("weather")) == ["https://example.com/"]
+    # The address keys are left alone
+    assert urls(index.suggest("example")) == ["https://example.com/"]
+
+
+def test_rebalance_demotes_to_the_cold_tier():
+    index = SmallIndex()
+    index.build([(f"https://site{i}.com/", f"Page {i}", float(i)) for i in range(10)])
+    for i in range(10, 14):
+        index.record(f"https://new{i}.org/", "", float(i))
+    assert len(index.hot_urls) == SmallIndex.HOT_SIZE
+    assert index.hot_urls == {"https://new11.org/", "https://new12.org/", "https://new13.org/"}
+    # Demoted and never-hot URLs are still found by address
+    assert urls(index.suggest("site9")) == ["https://site9.com/"]
+    assert urls(index.suggest("new10")) == ["https://new10.org/"]
+    assert sorted(index.cold.keys) == index.cold.keys
+
+
+def test_threaded_rebalance_keeps_visits_recorded_meanwhile():
+    pending = []
+    done = threading.Event()
+
+    def run_on_main(callback, *args):
+        pending.append((callback, args))
+        done.set()
+
+    index = SmallIndex(run_on_main)
+    index.build([(f"https://site{i}.com/", "", float(i)) for i in range(10)])
+    for i in range(10, 14):
+        index.record(f"https://new{i}.org/", "", float(i))
+    assert index.rebalancing is not None
+    # The old tiers keep answering until the main thread swaps the new ones in
+    index.record("https://late.net/", "Late arrival", 0.5)
+    assert done.wait(5)
+    callback, args = pending.pop()
+    callback(*args)
+
+    assert index.rebalancing is None
+    assert "https://late.net/" in index.hot_urls
+    assert urls(index.suggest("arrival")) == ["https://late.net/"]
+    assert urls(index.suggest("site2")) == ["https://site2.com/"]
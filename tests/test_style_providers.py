@@ -0,0 +1,56 @@
+"""Changing the explorer's selection must not pile up CSS providers."""
+import os
+
+import pytest
+
+gi = pytest.importorskip("gi")
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+if not Gtk.init_check(None)[0]:
+    pytest.skip("needs a display", allow_module_level=True)
+
+from explorer import FileExplorer
+
+
+def add_item(explorer, path):
+    box = Gtk.Box()
+    box.path = path
+    box.is_dir = os.path.isdir(path)
+    explorer.flow_box.add(box)
+    return explorer.flow_box.get_child_at_index(len(explorer.flow_box.get_children()) - 1)
+
+
+def test_selection_keeps_provider_count(monkeypatch):
+    attached = [0]
+    add_provider = Gtk.StyleContext.add_provider
+    remove_provider = Gtk.StyleContext.remove_provider
+
+    def counting_add(context, provider, priority):
+        attached[0] += 1
+        add_provider(context, provider, priority)
+
+    def counting_remove(context, provider):
+        attached[0] -= 1
+        remove_provider(context, provider)
+
+    monkeypatch.setattr(Gtk.StyleContext, "add_provider", counting_add)
+    monkeypatch.setattr(Gtk.StyleContext, "remove_provider", counting_remove)
+
+    explorer = FileExplorer("/", 0, Gtk.Entry(), None)
+    here = os.path.abspath(__file__)
+    items = [None, add_item(explorer, os.path.dirname(here)), add_item(explorer, here)]
+
+    def select(i):
+        child = items[i % len(items)]
+        if child is None:
+            explorer.flow_box.unselect_all()
+        else:
+            explorer.flow_box.select_child(child)
+
+    for i in range(len(items)):
+        select(i)
+    baseline = attached[0]
+    for i in range(1000):
+        select(i)
+    assert attached[0] == baseline